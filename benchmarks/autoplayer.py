@@ -0,0 +1,43 @@
+# Plays the game headless with the built-in autoplayer and reports search throughput
+# (tree nodes and simulated steps per second) and how far it got, for a few budgets.
+#
+# Usage: python benchmarks/autoplayer.py [frames]
+import os
+import sys
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from menu import GameState
+from run import GameController
+
+
+# Runs a fixed number of 30 FPS frames without rendering and returns the controller
+def play(budget, frames):
+    random.seed(0)
+    game = GameController(audio=False, autoplay=budget)
+    game.autoplayer.random.seed(0)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    game.pause.paused = False
+    game.show_entities()
+    for _ in range(frames):
+        if not game.game_state.is_playing():
+            break
+        game.update_game(1 / 30.0)
+    return game
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print("%-8s %8s %10s %12s %7s %6s %6s" % ("budget", "moves", "nodes/s", "steps/s", "score", "level", "lives"))
+    for budget in [2, 5, 10, 20]:
+        game = play(budget, frames)
+        agent = game.autoplayer
+        print("%-8s %8d %10.0f %12.0f %7d %6d %6d" % (
+            "%dms" % budget, agent.searches, agent.nodes_per_second(),
+            agent.steps / agent.searchTime if agent.searchTime else 0,
+            game.score, game.level, game.lives), flush=True)
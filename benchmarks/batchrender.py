@@ -0,0 +1,81 @@
+# Measures BatchRenderer throughput as the batch grows, at full scale and downscaled,
+# against drawing each game with GameController.render_game and reading the screen back
+# with pygame.surfarray. Every game in a batch is a separate game a different number of
+# ticks in, so frames differ. Reports frames per second and milliseconds per frame.
+#
+# Usage: python benchmarks/batchrender.py [largest batch]
+import os
+import sys
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pygame
+from constants import *
+from menu import GameState
+from batchrender import BatchRenderer
+from run import GameController
+
+
+# Steers Pac-Man in a random direction now and then
+class RandomInput(object):
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.direction = LEFT
+
+    def get_direction(self, pacman):
+        if self.random.random() < 0.05:
+            self.direction = self.random.choice([UP, DOWN, LEFT, RIGHT])
+        return self.direction
+
+
+# Games played for different numbers of ticks
+def create_games(count):
+    games = []
+    for i in range(count):
+        game = GameController(audio=False)
+        game.game_state.set_state(GameState.PLAYING)
+        game.start_game()
+        game.pause.paused = False
+        game.show_entities()
+        game.pacman.controller = RandomInput(i)
+        for _ in range(10 * i):
+            if game.game_state.is_playing():
+                game.update_game(1.0 / 30)
+        games.append(game)
+    return games
+
+
+# Seconds per frame rendering the games repeat times
+def time_batch(games, scale, repeat):
+    renderer = BatchRenderer(len(games), scale)
+    out = renderer.create_buffer()
+    renderer.render(games, out)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        renderer.render(games, out)
+    return (time.perf_counter() - start) / (repeat * len(games))
+
+
+def time_pygame(games, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for game in games:
+            game.render_game()
+            pygame.surfarray.array3d(game.screen)
+    return (time.perf_counter() - start) / (repeat * len(games))
+
+
+if __name__ == "__main__":
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    games = create_games(largest)
+    sizes = [size for size in [1, 4, 16, 64, 256] if size <= largest]
+    print("%-8s %16s %16s %16s" % ("batch", "render_game", "batch", "batch (1/2)"))
+    for size in sizes:
+        repeat = max(1, 256 // size)
+        results = [time_pygame(games[:size], repeat), time_batch(games[:size], 1, repeat),
+                   time_batch(games[:size], 2, repeat)]
+        print("%-8d %s" % (size, " ".join("%7.0f/s %5.2fms" % (1 / t, t * 1000) for t in results)), flush=True)
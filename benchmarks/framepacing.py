@@ -0,0 +1,91 @@
+# Runs the real main loop (GameController.update, frame pacer included) with the autoplayer
+# steering, at the original 30 frames per second and at higher display rates, with the
+# simulation at 30 ticks per second, and at 60. Reports per setting:
+#   cpu      share of one core used by the process
+#   jitter   standard deviation of the frame intervals
+#   latency  average time from an input arriving to the end of the first frame drawn from a
+#            tick that saw it (input is read at the start of each frame)
+#   step     average distance Pac-Man is drawn moving per frame
+#   uneven   average difference between that distance and the distance his speed covers in
+#            the frame's time, while he runs straight (0 is perfectly even motion)
+#
+# Usage: python benchmarks/framepacing.py [seconds]
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from menu import GameState
+from run import GameController
+
+
+# GameController that records when each frame read input, whether it ran a tick, when it
+# finished drawing, where it drew Pac-Man and where he was heading
+class TimedGame(GameController):
+    def __init__(self, *args, **kwargs):
+        GameController.__init__(self, *args, **kwargs)
+        self.frames = []
+        self.ticked = False
+
+    def check_events(self):
+        self.frames.append([time.perf_counter(), False, 0, None, None])
+        GameController.check_events(self)
+
+    def update_playing(self, dt):
+        self.frames[-1][1] = True
+        GameController.update_playing(self, dt)
+
+    def render(self):
+        GameController.render(self)
+        self.frames[-1][2] = time.perf_counter()
+        self.frames[-1][3] = self.pacman.interpolated(self.alpha).as_tuple()
+        self.frames[-1][4] = (self.pacman.direction, self.pacman.speed)
+
+
+def run(fps, tickrate, seconds):
+    game = TimedGame(audio=False, autoplay=1, fps=fps, tickrate=tickrate)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    game.pause.paused = False
+    game.show_entities()
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+    while time.perf_counter() - start < seconds:
+        game.update()
+    cpu = (time.process_time() - cpu) / (time.perf_counter() - start)
+
+    frames = game.frames[1:]
+    reads = np.array([frame[0] for frame in frames])
+    ticked = np.array([frame[1] for frame in frames])
+    drawn = np.array([frame[2] for frame in frames])
+    positions = np.array([frame[3] for frame in frames])
+    jitter = np.std(np.diff(reads))
+
+    # Inputs at evenly spread times: each is shown by the first frame that reads input
+    # after it and runs a tick
+    times = np.linspace(reads[0], reads[-1], 2000, endpoint=False)
+    shown = np.flatnonzero(ticked)
+    first = shown[np.minimum(np.searchsorted(reads[shown], times), len(shown) - 1)]
+    valid = reads[first] >= times
+    latency = np.mean(drawn[first[valid]] - times[valid])
+
+    # Frames drawn while Pac-Man kept running the same way since the previous frame
+    steps = np.hypot(*np.diff(positions, axis=0).T)
+    heading = [frame[4] for frame in frames]
+    ideal = np.array([speed for _, speed in heading[1:]]) * np.diff(reads)
+    straight = np.array([a == b and a[0] != 0 for a, b in zip(heading, heading[1:])])
+    return cpu, jitter, latency, np.mean(steps[straight]), np.mean(np.abs(steps - ideal)[straight])
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("%-6s %6s %8s %10s %10s %10s %10s" % ("fps", "ticks", "cpu", "jitter", "latency", "step", "uneven"))
+    for fps, tickrate in [(30, 30), (60, 30), (120, 30), (144, 30), (144, 60)]:
+        cpu, jitter, latency, step, uneven = run(fps, tickrate, seconds)
+        print("%-6d %6d %7.1f%% %8.2fms %8.1fms %8.2fpx %8.2fpx" % (fps, tickrate, cpu * 100, jitter * 1000,
+                                                                  latency * 1000, step, uneven), flush=True)
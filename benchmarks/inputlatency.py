@@ -0,0 +1,154 @@
+# Measures input latency in the real main loop (GameController.update, frame pacer
+# included): a thread taps direction keys at random times, posting KEYDOWN and, a few
+# milliseconds later, KEYUP to the pygame event queue, always for a direction Pac-Man can
+# take straight away (the reverse of his heading, or a way out of the node he stopped on).
+# Reports per setting, for the input queue and for polling the keys held down each tick
+# (as Pacman.get_valid_key does):
+#   latency  time from the key press to the end of the first frame drawn with Pac-Man
+#            heading the new way (average, median, 95th percentile, worst)
+#   lost     taps that never turned Pac-Man
+#   tick     median time from the game reading the key press to the update that turned
+#            Pac-Man, as the input queue measures it from its event times (the rest of the
+#            latency is waiting in the event queue and drawing the frame)
+# Taps during a pause (deaths) or at the very end of the run are left out.
+#
+# Usage: python benchmarks/inputlatency.py [seconds] [tap milliseconds]
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import pygame
+from pygame.locals import *
+from constants import *
+from menu import GameState
+from run import GameController
+
+DIRECTIONKEYS = {UP: K_UP, DOWN: K_DOWN, LEFT: K_LEFT, RIGHT: K_RIGHT}
+
+
+# Stands in for the input queue with what pygame.key.get_pressed would report: the keys
+# down when the events were last pumped, read once per tick in get_valid_key's order
+class PolledKeys(object):
+    def __init__(self):
+        self.down = set()
+
+    def handle_event(self, event):
+        if event.type == KEYDOWN:
+            self.down.add(event.key)
+        elif event.type == KEYUP:
+            self.down.discard(event.key)
+
+    def flush(self):
+        pass
+
+    def get_direction(self, pacman):
+        for direction in [UP, DOWN, LEFT, RIGHT]:
+            if DIRECTIONKEYS[direction] in self.down:
+                return direction
+        return STOP
+
+
+# GameController that records, for every frame, when it finished drawing, where Pac-Man
+# was heading and whether the game was paused
+class TimedGame(GameController):
+    def __init__(self, *args, **kwargs):
+        GameController.__init__(self, *args, **kwargs)
+        self.frames = []
+
+    def render(self):
+        GameController.render(self)
+        self.frames.append((time.perf_counter(), self.pacman.direction, self.pause.paused))
+
+
+# Taps keys until stopped, recording (time pressed, direction) of each tap
+def tap(game, taps, tapTime, stop):
+    while not stop.wait(random.uniform(0.2, 0.5)):
+        pacman = game.pacman
+        if game.pause.paused:
+            continue
+        if pacman.direction != STOP:
+            direction = -pacman.direction
+        else:
+            directions = [d for d in [UP, DOWN, LEFT, RIGHT] if pacman.valid_direction(d)]
+            if not directions:
+                continue
+            direction = random.choice(directions)
+        taps.append((time.perf_counter(), direction))
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=DIRECTIONKEYS[direction]))
+        time.sleep(tapTime)
+        pygame.event.post(pygame.event.Event(KEYUP, key=DIRECTIONKEYS[direction]))
+
+
+# Milliseconds for the table, or a dash if there is nothing to report
+def ms(value):
+    if np.isnan(value):
+        return "%10s" % "-"
+    return "%8.1fms" % value
+
+
+# Returns the number of taps, how many were lost, the average, median, 95th percentile
+# and worst latency in milliseconds of the others, and the input queue's median (if queued)
+def run(fps, tickrate, polled, seconds, tapTime):
+    random.seed(0)
+    game = TimedGame(audio=False, fps=fps, tickrate=tickrate)
+    if polled:
+        game.input = PolledKeys()
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    game.pause.paused = False
+    game.show_entities()
+
+    taps = []
+    stop = threading.Event()
+    tapper = threading.Thread(target=tap, args=(game, taps, tapTime, stop))
+    tapper.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        game.update()
+    stop.set()
+    tapper.join()
+
+    drawn = np.array([frame[0] for frame in game.frames])
+    latencies = []
+    lost = 0
+    ends = [when for when, _ in taps[1:]] + [drawn[-1]]
+    for (when, direction), end in zip(taps, ends):
+        # Too close to the end of the run to tell
+        if when > drawn[-1] - 0.25:
+            continue
+        frames = range(np.searchsorted(drawn, when), np.searchsorted(drawn, end))
+        if any(game.frames[i][2] for i in frames):
+            continue
+        turned = [i for i in frames if game.frames[i][1] == direction]
+        if turned:
+            latencies.append((drawn[turned[0]] - when) * 1000)
+        else:
+            lost += 1
+
+    measured = np.nan
+    if not polled and game.input.latencies:
+        measured = np.median(game.input.latencies) * 1000
+    if not latencies:
+        return lost, lost, np.nan, np.nan, np.nan, np.nan, measured
+    return (len(latencies) + lost, lost, np.mean(latencies), np.median(latencies),
+            np.percentile(latencies, 95), np.max(latencies), measured)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    tapTime = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.004
+    print("%-6s %6s %-7s %6s %6s %10s %10s %10s %10s %10s" % ("fps", "ticks", "input", "taps", "lost",
+                                                             "mean", "median", "p95", "max", "tick"))
+    for fps, tickrate in [(30, 30), (60, 30), (144, 30), (144, 60)]:
+        for polled in [True, False]:
+            results = run(fps, tickrate, polled, seconds, tapTime)
+            taps, lost = results[:2]
+            print("%-6d %6d %-7s %6d %6d %s" % (fps, tickrate, "polled" if polled else "queued", taps, lost,
+                                               " ".join(ms(value) for value in results[2:])), flush=True)
@@ -0,0 +1,87 @@
+# Times level starts from the maze text files and from compiled level packs: the first
+# start of each maze (nothing cached, pack not mapped yet) and later starts. Uses copies of
+# the built-in mazes and generated mazes of growing sizes, all compiled into a temporary
+# directory (assets/mazes is left alone).
+#
+# Usage: python benchmarks/levelload.py [mazes]
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from mazecompiler import MazeCompiler
+from mazedata import Maze1, Maze2
+from mazegen import MazeGenerator
+from sprites import MazeSprites
+
+
+# A built-in maze read from (and compiled into) another directory
+def relocated(kind, mazedir):
+    maze = kind()
+    maze.mazedir = mazedir
+    return maze
+
+
+# Returns milliseconds per first and per later level start, with or without packs
+def run(game, usepacks, repeats=5):
+    game.loader.usePacks = usepacks
+    game.loader.close_packs()
+    MazeSprites.backgrounds.clear()
+    MazeSprites.chunks.clear()
+    count = len(game.mazedata.mazedict)
+
+    start = time.perf_counter()
+    for level in range(count):
+        game.level = level
+        game.start_game()
+        if usepacks and game.loader.get_level_pack(game.mazedata.obj) is None:
+            raise RuntimeError("no up to date pack for level %d" % level)
+    first = (time.perf_counter() - start) * 1000 / count
+
+    start = time.perf_counter()
+    for level in range(count * repeats):
+        game.level = level
+        game.start_game()
+    later = (time.perf_counter() - start) * 1000 / (count * repeats)
+    return first, later
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("%-16s %10s %10s %10s %10s" % ("mazes", "text 1st", "text", "pack 1st", "pack"))
+    with tempfile.TemporaryDirectory() as directory:
+        builtin = os.path.join(directory, "built-in")
+        os.makedirs(builtin)
+        for kind in [Maze1, Maze2]:
+            maze = kind()
+            for path in [maze.maze_file(), maze.rotation_file()]:
+                shutil.copy(path, builtin)
+        sets = [("built-in", builtin)]
+        for cols, rows in [(NCOLS, NROWS), (2 * NCOLS, 2 * NROWS)]:
+            mazedir = os.path.join(directory, "%dx%d" % (cols, rows))
+            os.makedirs(mazedir)
+            generator = MazeGenerator(cols, rows)
+            for seed in range(count):
+                generator.write(mazedir, seed)
+            sets.append(("%d x %dx%d" % (count, cols, rows), mazedir))
+
+        for label, mazedir in sets:
+            if mazedir is builtin:
+                compiler = MazeCompiler()
+                mazedata = compiler.game.mazedata
+                mazedata.mazedict = {}
+                for kind in [Maze1, Maze2]:
+                    mazedata.register(functools.partial(relocated, kind, builtin))
+            else:
+                compiler = MazeCompiler(mazedir)
+            compiler.compile_all()
+            text = run(compiler.game, False)
+            packed = run(compiler.game, True)
+            print("%-16s %8.2fms %8.2fms %8.2fms %8.2fms" % ((label,) + text + packed), flush=True)
@@ -0,0 +1,87 @@
+# Times level transitions at the real frame rate, with and without building the next
+# level in the background during the level-clear pause. Each level is cleared by leaving
+# a single pellet under Pac-Man, then frames run until the next level has started. Reports
+# the frame that swaps the level in and the worst frame of the flashing pause before it.
+# Uses the built-in mazes and generated mazes of growing sizes (from their text files).
+#
+# Usage: python benchmarks/leveltransition.py [transitions]
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from constants import *
+from menu import GameState
+from mazegen import MazeGenerator
+from pellets import PelletGroup
+from run import GameController
+from sprites import MazeSprites
+
+
+# Leaves one pellet, on Pac-Man's tile
+def clear_level(game):
+    grid = np.zeros(game.pellets.grid.shape, dtype=np.uint8)
+    grid[int(game.pacman.position.y // TILEHEIGHT), int(game.pacman.position.x // TILEWIDTH)] = PELLET
+    game.pellets = PelletGroup(None)
+    game.pellets.load_grid(grid)
+
+
+# Returns the average milliseconds of the swap frame and of the worst pause frame
+def run(mazes, prefetch, transitions):
+    game = GameController(audio=False, mazes=mazes)
+    game.loader.usePacks = False
+    game.prefetchLevels = prefetch
+    MazeSprites.backgrounds.clear()
+    MazeSprites.chunks.clear()
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    game.pause.paused = False
+    game.show_entities()
+
+    dt = 1.0 / 30
+    swaps = []
+    pauses = []
+    for _ in range(transitions):
+        clear_level(game)
+        level = game.level
+        worst = 0
+        while True:
+            start = time.perf_counter()
+            game.update_game(dt)
+            game.render()
+            elapsed = time.perf_counter() - start
+            if game.level != level:
+                break
+            worst = max(worst, elapsed)
+            time.sleep(max(0, dt - elapsed))
+        swaps.append(elapsed)
+        pauses.append(worst)
+
+        # Skip the ready pause
+        game.pause.set_timer(None)
+        game.pause.paused = False
+        game.show_entities()
+    return np.mean(swaps) * 1000, np.mean(pauses) * 1000
+
+
+if __name__ == "__main__":
+    transitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    print("%-10s %12s %12s %12s %12s" % ("mazes", "swap", "pause", "swap (bg)", "pause (bg)"))
+    with tempfile.TemporaryDirectory() as directory:
+        sets = [("built-in", None)]
+        for cols, rows in [(NCOLS, NROWS), (2 * NCOLS, 2 * NROWS)]:
+            mazedir = os.path.join(directory, "%dx%d" % (cols, rows))
+            os.makedirs(mazedir)
+            generator = MazeGenerator(cols, rows)
+            for seed in range(transitions + 1):
+                generator.write(mazedir, seed)
+            sets.append(("%dx%d" % (cols, rows), mazedir))
+
+        for label, mazedir in sets:
+            results = run(mazedir, False, transitions) + run(mazedir, True, transitions)
+            print("%-10s %10.2fms %10.2fms %10.2fms %10.2fms" % ((label,) + results), flush=True)
@@ -0,0 +1,49 @@
+# Generates mazes of growing sizes and reports mazes per second in one process and
+# spread over all CPUs, then validates them and reports how many passed and how long
+# the checks took. Files are written to a temporary directory.
+#
+# Usage: python benchmarks/mazegen.py [count]
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from mazedata import GeneratedMaze
+from mazegen import MazeGenerator, MazeValidator
+
+
+# Returns mazes per second with one process and with one per CPU, the share of mazes
+# that passed validation and the milliseconds per validated maze
+def run(directory, cols, rows, count):
+    generator = MazeGenerator(cols, rows)
+
+    start = time.perf_counter()
+    for seed in range(count):
+        generator.write(directory, seed)
+    single = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    names = generator.write_many(directory, range(count, 2 * count))
+    parallel = count / (time.perf_counter() - start)
+
+    validator = MazeValidator()
+    start = time.perf_counter()
+    passed = sum(not validator.check(GeneratedMaze(name, directory), tiles=True) for name in names)
+    checktime = (time.perf_counter() - start) * 1000 / count
+    return single, parallel, passed / count, checktime
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("%d CPUs" % os.cpu_count())
+    print("%-10s %12s %12s %8s %10s" % ("size", "1 process", "all CPUs", "valid", "check"))
+    with tempfile.TemporaryDirectory() as directory:
+        for cols, rows in [(NCOLS, NROWS), (2 * NCOLS, 2 * NROWS), (4 * NCOLS, 4 * NROWS)]:
+            single, parallel, valid, checktime = run(directory, cols, rows, count)
+            print("%-10s %8.1f/sec %8.1f/sec %7.1f%% %8.2fms" % ("%dx%d" % (cols, rows), single, parallel,
+                                                                100 * valid, checktime), flush=True)
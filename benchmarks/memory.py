@@ -0,0 +1,67 @@
+# Measures the memory each additional game takes in one process: a GameController with its
+# first level started, as a headless worker holds it. Python allocations are counted with
+# tracemalloc (in total and for the largest source files); on Linux the growth of the
+# resident set is reported as well, which also covers pygame surfaces.
+#
+# Usage: python benchmarks/memory.py [games]
+import gc
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from menu import GameState
+from run import GameController
+
+
+def create_game():
+    game = GameController(audio=False)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    return game
+
+
+# Resident set size in bytes, or None where /proc is not available
+def resident():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+# Returns bytes per game traced by tracemalloc, the same per source file, and resident bytes
+# per game (measured first, without tracemalloc's own overhead)
+def run(count):
+    # The first game loads what every game shares (images, fonts, backgrounds)
+    games = [create_game()]
+    gc.collect()
+    rss = resident()
+    games.extend(create_game() for _ in range(count))
+    gc.collect()
+    grown = None if rss is None else (resident() - rss) / count
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games.extend(create_game() for _ in range(count))
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    files = [(os.path.basename(stat.traceback[0].filename), stat.size_diff / count) for stat in stats]
+    traced = sum(size for _, size in files)
+    return traced, files, grown
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    traced, files, grown = run(count)
+    print("traced per game:   %8.1f KB" % (traced / 1024))
+    if grown is not None:
+        print("resident per game: %8.1f KB" % (grown / 1024))
+    for name, size in files[:8]:
+        print("  %-20s %8.1f KB" % (name, size / 1024))
@@ -0,0 +1,50 @@
+# Times putting a level back to its start: GameController.reset, which restores the loaded
+# level in place, against start_game, which loads and builds it again. Each repeat plays a
+# few seconds first (so pellets are eaten, ghosts have moved and mode timers are pending),
+# and only the reset itself is timed. Uses the built-in mazes with 4 and with extra ghosts.
+#
+# Usage: python benchmarks/reset.py [repeats]
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from constants import *
+from menu import GameState
+from run import GameController
+
+
+# Returns the median microseconds of reset and of start_game
+def run(stress, repeats):
+    game = GameController(audio=False, stress=stress)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+
+    results = []
+    for method in [game.reset, game.start_game]:
+        times = []
+        for _ in range(repeats):
+            game.pause.paused = False
+            for _ in range(90):
+                if not game.game_state.is_playing():
+                    break
+                game.update_game(1.0 / 30)
+            game.game_state.set_state(GameState.PLAYING)
+            game.level = 0
+            start = time.perf_counter()
+            method()
+            times.append(time.perf_counter() - start)
+        results.append(np.median(times) * 1e6)
+    return results
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print("%-8s %12s %14s %8s" % ("ghosts", "reset", "start_game", "speedup"))
+    for stress in [0, 60, 300]:
+        reset, start = run(stress, repeats)
+        print("%-8d %10.1fus %12.1fus %7.0fx" % (4 + stress, reset, start, start / reset), flush=True)
@@ -0,0 +1,83 @@
+# Load test: plays with hundreds of ghosts (stress mode) and reports the time per frame
+# spent on game logic and on Pac-Man/ghost collision checks, comparing the spatial hash
+# broadphase with testing every ghost, and the vectorized ghost engine with updating
+# ghosts one by one.
+#
+# Usage: python benchmarks/stress.py [frames]
+import os
+import sys
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from menu import GameState
+from run import GameController
+
+
+# Turns in a random direction now and then
+class ScriptedInput(object):
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.direction = LEFT
+
+    def attach(self, nodes, pellets, ghosts):
+        pass
+
+    def get_direction(self, pacman):
+        if self.random.random() < 0.05:
+            self.direction = self.random.choice([UP, DOWN, LEFT, RIGHT])
+        return self.direction
+
+
+# Average milliseconds per unpaused frame: whole update, broadphase query, and a
+# reference pass that tests Pac-Man against every ghost. vectorize=False keeps the
+# one-by-one ghost update at every ghost count.
+def run(numghosts, frames, vectorize=True):
+    random.seed(0)
+    game = GameController(audio=False, stress=numghosts - 4)
+    game.autoplayer = ScriptedInput(0)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    if not vectorize:
+        game.ghosts.vectorizeAt = float("inf")
+    game.pause.paused = False
+    game.show_entities()
+
+    # Keep playing through deaths
+    game.lives = 10 ** 6
+
+    update = broadphase = everyghost = 0
+    counted = 0
+    for _ in range(frames):
+        paused = game.pause.paused
+        start = time.perf_counter()
+        game.update_game(1 / 30.0)
+        elapsed = time.perf_counter() - start
+        if paused:
+            continue
+        counted += 1
+        update += elapsed
+
+        start = time.perf_counter()
+        [ghost for ghost in game.ghosts.nearby(game.pacman) if game.pacman.collide_ghost(ghost)]
+        broadphase += time.perf_counter() - start
+
+        start = time.perf_counter()
+        [ghost for ghost in game.ghosts if game.pacman.collide_ghost(ghost)]
+        everyghost += time.perf_counter() - start
+
+    scale = 1000.0 / max(counted, 1)
+    return update * scale, broadphase * scale, everyghost * scale
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    print("%-8s %10s %12s %12s %12s" % ("ghosts", "update", "broadphase", "every ghost", "loop update"))
+    for numghosts in [4, 64, 256, 1024, 4096]:
+        update, broadphase, everyghost = run(numghosts, frames)
+        loop, _, _ = run(numghosts, frames, vectorize=False)
+        print("%-8d %8.2fms %10.3fms %10.3fms %10.2fms" % (numghosts, update, broadphase, everyghost, loop), flush=True)
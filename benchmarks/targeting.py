@@ -0,0 +1,87 @@
+# Measures the cost of one ghost direction decision for each targeting strategy
+# as the number of ghosts and the size of the maze grow.
+#
+# Usage: python benchmarks/targeting.py
+import gc
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from nodes import NodeGroup
+from ghosts import Ghost
+from targeting import GreedyTargeting, AStarTargeting
+
+
+# Writes a lattice maze (a node every other tile, corridors in between) and returns its path
+def write_lattice_maze(rows, cols):
+    lines = []
+    for row in range(rows):
+        line = []
+        for col in range(cols):
+            if row % 2 == 0 and col % 2 == 0:
+                line.append('+')
+            elif row % 2 == 0 or col % 2 == 0:
+                line.append('.')
+            else:
+                line.append('X')
+        lines.append(' '.join(line))
+    handle, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(handle, 'w') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+# Average microseconds per decision over a number of rounds. The target follows a random
+# walk through the graph (like Pac-Man) and every ghost makes one decision per round,
+# then moves to the node it chose.
+def run(strategy, nodes, numghosts, rounds=200):
+    nodelist = list(nodes.nodesLUT.values())
+    ghosts = []
+    for _ in range(numghosts):
+        ghost = Ghost(random.choice(nodelist))
+        ghost.name = BLINKY
+        ghost.set_targeting(strategy)
+        ghosts.append(ghost)
+
+    target = random.choice(nodelist)
+    decisions = 0
+    elapsed = 0
+    for _ in range(rounds):
+        neighbors = [n for n in target.neighbors.values() if n is not None]
+        target = random.choice(neighbors)
+        for ghost in ghosts:
+            ghost.goal = target.position
+            directions = ghost.valid_directions()
+            start = time.perf_counter()
+            direction = ghost.goal_direction(directions)
+            elapsed += time.perf_counter() - start
+            decisions += 1
+            ghost.direction = direction
+            ghost.node = ghost.node.neighbors[direction]
+    return elapsed / decisions * 1e6
+
+
+if __name__ == "__main__":
+    # Like timeit, keep the cyclic garbage collector (whose passes scale with the number
+    # of live objects, i.e. the maze size) out of the measurement
+    gc.disable()
+    random.seed(0)
+    print("%-10s %-8s %8s %8s" % ("maze", "ghosts", "greedy", "astar"))
+    for size in [1, 2, 4, 8]:
+        rows, cols = NROWS * size + 1, NCOLS * size + 1
+        path = write_lattice_maze(rows, cols)
+        nodes = NodeGroup(path)
+        os.remove(path)
+        for numghosts in [4, 16, 64, 256]:
+            greedy = run(GreedyTargeting(), nodes, numghosts)
+            astar = AStarTargeting(nodes)
+
+            # Warm the cache with one pass, then measure steady state
+            run(astar, nodes, numghosts)
+            astartime = run(astar, nodes, numghosts)
+            print("%-10s %-8d %6.1fus %6.1fus" % ("%dx%d" % (cols, rows), numghosts, greedy, astartime), flush=True)
@@ -0,0 +1,62 @@
+# Measures how much faster than real time the game runs when fast-forwarding
+# (several simulation steps per rendered frame) and checks that the outcome is the
+# same as at normal speed.
+#
+# Usage: python benchmarks/turbo.py [seconds of play]
+import os
+import sys
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from constants import *
+from menu import GameState
+from run import GameController
+
+
+# Scripted player: turns in a random direction now and then, drawing one random
+# number per simulation step so the input does not depend on how steps are grouped
+class ScriptedInput(object):
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.direction = LEFT
+
+    def attach(self, nodes, pellets, ghosts):
+        pass
+
+    def get_direction(self, pacman):
+        if self.random.random() < 0.05:
+            self.direction = self.random.choice([UP, DOWN, LEFT, RIGHT])
+        return self.direction
+
+
+# Plays the given number of simulation steps, rendering once per displayed frame.
+# Returns the wall time taken and the final state.
+def play(speed, steps):
+    game = GameController(audio=False, speed=speed)
+    game.autoplayer = ScriptedInput(0)
+    game.game_state.set_state(GameState.PLAYING)
+    game.start_game()
+    game.pause.paused = False
+    game.show_entities()
+
+    start = time.perf_counter()
+    for _ in range(steps // speed):
+        game.update_playing(1 / 30.0)
+        game.render()
+    elapsed = time.perf_counter() - start
+    state = (game.score, game.level, game.lives, game.pacman.position.as_tuple())
+    return elapsed, state
+
+
+if __name__ == "__main__":
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    steps = seconds * 30
+    print("%-6s %10s %12s %10s" % ("speed", "wall", "x realtime", "identical"))
+    _, reference = play(1, steps)
+    for speed in [1, 8, 16]:
+        elapsed, state = play(speed, steps)
+        print("%-6s %9.2fs %11.1fx %10s" % ("%dx" % speed, elapsed, seconds / elapsed, state == reference), flush=True)
@@ -0,0 +1,75 @@
+# Renders mazes much larger than the screen through a moving viewport and reports the
+# time per frame and the memory held by background chunks, for growing maze sizes.
+# The mazes are maze1 repeated n x n times, written to a temporary directory.
+#
+# Usage: python benchmarks/viewport.py [frames]
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import pygame
+from constants import *
+from pellets import PelletGroup
+from sprites import MazeSprites, ChunkedBackground
+from viewport import Viewport
+
+
+# Writes maze1 and its rotation file repeated n x n times, returns their paths
+def write_maze(directory, n):
+    paths = []
+    for suffix in ["", "_rotation"]:
+        data = np.loadtxt(os.path.join(base_path, "assets", "mazes", "maze1" + suffix + ".txt"), dtype='<U1')
+        path = os.path.join(directory, "maze1x%d%s.txt" % (n, suffix))
+        with open(path, "w") as f:
+            f.write("\n".join(" ".join(row) for row in np.tile(data, (n, n))) + "\n")
+        paths.append(path)
+    return paths
+
+
+# Sweeps the view back and forth across the whole maze. Returns the average and worst
+# milliseconds per frame, and the chunks and bytes held by the chunk cache at the end.
+def run(screen, directory, n, frames):
+    mazepath, rotpath = write_maze(directory, n)
+    mazesprites = MazeSprites(mazepath, rotpath)
+    background = ChunkedBackground(mazesprites, 0)
+    pellets = PelletGroup(mazepath)
+    viewport = Viewport(*mazesprites.size())
+    MazeSprites.chunks.clear()
+
+    # Across at 12 pixels per frame, down one screen at each edge
+    spanx = max(viewport.mazewidth - viewport.width, 1)
+    spany = max(viewport.mazeheight - viewport.height, 1)
+    total = worst = 0
+    for frame in range(frames):
+        x = frame * 12 % (2 * spanx)
+        viewport.move_to(min(x, 2 * spanx - x), (frame * 12 // spanx) * viewport.height % spany)
+
+        start = time.perf_counter()
+        screen.fill(BLACK)
+        background.render(screen, viewport)
+        pellets.render(screen, viewport)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        worst = max(worst, elapsed)
+
+    chunks = len(MazeSprites.chunks)
+    chunkbytes = sum(chunk.get_width() * chunk.get_height() * chunk.get_bytesize() for chunk in MazeSprites.chunks.values())
+    return total * 1000 / frames, worst * 1000, chunks, chunkbytes
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    pygame.init()
+    screen = pygame.display.set_mode(SCREENSIZE, 0, 32)
+    print("%-12s %10s %10s %8s %10s" % ("tiles", "frame", "worst", "chunks", "chunk mem"))
+    with tempfile.TemporaryDirectory() as directory:
+        for n in [1, 8, 32, 64]:
+            average, worst, chunks, chunkbytes = run(screen, directory, n, frames)
+            print("%-12s %8.2fms %8.2fms %8d %8.1fMB" % ("%dx%d" % (NCOLS * n, NROWS * n), average, worst,
+                                                        chunks, chunkbytes / 2 ** 20), flush=True)
@@ -0,0 +1,453 @@
+import math
+import random
+import time
+from constants import *
+
+
+# Unit vector per direction, as (x, y) pairs
+DIRECTIONVECTORS = {STOP: (0, 0), UP: (0, -1), DOWN: (0, 1), LEFT: (-1, 0), RIGHT: (1, 0)}
+
+
+# Tile-level model of a maze used by the autoplayer to simulate ahead.
+# Every tile an entity can stand on gets an integer index; moving one tile is a
+# dictionary lookup, so simulated states are just a few integers that are cheap to copy.
+class LookaheadModel(object):
+    def __init__(self, nodes):
+        # NodeGroup the model was built for
+        self.nodes = nodes
+
+        # Tile index per pixel position, and the position of every tile
+        self.index = {}
+        self.positions = []
+
+        # Next tile when moving in a direction: (tile, direction) -> tile
+        self.ahead = {}
+
+        # Node tiles, where entities choose a new direction, and their portal destinations
+        self.nodeTiles = {}
+        self.portals = {}
+
+        # Allowed directions per (node tile, entity name), and per (node tile, entity name,
+        # direction of arrival) the ones that do not turn back (ghosts only turn back when
+        # there is no other way). Rebuilt by refresh when node access changes.
+        self.exits = {}
+        self.turns = {}
+        self.version = None
+
+        for node in nodes.nodesLUT.values():
+            self.nodeTiles[self.tile(node.position.x, node.position.y)] = node
+
+        for tile, node in list(self.nodeTiles.items()):
+            if node.neighbors[PORTAL] is not None:
+                portal = node.neighbors[PORTAL].position
+                self.portals[tile] = self.tile(portal.x, portal.y)
+
+            # Tiles along each edge, one step of travel apart
+            for direction in [UP, DOWN, LEFT, RIGHT]:
+                neighbor = node.neighbors[direction]
+                if neighbor is None:
+                    continue
+                vec = neighbor.position - node.position
+                steps = max(1, int(round(vec.magnitude() / TILEWIDTH)))
+                previous = tile
+                for k in range(1, steps + 1):
+                    position = node.position + vec * (k / steps)
+                    following = self.tile(position.x, position.y)
+                    self.ahead[(previous, direction)] = following
+                    previous = following
+
+    # Index of the tile at a pixel position (added on first use)
+    def tile(self, x, y):
+        key = (int(round(x)), int(round(y)))
+        if key not in self.index:
+            self.index[key] = len(self.positions)
+            self.positions.append(key)
+        return self.index[key]
+
+    # Rebuilds exits and turns if any node's access rules changed since the last call
+    def refresh(self):
+        if self.version == self.nodes.accessVersion:
+            return
+        self.version = self.nodes.accessVersion
+        self.exits.clear()
+        self.turns.clear()
+        for tile, node in self.nodeTiles.items():
+            names = set()
+            for allowed in node.access.values():
+                names.update(allowed)
+            for name in names:
+                exits = [direction for direction in [UP, DOWN, LEFT, RIGHT]
+                         if node.neighbors[direction] is not None and name in node.access[direction]]
+                self.exits[(tile, name)] = exits
+                for arrival in [STOP, UP, DOWN, LEFT, RIGHT]:
+                    turns = [direction for direction in exits if direction != -arrival]
+                    self.turns[(tile, name, arrival)] = turns or [-arrival]
+
+    # Tile nearest to an entity's position on the edge it is travelling.
+    # An entity that has left its node is placed on a tile past it, so that its next
+    # decision is taken at the node it is heading for.
+    def locate(self, entity):
+        tile = self.tile(entity.node.position.x, entity.node.position.y)
+        if entity.target is entity.node or (tile, entity.direction) not in self.ahead:
+            return tile
+
+        target = self.tile(entity.target.position.x, entity.target.position.y)
+        tile = self.ahead[(tile, entity.direction)]
+        best, bestDistance = tile, None
+        while True:
+            x, y = self.positions[tile]
+            distance = (x - entity.position.x) ** 2 + (y - entity.position.y) ** 2
+            if bestDistance is not None and distance >= bestDistance:
+                break
+            best, bestDistance = tile, distance
+            if tile == target or (tile, entity.direction) not in self.ahead:
+                break
+            tile = self.ahead[(tile, entity.direction)]
+        return best
+
+
+# Snapshot of a game for the search. Ghosts are (tile, direction, mode, name, scatter corner,
+# frightened goal) tuples and the remaining pellets a bitmask, so cloning copies a handful
+# of references.
+class SearchState(object):
+    def __init__(self, pacman, direction, pellets, ghosts, freight=0, steps=0, alive=True):
+        self.pacman = pacman
+        self.direction = direction
+        self.pellets = pellets
+        self.ghosts = ghosts
+
+        # Steps of freight mode left, and steps simulated so far
+        self.freight = freight
+        self.steps = steps
+        self.alive = alive
+
+    def clone(self):
+        return SearchState(self.pacman, self.direction, self.pellets, self.ghosts,
+                           self.freight, self.steps, self.alive)
+
+
+# One decision in the search tree: Pac-Man heading for a node, choosing what to do there.
+# The tree is open-loop (children are keyed by action only), so a subtree stays usable
+# after the move it describes has been played.
+class SearchNode(object):
+    def __init__(self, key, actions):
+        # (tile Pac-Man is heading for, direction) when this decision is taken
+        self.key = key
+        self.untried = list(actions)
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+# Built-in autoplayer: a time-budgeted Monte Carlo tree search over the tile model.
+# Attach it to Pac-Man as a controller; it re-plans whenever Pac-Man starts travelling
+# towards a new node, reusing the subtree of the move it played last.
+class LookaheadAgent(object):
+    def __init__(self, budget=10, seed=None):
+        # Milliseconds of search per decision
+        self.budget = budget
+
+        # Steps (tiles of travel) simulated ahead of the current position
+        self.horizon = 30
+
+        # Exploration constant for UCT and the score that counts as a value of 1
+        self.exploration = 1.4
+        self.scale = 100.0
+
+        # Simulated rewards. A death n steps ahead costs deathPenalty * discount**n, so an
+        # imminent death outweighs the ones random playouts run into far ahead.
+        self.deathPenalty = -500
+        self.discount = 0.9
+        self.clearBonus = 500
+        self.ghostPoints = 200
+
+        self.random = random.Random(seed)
+
+        self.model = None
+        self.pellets = None
+        self.ghosts = None
+
+        # Current root and the direction chosen for it
+        self.root = None
+        self.planned = None
+        self.decision = STOP
+
+        # Search statistics: decisions made, tree nodes searched, steps simulated, seconds spent
+        self.searches = 0
+        self.nodes = 0
+        self.steps = 0
+        self.searchTime = 0
+
+    # Points the agent at a new level
+    def attach(self, nodes, pellets, ghosts):
+        self.model = LookaheadModel(nodes)
+        self.pellets = pellets
+        self.ghosts = ghosts
+        self.root = None
+        self.planned = None
+
+        # Pellet bit, points and whether it is a power pellet, per tile
+        self.pelletBits = {}
+        for i, pellet in enumerate(pellets.pelletList):
+            tile = self.model.tile(pellet.position.x, pellet.position.y)
+            self.pelletBits[tile] = (1 << i, pellet.points, pellet.name == POWERPELLET)
+
+    # Drops the search tree after the attached level was reset in place (see GameController.reset)
+    def restart(self):
+        self.root = None
+        self.planned = None
+
+    # Tree nodes searched per second of search time
+    def nodes_per_second(self):
+        if self.searchTime == 0:
+            return 0
+        return self.nodes / self.searchTime
+
+    # Called by Pac-Man every frame in place of the keyboard.
+    # Searches once each time Pac-Man heads for a new node and repeats the choice in between.
+    def get_direction(self, pacman):
+        if not pacman.alive or self.model is None:
+            return STOP
+        planned = (pacman.node, pacman.target, pacman.direction)
+        if planned != self.planned:
+            self.planned = planned
+            self.decision = self.search(pacman)
+        return self.decision
+
+    # Runs the search from the current game state and returns the chosen direction
+    def search(self, pacman):
+        start = time.perf_counter()
+        deadline = start + self.budget / 1000.0
+        self.model.refresh()
+        state = self.capture(pacman)
+        key = (self.heading(state), state.direction)
+
+        # Reuse the subtree of the last move if the game went where the search expected
+        if self.root is None or self.root.key != key:
+            self.root = SearchNode(key, self.actions(state))
+
+        root = self.root
+        if len(root.untried) + len(root.children) > 1:
+            while time.perf_counter() < deadline:
+                self.iterate(root, state)
+
+        self.searches += 1
+        self.searchTime += time.perf_counter() - start
+
+        if not root.children:
+            return root.untried[0] if root.untried else pacman.direction
+        action = max(root.children, key=lambda a: root.children[a].visits)
+        self.root = root.children[action]
+        return action
+
+    # Builds a search state from the live game
+    def capture(self, pacman):
+        model = self.model
+        pellets = 0
+        for pellet in self.pellets.pelletList:
+            tile = model.tile(pellet.position.x, pellet.position.y)
+            if tile in self.pelletBits:
+                pellets |= self.pelletBits[tile][0]
+
+        # Steps per second at Pac-Man's speed, to convert the freight timer
+        rate = pacman.speed / TILEWIDTH
+        freight = 0
+        ghosts = []
+        for ghost in self.ghosts:
+            mode = ghost.mode.current
+            corner = ghost.scatter_goal().as_tuple()
+            goal = None
+            if mode is FREIGHT:
+                freight = max(freight, int(ghost.mode.timers.remaining(ghost.mode.timer) * rate))
+                goal = ghost.goal.as_tuple()
+            ghosts.append((model.locate(ghost), ghost.direction, mode, ghost.name, corner, goal))
+
+        return SearchState(model.locate(pacman), pacman.direction, pellets, tuple(ghosts), freight)
+
+    # Node tile Pac-Man reaches next by going straight on (his tile if already on a node)
+    def heading(self, state):
+        tile = state.pacman
+        ahead = self.model.ahead
+        while tile not in self.model.nodeTiles and (tile, state.direction) in ahead:
+            tile = ahead[(tile, state.direction)]
+        return tile
+
+    # Directions Pac-Man can choose for the decision at hand.
+    # Between nodes, turning back happens straight away rather than at the next node.
+    def actions(self, state):
+        tile = self.heading(state)
+        actions = list(self.model.exits.get((self.model.portals.get(tile, tile), PACMAN), []))
+        if state.pacman != tile and -state.direction not in actions:
+            actions.append(-state.direction)
+        return actions
+
+    # One search iteration: select down the tree with UCT, expand one child,
+    # play out randomly up to the horizon and back up the result
+    def iterate(self, root, rootstate):
+        state = rootstate.clone()
+        node = root
+        path = [root]
+        total = 0
+        while state.alive and state.pellets and not node.untried and node.children:
+            action, node = self.select(node)
+            total += self.advance(state, action)
+            path.append(node)
+
+        if state.alive and state.pellets and node.untried and state.steps < self.horizon:
+            action = node.untried.pop(self.random.randrange(len(node.untried)))
+            total += self.advance(state, action)
+            child = SearchNode((self.heading(state), state.direction), self.actions(state))
+            node.children[action] = child
+            path.append(child)
+
+        total += self.rollout(state)
+        value = total / self.scale
+        for node in path:
+            node.visits += 1
+            node.value += value
+        self.nodes += 1
+
+    # UCT: the child with the best mean value plus a bonus for rarely tried actions
+    def select(self, node):
+        logvisits = math.log(node.visits)
+        best, bestScore = None, None
+        for action, child in node.children.items():
+            score = child.value / child.visits + self.exploration * math.sqrt(logvisits / child.visits)
+            if bestScore is None or score > bestScore:
+                best, bestScore = action, score
+        return best, node.children[best]
+
+    # Random playout (never turning back unless forced) until the horizon
+    def rollout(self, state):
+        total = 0
+        while state.alive and state.pellets and state.steps < self.horizon:
+            actions = self.actions(state)
+            forward = [action for action in actions if action != -state.direction]
+            if forward:
+                actions = forward
+            total += self.advance(state, actions[self.random.randrange(len(actions))])
+        return total
+
+    # Plays one decision: turn back at once, or go on to the next node and leave it
+    # in the chosen direction. Stops after the first step of the new edge, which is
+    # where the game asks for the next decision. Returns the points scored.
+    def advance(self, state, action):
+        total = 0
+        if state.pacman in self.model.nodeTiles or action != -state.direction:
+            while state.alive and state.pacman not in self.model.nodeTiles:
+                total += self.step(state)
+            if not state.alive or not state.pellets:
+                return total
+            tile = self.model.portals.get(state.pacman, state.pacman)
+            if action not in self.model.exits.get((tile, PACMAN), []):
+                return total + self.step(state)
+        state.direction = action
+        return total + self.step(state)
+
+    # Moves everything one tile (frightened ghosts every other step) and resolves
+    # pellets and collisions. Returns the points scored.
+    def step(self, state):
+        model = self.model
+        ahead = model.ahead
+        positions = model.positions
+        total = 0
+        state.steps += 1
+        self.steps += 1
+
+        previous = state.pacman
+        tile = model.portals.get(previous, previous)
+        if (tile, state.direction) in ahead:
+            tile = ahead[(tile, state.direction)]
+        state.pacman = tile
+
+        if tile in self.pelletBits:
+            bit, points, power = self.pelletBits[tile]
+            if state.pellets & bit:
+                state.pellets &= ~bit
+                total += points
+                if power:
+                    state.freight = self.freight_steps()
+                    state.ghosts = tuple(self.frighten(state, g) for g in state.ghosts)
+                if not state.pellets:
+                    return total + self.clearBonus
+
+        ghosts = []
+        for ghost in state.ghosts:
+            gtile, direction, mode, name, corner, goal = ghost
+            if mode is SPAWN:
+                ghosts.append(ghost)
+                continue
+            gprevious = gtile
+            if mode is not FREIGHT or state.steps % 2 == 0:
+                if gtile in model.nodeTiles:
+                    gtile = model.portals.get(gtile, gtile)
+                    directions = model.turns.get((gtile, name, direction), [-direction])
+                    if mode is FREIGHT:
+                        gx, gy = goal
+                    elif mode is SCATTER:
+                        gx, gy = corner
+                    else:
+                        gx, gy = self.chase_goal(state, name, corner)
+                    best = None
+                    for d in directions:
+                        if (gtile, d) in ahead:
+                            x, y = positions[ahead[(gtile, d)]]
+                            distance = (x - gx) ** 2 + (y - gy) ** 2
+                            if best is None or distance < best:
+                                best, direction = distance, d
+                if (gtile, direction) in ahead:
+                    gtile = ahead[(gtile, direction)]
+
+            # Same tile, or passing each other on the way
+            if gtile == tile or (gtile == previous and gprevious == tile):
+                if mode is FREIGHT:
+                    total += self.ghostPoints
+                    mode = SPAWN
+                else:
+                    state.alive = False
+                    return total + self.deathPenalty * self.discount ** state.steps
+            ghosts.append((gtile, direction, mode, name, corner, goal))
+        state.ghosts = tuple(ghosts)
+
+        if state.freight:
+            state.freight -= 1
+            if not state.freight:
+                state.ghosts = tuple((g[0], g[1], CHASE if g[2] is FREIGHT else g[2], g[3], g[4], None)
+                                     for g in state.ghosts)
+        return total
+
+    # A ghost after a power pellet. Frightened ghosts keep steering for the goal they had
+    # (start_freight sets Ghost.directionMethod, which Entity.update never reads, so they do
+    # not move randomly; GhostEngine does the same).
+    def frighten(self, state, ghost):
+        tile, direction, mode, name, corner, goal = ghost
+        if mode is SPAWN or mode is FREIGHT:
+            return ghost
+        goal = corner if mode is SCATTER else self.chase_goal(state, name, corner)
+        return tile, direction, FREIGHT, name, corner, goal
+
+    # Pixel position a ghost chases, following the chase rules of the ghosts in ghosts.py
+    def chase_goal(self, state, name, corner):
+        px, py = self.model.positions[state.pacman]
+        if name == BLINKY:
+            return px, py
+        dx, dy = DIRECTIONVECTORS[state.direction]
+        if name == INKY:
+            bx, by = px, py
+            for ghost in state.ghosts:
+                if ghost[3] == BLINKY:
+                    bx, by = self.model.positions[ghost[0]]
+            x, y = px + dx * TILEWIDTH * 2, py + dy * TILEWIDTH * 2
+            return bx + (x - bx) * 2, by + (y - by) * 2
+        if name == CLYDE:
+            for ghost in state.ghosts:
+                if ghost[3] == CLYDE:
+                    x, y = self.model.positions[ghost[0]]
+                    if (x - px) ** 2 + (y - py) ** 2 <= (TILEWIDTH * 8) ** 2:
+                        return corner
+        return px + dx * TILEWIDTH * 4, py + dy * TILEWIDTH * 4
+
+    # Freight duration in steps
+    def freight_steps(self):
+        ghost = self.ghosts.ghosts[0]
+        return int(ghost.mode.freightTime * ghost.pacman.speed / TILEWIDTH)
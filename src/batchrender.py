@@ -0,0 +1,275 @@
+import pygame
+from pygame.locals import *
+import numpy as np
+from constants import *
+from pellets import Pellet
+from sprites import CHUNKSIZE
+
+
+# Pixel data of one surface as NumPy arrays, ready to be stamped into a frame.
+# rgb is (height, width, 3) and alpha is (height, width) with 0 meaning transparent.
+class SpriteArray(object):
+    def __init__(self, surface):
+        self.rgb = pygame.surfarray.array3d(surface).transpose(1, 0, 2).astype(np.int16)
+        if surface.get_flags() & SRCALPHA:
+            self.alpha = pygame.surfarray.array_alpha(surface).transpose(1, 0).astype(np.int16)
+        elif surface.get_colorkey() is not None:
+            self.alpha = pygame.surfarray.array_colorkey(surface).transpose(1, 0).astype(np.int16)
+        else:
+            self.alpha = np.full(self.rgb.shape[:2], 255, dtype=np.int16)
+        self.height, self.width = self.alpha.shape
+
+        # Fully opaque sprites (colorkey sprites, pixel fonts) can be copied instead of blended
+        self.opaque = bool(np.isin(self.alpha, (0, 255)).all())
+        self.mask = self.alpha == 255
+        self.rgb8 = self.rgb.astype(np.uint8)
+
+
+# Renders many game states into one preallocated (B, H, W, 3) uint8 array.
+# Produces the same pixels as GameController.render_game at full scale by stamping
+# cached sprite arrays instead of blitting through pygame. With scale > 1 the frames are
+# box-downscaled by that integer factor.
+# Mazes larger than the screen are drawn through the game's viewport, which is moved to
+# follow Pac-Man as render_game moves it, from the background chunks in view.
+# Pac-Man and the ghosts are drawn game.alpha of the way through their last tick, as
+# render_game draws them between simulation ticks.
+class BatchRenderer(object):
+    def __init__(self, batchsize, scale=1):
+        self.batchsize = batchsize
+        self.scale = scale
+        self.shape = (batchsize, SCREENHEIGHT // scale, SCREENWIDTH // scale, 3)
+
+        # Full resolution scratch frames, and row and block sums (only needed when downscaling)
+        self.frames = None
+        self.rowsums = None
+        self.sums = None
+        if scale != 1:
+            self.frames = np.zeros((batchsize, SCREENHEIGHT, SCREENWIDTH, 3), dtype=np.uint8)
+            dtype = np.uint16 if scale <= 16 else np.uint32
+            self.rowsums = np.zeros((batchsize, self.shape[1], self.shape[2] * scale, 3), dtype=dtype)
+            self.sums = np.zeros(self.shape, dtype=dtype)
+
+        # Sprite arrays keyed by surface; cleared if it grows past maxsprites
+        self.sprites = {}
+        self.maxsprites = 4096
+
+        # Background (and background chunk) arrays keyed by surface; cleared if it grows
+        # past maxbackgrounds
+        self.backgrounds = {}
+        self.maxbackgrounds = 256
+
+        # Pellet stamps keyed by (radius, color): (row offsets, col offsets, color)
+        self.stamps = {}
+
+        # Reference pellet providing the radius and color of regular pellets
+        self.pellet = Pellet(0, 0)
+
+    # Allocates an output array of the right shape for render
+    def create_buffer(self):
+        return np.zeros(self.shape, dtype=np.uint8)
+
+    # Returns the cached pixel arrays for a surface
+    def get_sprite(self, surface):
+        sprite = self.sprites.get(surface)
+        if sprite is None:
+            if len(self.sprites) >= self.maxsprites:
+                self.sprites.clear()
+            sprite = SpriteArray(surface)
+            self.sprites[surface] = sprite
+        return sprite
+
+    # Returns the cached (H, W, 3) array of a background surface
+    def get_background(self, surface):
+        background = self.backgrounds.get(surface)
+        if background is None:
+            if len(self.backgrounds) >= self.maxbackgrounds:
+                self.backgrounds.clear()
+            background = pygame.surfarray.array3d(surface).transpose(1, 0, 2).copy()
+            self.backgrounds[surface] = background
+        return background
+
+    # Returns the pixel offsets pygame.draw.circle covers for a radius, relative to the center
+    def get_stamp(self, radius, color):
+        key = (radius, color)
+        stamp = self.stamps.get(key)
+        if stamp is None:
+            size = 2 * radius + 3
+            surface = pygame.Surface((size, size))
+            surface.fill(BLACK)
+            pygame.draw.circle(surface, WHITE, (size // 2, size // 2), radius)
+            covered = pygame.surfarray.array2d(surface).transpose(1, 0) != 0
+            rows, cols = np.nonzero(covered)
+            stamp = (rows - size // 2, cols - size // 2, np.array(color, dtype=np.uint8))
+            self.stamps[key] = stamp
+        return stamp
+
+    # Copies an opaque (H, W, 3) array into a frame at (x, y), clipping at the frame edges
+    def paste(self, frame, array, x, y):
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + array.shape[1], SCREENWIDTH), min(y + array.shape[0], SCREENHEIGHT)
+        if x0 < x1 and y0 < y1:
+            frame[y0:y1, x0:x1] = array[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    # Maze pixel drawn at the top-left corner of the frame: the viewport position (after
+    # following Pac-Man the way render_game does), or (0, 0) for mazes that fit on the screen
+    def follow(self, game):
+        if game.viewport is None:
+            return 0, 0
+        game.viewport.follow(game.pacman.interpolated(game.alpha))
+        return game.viewport.x, game.viewport.y
+
+    # Draws the maze background of one game, as a whole surface or the chunks in view
+    def render_background(self, frame, game, x, y):
+        if game.viewport is None:
+            frame[...] = self.get_background(game.background)
+            return
+        frame[...] = 0
+        width = CHUNKSIZE * TILEWIDTH
+        height = CHUNKSIZE * TILEHEIGHT
+        background = game.background
+        for col, row in background.visible(game.viewport):
+            chunk = background.mazesprites.get_chunk(background.y, col, row)
+            self.paste(frame, self.get_background(chunk), col * width - x, row * height - y)
+
+    # Draws a surface into a frame at (x, y), clipping at the frame edges
+    def blit(self, frame, surface, x, y):
+        sprite = self.get_sprite(surface)
+        x, y = int(x), int(y)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite.width, SCREENWIDTH), min(y + sprite.height, SCREENHEIGHT)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        region = frame[y0:y1, x0:x1]
+        mask = sprite.mask[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        if sprite.opaque:
+            region[mask] = sprite.rgb8[sy:sy + y1 - y0, sx:sx + x1 - x0][mask]
+        else:
+            src = sprite.rgb[sy:sy + y1 - y0, sx:sx + x1 - x0]
+            alpha = sprite.alpha[sy:sy + y1 - y0, sx:sx + x1 - x0, None]
+            dst = region.astype(np.int16)
+            region[...] = ((((src - dst) * alpha + src) >> 8) + dst).astype(np.uint8)
+
+    # Draws the pellets of every game in the batch, offsets holding each game's follow position.
+    # Regular pellets are read from each group's tile grid (the part in view) and written for
+    # the whole batch at once; power pellets are few and flash individually, so they are
+    # stamped one by one.
+    def render_pellets(self, frames, games, offsets):
+        indices = [i for i, game in enumerate(games) if game.game_initialized]
+        if not indices:
+            return
+        batches, centers = [], []
+        for i in indices:
+            x, y = offsets[i]
+            top, left = y // TILEHEIGHT, x // TILEWIDTH
+            grid = games[i].pellets.grid[top:top + SCREENHEIGHT // TILEHEIGHT + 1, left:left + SCREENWIDTH // TILEWIDTH + 1]
+            rows, cols = np.nonzero(grid == PELLET)
+            batches.append(np.full(len(rows), i))
+            centers.append(((rows + top) * TILEHEIGHT + TILEHEIGHT // 2 - y,
+                            (cols + left) * TILEWIDTH + TILEWIDTH // 2 - x))
+        batch = np.concatenate(batches)
+        if len(batch):
+            drows, dcols, rgb = self.get_stamp(self.pellet.radius, self.pellet.color)
+            batch = np.repeat(batch, len(drows))
+            rows = np.concatenate([rows for rows, _ in centers])
+            cols = np.concatenate([cols for _, cols in centers])
+            rows = (rows[:, None] + drows[None, :]).ravel()
+            cols = (cols[:, None] + dcols[None, :]).ravel()
+            inside = (rows >= 0) & (rows < SCREENHEIGHT) & (cols >= 0) & (cols < SCREENWIDTH)
+            frames[batch[inside], rows[inside], cols[inside]] = rgb
+
+        for i in indices:
+            x, y = offsets[i]
+            for powerpellet in games[i].pellets.powerpellets:
+                if powerpellet.visible and games[i].pellets.grid[powerpellet.row, powerpellet.column]:
+                    drows, dcols, rgb = self.get_stamp(powerpellet.radius, powerpellet.color)
+                    row = int(powerpellet.position.y - y + TILEHEIGHT / 2)
+                    col = int(powerpellet.position.x - x + TILEWIDTH / 2)
+                    rows, cols = drows + row, dcols + col
+                    inside = (rows >= 0) & (rows < SCREENHEIGHT) & (cols >= 0) & (cols < SCREENWIDTH)
+                    frames[i, rows[inside], cols[inside]] = rgb
+
+    # Draws an entity's sprite the same way Entity.render does, with (x, y) the maze pixel
+    # at the top-left corner of the frame and alpha the fraction of its last update to draw
+    def render_entity(self, frame, entity, x, y, alpha=1):
+        if entity.visible and entity.image is not None:
+            position = entity.interpolated(alpha)
+            self.blit(frame, entity.image, position.x - x - TILEWIDTH / 2, position.y - y - TILEHEIGHT / 2)
+
+    # Draws a text label (or the glyphs of a GlyphText), offset by (x, y) like render_entity
+    def render_text(self, frame, text, x=0, y=0):
+        if text.visible:
+            if isinstance(text.label, list):
+                for glyph, (gx, gy) in text.label:
+                    self.blit(frame, glyph, gx, gy)
+            else:
+                self.blit(frame, text.label, text.position.x - x, text.position.y - y)
+
+    # Draws everything above the pellets for one game, mirroring GameController.render_game,
+    # with (x, y) the maze pixel at the top-left corner of the frame and alpha how far the
+    # game is into its next tick
+    def render_sprites(self, frame, game, x, y, alpha=1):
+        if game.fruit is not None:
+            self.render_entity(frame, game.fruit, x, y)
+
+        self.render_entity(frame, game.pacman, x, y, alpha)
+        for ghost in game.ghosts:
+            self.render_entity(frame, ghost, x, y, alpha)
+
+        # Status messages stay put, score popups are placed in the maze
+        for id, text in game.textgroup.alltext.items():
+            if id in (READYTXT, PAUSETXT, GAMEOVERTXT):
+                self.render_text(frame, text)
+            else:
+                self.render_text(frame, text, x, y)
+        for text in game.textgroup.hudtext.values():
+            self.render_text(frame, text)
+
+        for i, image in enumerate(game.lifesprites.images):
+            self.blit(frame, image, image.get_width() * i, SCREENHEIGHT - image.get_height())
+
+        for i, image in enumerate(game.fruitCaptured):
+            self.blit(frame, image, SCREENWIDTH - image.get_width() * (i + 1), SCREENHEIGHT - image.get_height())
+
+    # Renders up to batchsize game states into out (allocated if None) and returns it
+    def render(self, games, out=None):
+        if len(games) > self.batchsize:
+            raise ValueError("%d games do not fit a batch of %d" % (len(games), self.batchsize))
+        if out is None:
+            out = self.create_buffer()
+        frames = out if self.frames is None else self.frames
+        offsets = []
+        for i, game in enumerate(games):
+            if game.game_initialized:
+                offsets.append(self.follow(game))
+                self.render_background(frames[i], game, *offsets[i])
+            else:
+                offsets.append((0, 0))
+                frames[i] = 0
+        self.render_pellets(frames, games, offsets)
+        for i, game in enumerate(games):
+            if game.game_initialized:
+                self.render_sprites(frames[i], game, offsets[i][0], offsets[i][1], game.alpha)
+
+        if self.frames is not None:
+            self.downscale(frames, out, len(games))
+        return out
+
+    # Box-downscales the first n frames into out: each output pixel is the rounded average
+    # of a scale x scale block, summed in integers a whole row of pixels at a time, then a
+    # column of the row sums at a time
+    def downscale(self, frames, out, n):
+        k = self.scale
+        h, w = self.shape[1], self.shape[2]
+        rowsums = self.rowsums[:n]
+        rowsums[...] = frames[:n, 0:h * k:k, :w * k]
+        for dy in range(1, k):
+            rowsums += frames[:n, dy:h * k:k, :w * k]
+        blocks = rowsums.reshape(n, h, w, k, 3)
+        sums = self.sums[:n]
+        sums[...] = blocks[:, :, :, 0]
+        for dx in range(1, k):
+            sums += blocks[:, :, :, dx]
+        sums += k * k // 2
+        sums //= k * k
+        out[:n] = sums
@@ -48,6 +48,8 @@ LEVELTXT = 1
 READYTXT = 2
 PAUSETXT = 3
 GAMEOVERTXT = 4
+SCORELABELTXT = 5
+LEVELLABELTXT = 6
 
 # Base path for correctly reading files
 base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -6,19 +6,25 @@ from random import randint
 
 # Base class for all movable characters in the game (e.g., Pac-Man, ghosts).
 # Manages movement across the maze, rendering, and basic AI direction logic.
+# Entities are slotted (subclasses declare the attributes they add), as stress runs
+# and training workers hold many of them.
 class Entity(object):
+    __slots__ = ("name", "image", "direction", "speed", "radius", "color", "collideRadius", "visible",
+                 "disablePortal", "goal", "direction_method", "lastPosition", "node", "startNode",
+                 "target", "position")
+
+    # Movement vectors for each direction, shared by every entity
+    directions = {
+        UP: Vector2(0, -1),
+        DOWN: Vector2(0, 1),
+        LEFT: Vector2(-1, 0),
+        RIGHT: Vector2(1, 0),
+        STOP: Vector2()}
+
     def __init__(self, node):
         self.name = None
         self.image = None
 
-        # Define movement vectors for each direction
-        self.directions = {
-            UP: Vector2(0, -1),
-            DOWN: Vector2(0, 1),
-            LEFT: Vector2(-1, 0),
-            RIGHT: Vector2(1, 0),
-            STOP: Vector2()}
-
         # Initial movement direction and speed
         self.direction = STOP
         self.set_speed(100)
@@ -40,6 +46,10 @@ class Entity(object):
         # Direction decision logic (default is random)
         self.direction_method = self.goal_direction
 
+        # Position at the start of the last update (None after a jump), so collisions can
+        # be checked along the whole path moved rather than at the end position only
+        self.lastPosition = None
+
         # Initialize position and node tracking
         self.set_start_node(node)
 
@@ -49,6 +59,7 @@ class Entity(object):
         self.startNode = node
         self.target = node
         self.set_position()
+        self.lastPosition = None
 
     # Fully resets the entity to its original state.
     def reset(self):
@@ -70,6 +81,7 @@ class Entity(object):
 
     # Update entity position and handle target transitions each frame.
     def update(self, dt):
+        self.lastPosition = self.position.copy()
         self.position += self.directions[self.direction] * self.speed * dt
 
         if self.overshot_target():
@@ -84,6 +96,7 @@ class Entity(object):
             # Handle teleportation through portal nodes
             if not self.disablePortal and self.node.neighbors[PORTAL] is not None:
                 self.node = self.node.neighbors[PORTAL]
+                self.lastPosition = None
 
             # Set next target node and direction
             self.target = self.get_new_target(direction)
@@ -168,12 +181,26 @@ class Entity(object):
         index = distances.index(min(distances))
         return directions[index]
 
-    # Renders the entity's sprite or fallback debug circle
-    def render(self, screen):
+    # Position to draw at alpha of the way from the start to the end of the last update
+    # (1 draws the current position). Jumps (portals, resets) are never interpolated.
+    def interpolated(self, alpha):
+        if alpha >= 1 or self.lastPosition is None:
+            return self.position
+        return self.lastPosition + (self.position - self.lastPosition) * alpha
+
+    # Renders the entity's sprite or fallback debug circle, alpha of the way through its
+    # last update (see interpolated) when frames are drawn between simulation ticks.
+    # With a viewport (mazes larger than the screen), entities out of view are skipped.
+    def render(self, screen, viewport=None, alpha=1):
         if self.visible:
+            position = self.interpolated(alpha)
+            if viewport is not None:
+                if not viewport.shows(position, 2 * TILEWIDTH):
+                    return
+                position = viewport.to_screen(position)
             if self.image is not None:
                 adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-                p = self.position - adjust
+                p = position - adjust
                 screen.blit(self.image, p.as_tuple())
             else:
-                pygame.draw.circle(screen, self.color, self.position.as_int(), self.radius)
+                pygame.draw.circle(screen, self.color, position.as_int(), self.radius)
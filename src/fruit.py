@@ -1,11 +1,16 @@
 from entity import Entity
 from constants import *
 from sprites import FruitSprites
+from scheduler import Scheduler
 
 # Represents the bonus fruit that appears temporarily in the maze.
 # Inherits basic position and rendering logic from Entity.
+# Its lifespan is registered with the given scheduler (or a private one that update advances).
+# Fruit are pooled by the GameController: setup places a used fruit again.
 class Fruit(Entity):
-    def __init__(self, node, level=0):
+    __slots__ = ("sprites", "lifespan", "ownsTimers", "timers", "timer", "destroy", "points")
+
+    def __init__(self, node, level=0, timers=None):
         Entity.__init__(self, node)
         self.name = FRUIT
 
@@ -17,7 +22,16 @@ class Fruit(Entity):
 
         # Seconds the fruit remains active on screen
         self.lifespan = 10
-        self.timer = 0
+        self.ownsTimers = timers is None
+        self.timers = Scheduler() if timers is None else timers
+        self.setup(node, level)
+
+    # (Re)initializes the fruit at a node for a level, with a full lifespan
+    def setup(self, node, level=0):
+        self.set_start_node(node)
+        self.visible = True
+        self.image = self.sprites.get_start_image(level % len(self.sprites.fruits))
+        self.timer = self.timers.schedule(self.lifespan, self.expire)
 
         # Flag indicating if the fruit should disappear
         self.destroy = False
@@ -28,10 +42,16 @@ class Fruit(Entity):
         # By default, the fruit is placed in-between nodes, typically at an intersection
         self.set_between_nodes(RIGHT)
 
-    # Updates the fruit's internal timer each frame.
-    # If its lifespan expires, it sets itself to be removed from the game.
+    # Only needed without a shared scheduler: advances the private one.
     def update(self, dt):
-        self.timer += dt
-        if self.timer >= self.lifespan:
-            # Mark fruit for removal after time expires
-            self.destroy = True
+        if self.ownsTimers:
+            self.timers.advance(dt)
+
+    # Stops the lifespan timer of a fruit taken out of the maze early (eaten or reset)
+    def release(self):
+        self.timers.cancel(self.timer)
+        self.timer = None
+
+    # Called when the lifespan expires: mark fruit for removal
+    def expire(self):
+        self.destroy = True
@@ -0,0 +1,263 @@
+import numpy as np
+from constants import *
+from vector import Vector2
+
+
+# Directions in neighbor-column order, and their unit vectors
+DIRECTIONS = np.array([UP, DOWN, LEFT, RIGHT])
+VECTORS = np.array([[0, -1], [0, 1], [-1, 0], [1, 0]], dtype=float)
+
+# Neighbor column and unit vector per direction value, indexed by direction + 2
+# (RIGHT, DOWN, STOP, UP, LEFT); STOP has no column
+COLUMNS = np.array([3, 1, -1, 0, 2])
+DIRECTIONVECTORS = np.array([[1, 0], [0, 1], [0, 0], [0, -1], [-1, 0]], dtype=float)
+
+
+# Structure-of-arrays ghost movement for large ghost counts.
+# Positions, nodes, directions, speeds, modes and goals of every ghost live in NumPy
+# arrays and one vectorized pass per update moves all ghosts and picks new directions
+# for those that reached a node, following the same rules as Ghost.update with greedy
+# targeting. Mode changes stay with each ghost's ModeController.
+# The Ghost objects are views: store copies the arrays back into them (positions,
+# nodes, directions, goals and sprite images) for rendering and game logic, and load
+# reads them again after they were moved from outside (e.g. a reset).
+# Ghosts stay filed in the group's spatial hash: after each update only the ghosts that
+# crossed into another tile are moved to another bucket, and collision checks look at the
+# buckets around Pac-Man.
+class GhostEngine(object):
+    def __init__(self, ghosts, blinky, spatialhash):
+        self.ghosts = ghosts
+        self.spatialhash = spatialhash
+        self.blinkyIndex = ghosts.index(blinky)
+        self.pacman = blinky.pacman
+        count = len(ghosts)
+
+        # Node graph reachable from the ghosts, as arrays
+        self.nodes = []
+        self.nodeIndex = {}
+        for ghost in ghosts:
+            for node in [ghost.node, ghost.target, ghost.startNode, ghost.spawnNode, ghost.homeNode]:
+                self.add_nodes(node)
+        self.nodePositions = np.array([node.position.as_tuple() for node in self.nodes], dtype=float)
+        self.neighbors = np.array([[self.index(node.neighbors[d]) for d in DIRECTIONS] for node in self.nodes])
+        self.portals = np.array([self.index(node.neighbors[PORTAL]) for node in self.nodes])
+
+        # NodeGroup the nodes belong to, whose accessVersion the access table was built for
+        self.group = ghosts[0].node.group
+
+        # Which entity names may leave each node in each direction: [node, column, name]
+        self.access = None
+        self.version = None
+
+        # Fixed per ghost: name, scatter corner, spawn node, and how many tiles ahead of
+        # Pac-Man it aims when chasing
+        self.names = np.array([ghost.name for ghost in ghosts])
+        self.corners = np.array([ghost.scatter_goal().as_tuple() for ghost in ghosts], dtype=float)
+        self.spawns = np.array([self.nodeIndex[ghost.spawnNode] for ghost in ghosts])
+        self.leads = np.select([self.names == PINKY, self.names == CLYDE], [4, 4], 0).astype(float)
+        self.isInky = self.names == INKY
+        self.isClyde = self.names == CLYDE
+
+        # Movement state
+        self.positions = np.zeros((count, 2))
+        self.lastPositions = np.zeros((count, 2))
+        self.hasLast = np.zeros(count, dtype=bool)
+        self.node = np.zeros(count, dtype=int)
+        self.target = np.zeros(count, dtype=int)
+        self.direction = np.zeros(count, dtype=int)
+        self.goals = np.zeros((count, 2))
+
+        # Row of each ghost, and the tile each is filed under in the spatial hash
+        self.rows = {ghost: i for i, ghost in enumerate(ghosts)}
+        self.tiles = np.zeros((count, 2), dtype=int)
+
+        # True when the Ghost objects are behind the arrays
+        self.stale = False
+        self.load()
+
+    # Adds a node and everything connected to it
+    def add_nodes(self, start):
+        pending = [start]
+        while pending:
+            node = pending.pop()
+            if node is None or node in self.nodeIndex:
+                continue
+            self.nodeIndex[node] = len(self.nodes)
+            self.nodes.append(node)
+            pending.extend(node.neighbors.values())
+
+    def index(self, node):
+        return -1 if node is None else self.nodeIndex[node]
+
+    # Rebuilds the access table if any node's access rules changed
+    def refresh_access(self):
+        if self.version == self.group.accessVersion:
+            return
+        self.version = self.group.accessVersion
+        self.access = np.zeros((len(self.nodes), 4, FRUIT + 1), dtype=bool)
+        for i, node in enumerate(self.nodes):
+            for column, direction in enumerate(DIRECTIONS):
+                for name in node.access[direction]:
+                    self.access[i, column, name] = True
+
+    # Reads the movement state of every ghost from the Ghost objects
+    def load(self):
+        for i, ghost in enumerate(self.ghosts):
+            self.positions[i] = ghost.position.as_tuple()
+            self.hasLast[i] = ghost.lastPosition is not None
+            if ghost.lastPosition is not None:
+                self.lastPositions[i] = ghost.lastPosition.as_tuple()
+            self.node[i] = self.nodeIndex[ghost.node]
+            self.target[i] = self.nodeIndex[ghost.target]
+            self.direction[i] = ghost.direction
+            self.goals[i] = ghost.goal.as_tuple()
+        self.stale = False
+        self.file(np.arange(len(self.ghosts)))
+
+    # Writes the arrays back into the Ghost objects
+    def store(self):
+        self.store_rows(np.arange(len(self.ghosts)))
+        self.stale = False
+
+    def store_rows(self, rows):
+        rows = np.asarray(rows, dtype=int)
+        positions = self.positions[rows].tolist()
+        lastPositions = self.lastPositions[rows].tolist()
+        goals = self.goals[rows].tolist()
+        state = zip(rows.tolist(), positions, lastPositions, self.hasLast[rows].tolist(),
+                    self.node[rows].tolist(), self.target[rows].tolist(), self.direction[rows].tolist(), goals)
+        for i, position, lastPosition, hasLast, node, target, direction, goal in state:
+            ghost = self.ghosts[i]
+            ghost.position = Vector2(*position)
+            ghost.lastPosition = Vector2(*lastPosition) if hasLast else None
+            ghost.node = self.nodes[node]
+            ghost.target = self.nodes[target]
+            ghost.direction = direction
+            ghost.goal = Vector2(*goal)
+            ghost.sprites.update(0)
+
+    def update(self, dt):
+        ghosts = self.ghosts
+        count = len(ghosts)
+        speeds = np.fromiter((ghost.speed for ghost in ghosts), dtype=float, count=count)
+        modes = np.fromiter((ghost.mode.current for ghost in ghosts), dtype=int, count=count)
+
+        # Ghosts back at their spawn node leave spawn mode (ModeController.update)
+        for i in np.nonzero((modes == SPAWN) & (self.node == self.spawns))[0]:
+            self.store_rows([i])
+            ghosts[i].mode.update(dt)
+            speeds[i] = ghosts[i].speed
+            modes[i] = ghosts[i].mode.current
+
+        self.update_goals(modes)
+
+        # Move along the current edge
+        self.lastPositions[:] = self.positions
+        self.hasLast[:] = True
+        self.positions += DIRECTIONVECTORS[self.direction + 2] * speeds[:, None] * dt
+
+        # Ghosts that reached or passed their target node choose where to go next.
+        # Blinky goes first: Inky aims off where Blinky ended up.
+        start = self.nodePositions[self.node]
+        edge = self.nodePositions[self.target] - start
+        moved = self.positions - start
+        arrived = (moved ** 2).sum(axis=1) >= (edge ** 2).sum(axis=1)
+        if arrived.any():
+            self.refresh_access()
+        if arrived[self.blinkyIndex]:
+            arrived[self.blinkyIndex] = False
+            self.turn(np.array([self.blinkyIndex]))
+        self.update_inky(modes)
+        rows = np.nonzero(arrived)[0]
+        if rows.size:
+            self.turn(rows)
+        self.stale = True
+
+        # Re-file the ghosts that crossed into another tile, and widen queries by the
+        # furthest any ghost moved (SpatialHash.update)
+        moved = np.abs(self.positions - self.lastPositions).sum(axis=1)[self.hasLast]
+        self.spatialhash.reach = moved.max() if moved.size else 0
+        self.file(np.nonzero((self.tile_keys() != self.tiles).any(axis=1))[0])
+
+    # Tile nearest to each ghost's position (SpatialHash.key)
+    def tile_keys(self):
+        return np.floor(self.positions / (TILEWIDTH, TILEHEIGHT) + 0.5).astype(int)
+
+    # Files the given ghosts in the spatial hash under their current tiles
+    def file(self, rows):
+        keys = self.tile_keys()[rows]
+        self.tiles[rows] = keys
+        for i, key in zip(rows.tolist(), keys.tolist()):
+            self.spatialhash.file(self.ghosts[i], tuple(key))
+
+    # Goals per mode, as set by Ghost.scatter, chase and spawn (frightened ghosts keep
+    # theirs). Inky's chase goal comes later from update_inky.
+    def update_goals(self, modes):
+        pacman = np.array(self.pacman.position.as_tuple())
+        heading = DIRECTIONVECTORS[self.pacman.direction + 2] * TILEWIDTH
+        chase = pacman + heading * self.leads[:, None]
+
+        # Clyde retreats to his corner when within 8 tiles of Pac-Man
+        near = self.isClyde & (((pacman - self.positions) ** 2).sum(axis=1) <= (TILEWIDTH * 8) ** 2)
+        chase[near] = self.corners[near]
+
+        scattering = modes == SCATTER
+        chasing = (modes == CHASE) & ~self.isInky
+        spawning = modes == SPAWN
+        self.goals[scattering] = self.corners[scattering]
+        self.goals[chasing] = chase[chasing]
+        self.goals[spawning] = self.nodePositions[self.spawns[spawning]]
+
+    # Inky doubles the vector from Blinky to two tiles ahead of Pac-Man
+    def update_inky(self, modes):
+        chasing = self.isInky & (modes == CHASE)
+        if chasing.any():
+            pacman = np.array(self.pacman.position.as_tuple())
+            heading = DIRECTIONVECTORS[self.pacman.direction + 2] * TILEWIDTH
+            blinky = self.positions[self.blinkyIndex]
+            self.goals[chasing] = blinky + (pacman + heading * 2 - blinky) * 2
+
+    # Whether each ghost may leave the given nodes in the given directions
+    def can_move(self, node, direction, names):
+        column = COLUMNS[direction + 2]
+        safe = np.maximum(column, 0)
+        allowed = (column >= 0) & (self.neighbors[node, safe] >= 0) & self.access[node, safe, names]
+        return allowed, self.neighbors[node, safe]
+
+    # Entity.update's decision at a node, for the given ghosts
+    def turn(self, rows):
+        node = self.target[rows]
+        direction = self.direction[rows]
+        names = self.names[rows]
+
+        # Allowed directions, never straight back unless there is no other way
+        valid = (self.neighbors[node] >= 0) & self.access[node[:, None], np.arange(4), names[:, None]]
+        valid &= DIRECTIONS[None, :] != -direction[:, None]
+        stuck = ~valid.any(axis=1)
+
+        # Greedy targeting: the direction whose next tile is closest to the goal
+        probes = self.nodePositions[node][:, None, :] + VECTORS[None, :, :] * TILEWIDTH
+        distances = ((probes - self.goals[rows][:, None, :]) ** 2).sum(axis=2)
+        distances[~valid] = np.inf
+        choice = np.where(stuck, -direction, DIRECTIONS[distances.argmin(axis=1)])
+
+        # Portals move the ghost before it sets off
+        portal = self.portals[node]
+        jumped = portal >= 0
+        node = np.where(jumped, portal, node)
+
+        allowed, following = self.can_move(node, choice, names)
+        keep, ahead = self.can_move(node, direction, names)
+        self.target[rows] = np.where(allowed, following, np.where(keep, ahead, node))
+        self.direction[rows] = np.where(allowed, choice, direction)
+        self.node[rows] = node
+        self.positions[rows] = self.nodePositions[node]
+        self.hasLast[rows] &= ~jumped
+
+    # Ghosts the spatial hash finds near the entity's path (a superset for the exact
+    # collision test), in group order and brought up to date
+    def nearby(self, entity, margin):
+        rows = sorted(self.rows[ghost] for ghost in self.spatialhash.nearby(entity, margin))
+        if self.stale:
+            self.store_rows(rows)
+        return [self.ghosts[i] for i in rows]
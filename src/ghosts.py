@@ -1,15 +1,21 @@
 from vector import Vector2
 from constants import *
 from entity import Entity
-from modes import ModeController
+from modes import ModeController, MainMode
 from sprites import GhostSprites
+from targeting import GreedyTargeting
+from spatialhash import SpatialHash
+from ghostengine import GhostEngine
 
 
 # Represents a ghost entity in the game.
 # Inherits basic movement behavior from Entity and adds AI decision-making
 # through modes based on the ModeController.
 class Ghost(Entity):
-    def __init__(self, node, pacman=None, blinky=None):
+    __slots__ = ("sprites", "points", "directionMethod", "targeting", "pacman", "mode", "modeListener",
+                 "homeNode", "blinky", "spawnNode", "mazeSize")
+
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
         super().__init__(node)
         self.name = GHOST
 
@@ -22,12 +28,17 @@ class Ghost(Entity):
         # Ghosts use goal-based AI instead of random movement
         self.directionMethod = self.goal_direction
 
+        # Strategy that turns the goal into a direction at each node
+        self.targeting = GreedyTargeting()
+
         # Reference to Pac-Man for chase mode
         self.pacman = pacman
 
-        # Controls modes
-        self.mode = ModeController(self)
-        self.last_mode = self.mode.current
+        # Controls modes (scatter/chase timing comes from the shared main mode if given)
+        self.mode = ModeController(self, mainmode)
+
+        # Optional callback run after every freight/spawn/normal mode transition
+        self.modeListener = None
 
         # Starting position of the ghost
         self.homeNode = node
@@ -35,23 +46,31 @@ class Ghost(Entity):
         # Optional reference to Blinky (used by Inky)
         self.blinky = blinky
 
+        # Width and height of the maze in pixels, whose corners the ghosts scatter to
+        self.mazeSize = (TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
+
     # Resets the ghost to its default behavior and appearance after level restart.
     def reset(self):
         Entity.reset(self)
         self.points = 200
         self.directionMethod = self.goal_direction
 
-    # Chooses the direction that brings the ghost closest to its current goal.
-    # Compares squared distances to avoid expensive square roots.
+    # Puts the ghost back as it was when placed at the start of the level: on its start
+    # node, following the main mode, with its first sprite
+    def restart(self):
+        self.reset()
+        self.goal = Vector2()
+        self.mode.restart()
+        self.image = self.sprites.get_start_image()
+
+    # Chooses the direction that brings the ghost closer to its current goal,
+    # as decided by the ghost's targeting strategy.
     def goal_direction(self, directions):
-        distances = []
-        for direction in directions:
-            vec = self.node.position + self.directions[direction] * TILEWIDTH - self.goal
-            distances.append(vec.magnitude_squared())
+        return self.targeting.choose(self, directions)
 
-        # Choose the direction that minimizes distance to the goal
-        index = distances.index(min(distances))
-        return directions[index]
+    # Swaps the targeting strategy (e.g. GreedyTargeting or AStarTargeting)
+    def set_targeting(self, targeting):
+        self.targeting = targeting
 
     # Called every frame to update ghost logic, animation, and movement.
     # Applies AI mode logic before standard position update.
@@ -61,11 +80,6 @@ class Ghost(Entity):
         # Handle timing and transitions between modes
         self.mode.update(dt)
 
-        # Stop eyes sound when ghost leaves spawn mode
-        if self.last_mode == SPAWN and self.mode.current != SPAWN:
-            if hasattr(self, "sound_manager") and self.sound_manager:
-                self.sound_manager.stop_looping("eyes")
-
         if self.mode.current is SCATTER:
             self.scatter()
         elif self.mode.current is CHASE:
@@ -73,11 +87,19 @@ class Ghost(Entity):
 
         # Apply standard movement logic from Entity
         super().update(dt)
-        self.last_mode = self.mode.current
+
+    # Notifies the mode listener (if any) that this ghost changed mode
+    def mode_changed(self):
+        if self.modeListener is not None:
+            self.modeListener()
 
     # Scatter mode: ghost retreats to its corner or default location.
     def scatter(self):
-        self.goal = Vector2()
+        self.goal = self.scatter_goal()
+
+    # The corner scatter heads for, without changing the ghost
+    def scatter_goal(self):
+        return Vector2()
 
     # Chase mode: ghost actively pursues Pac-Man's current position.
     def chase(self):
@@ -89,12 +111,14 @@ class Ghost(Entity):
         if self.mode.current == FREIGHT:
             self.set_speed(50)
             self.directionMethod = self.random_direction
+            self.mode_changed()
 
     # Return to normal speed and chasing logic after freight ends
     def normal_mode(self):
         self.set_speed(100)
         self.directionMethod = self.goal_direction
         self.homeNode.deny_access(DOWN, self)
+        self.mode_changed()
 
     # Target the spawn location (used after being eaten)
     def spawn(self):
@@ -111,12 +135,15 @@ class Ghost(Entity):
             self.set_speed(150)
             self.directionMethod = self.goal_direction
             self.spawn()
+            self.mode_changed()
 
 
 # Blinky always targets Pac-Man directly during chase
 class Blinky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    __slots__ = ()
+
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = BLINKY
         self.color = RED
         self.sprites = GhostSprites(self)
@@ -124,14 +151,16 @@ class Blinky(Ghost):
 
 # Pinky targets 4 tiles ahead of Pac-Man
 class Pinky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    __slots__ = ()
+
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = PINKY
         self.color = PINK
         self.sprites = GhostSprites(self)
 
-    def scatter(self):
-        self.goal = Vector2(TILEWIDTH*NCOLS, 0)
+    def scatter_goal(self):
+        return Vector2(self.mazeSize[0], 0)
 
     def chase(self):
         self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
@@ -139,14 +168,16 @@ class Pinky(Ghost):
 
 # Inky uses a vector from Blinky to a point 2 tiles ahead of Pac-Man, then doubles it
 class Inky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    __slots__ = ()
+
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = INKY
         self.color = TEAL
         self.sprites = GhostSprites(self)
 
-    def scatter(self):
-        self.goal = Vector2(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
+    def scatter_goal(self):
+        return Vector2(*self.mazeSize)
 
     def chase(self):
         vec1 = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 2
@@ -156,14 +187,16 @@ class Inky(Ghost):
 
 # Clyde chases Pac-Man unless he’s close, then runs to the corner
 class Clyde(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    __slots__ = ()
+
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = CLYDE
         self.color = ORANGE
         self.sprites = GhostSprites(self)
 
-    def scatter(self):
-        self.goal = Vector2(0, TILEHEIGHT*NROWS)
+    def scatter_goal(self):
+        return Vector2(0, self.mazeSize[1])
 
     def chase(self):
         d = self.pacman.position - self.position
@@ -174,21 +207,75 @@ class Clyde(Ghost):
             self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
 
 
-# Manages all four ghosts and their collective behavior
+# Manages all four ghosts and their collective behavior.
+# Owns the level's scatter/chase timer, which every ghost subscribes to.
+# Mode timers are registered with the given scheduler (or a private one the group advances).
+# extra adds that many more ghosts (cycling Blinky, Pinky, Inky, Clyde) for stress testing.
+# mazesize is the maze's (width, height) in pixels (MazeSprites.size), for the scatter
+# corners; it defaults to the screen size.
+# Ghosts are filed in a spatial hash as they move, so collision checks only look at
+# the ghosts near Pac-Man. Large groups move through GhostEngine instead, which keeps
+# them filed in the same hash.
 class GhostGroup(object):
-    def __init__(self, node, pacman):
-        self.blinky = Blinky(node, pacman)
-        self.pinky = Pinky(node, pacman)
-        self.inky = Inky(node, pacman, self.blinky)
-        self.clyde = Clyde(node, pacman)
+    def __init__(self, node, pacman, level=0, timers=None, extra=0, mazesize=None):
+        self.mainmode = MainMode(level, timers)
+        self.blinky = Blinky(node, pacman, mainmode=self.mainmode)
+        self.pinky = Pinky(node, pacman, mainmode=self.mainmode)
+        self.inky = Inky(node, pacman, self.blinky, mainmode=self.mainmode)
+        self.clyde = Clyde(node, pacman, mainmode=self.mainmode)
         self.ghosts = [self.blinky, self.pinky, self.inky, self.clyde]
 
+        kinds = [Blinky, Pinky, Inky, Clyde]
+        for i in range(extra):
+            self.ghosts.append(kinds[i % len(kinds)](node, pacman, self.blinky, mainmode=self.mainmode))
+        if mazesize is not None:
+            for ghost in self.ghosts:
+                ghost.mazeSize = mazesize
+
+        # Position in self.ghosts, to report nearby ghosts in the usual order
+        self.order = {ghost: i for i, ghost in enumerate(self.ghosts)}
+        self.spatialhash = SpatialHash()
+
+        # From this many ghosts on, movement runs in one vectorized pass over all of them
+        # (as long as they all use greedy targeting); the Ghost objects are then brought up
+        # to date whenever they are looked at
+        self.vectorizeAt = 64
+        self.engine = None
+
     def __iter__(self):
+        if self.engine is not None and self.engine.stale:
+            self.engine.store()
         return iter(self.ghosts)
 
     def update(self, dt):
+        self.mainmode.update(dt)
+        if self.engine is None and self.vectorized():
+            self.engine = GhostEngine(self.ghosts, self.blinky, self.spatialhash)
+        if self.engine is not None:
+            self.engine.update(dt)
+            return
+
+        self.spatialhash.reach = 0
         for ghost in self:
             ghost.update(dt)
+            self.spatialhash.update(ghost)
+
+    # Ghosts that may touch the given entity (Pac-Man) along the paths moved in the last
+    # update, in group order. Relies on update having filed every ghost since it was placed.
+    def nearby(self, entity):
+        # All ghosts share the same collision radius
+        margin = entity.collideRadius + self.blinky.collideRadius
+        if self.engine is not None:
+            return self.engine.nearby(entity, margin)
+        ghosts = self.spatialhash.nearby(entity, margin)
+        ghosts.sort(key=self.order.get)
+        return ghosts
+
+    # Whether the vectorized engine can move these ghosts
+    def vectorized(self):
+        if len(self.ghosts) < self.vectorizeAt:
+            return False
+        return all(type(ghost.targeting) is GreedyTargeting for ghost in self.ghosts)
 
     def start_freight(self):
         for ghost in self:
@@ -199,6 +286,12 @@ class GhostGroup(object):
         for ghost in self:
             ghost.set_spawn_node(node)
 
+    # Gives every ghost the same targeting strategy
+    def set_targeting(self, targeting):
+        for ghost in self:
+            ghost.set_targeting(targeting)
+        self.engine = None
+
     def update_points(self):
         for ghost in self:
             # Each successive ghost is worth double
@@ -211,6 +304,19 @@ class GhostGroup(object):
     def reset(self):
         for ghost in self:
             ghost.reset()
+        if self.engine is not None:
+            self.engine.load()
+
+    # Puts the group back as a new group for the level would be, reusing every ghost:
+    # a new scatter/chase timer, every ghost restarted and nothing filed in the spatial hash
+    # (the engine, if running, files the ghosts again where they restarted)
+    def restart(self, level):
+        self.mainmode.restart(level)
+        for ghost in self.ghosts:
+            ghost.restart()
+        self.spatialhash.clear()
+        if self.engine is not None:
+            self.engine.load()
 
     def hide(self):
         for ghost in self:
@@ -220,6 +326,16 @@ class GhostGroup(object):
         for ghost in self:
             ghost.visible = True
 
-    def render(self, screen):
+    # Returns the background loop matching the ghosts' modes:
+    # eyes while any ghost returns home, freight while any is frightened, siren otherwise.
+    def background_sound(self):
+        modes = [ghost.mode.current for ghost in self]
+        if SPAWN in modes:
+            return "eyes"
+        if FREIGHT in modes:
+            return "freight"
+        return "siren"
+
+    def render(self, screen, viewport=None, alpha=1):
         for ghost in self:
-            ghost.render(screen)
+            ghost.render(screen, viewport, alpha)
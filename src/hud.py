@@ -0,0 +1,62 @@
+import pygame
+from pygame.locals import *
+from constants import *
+
+
+# Pre-composed layer for the parts of the screen that rarely change:
+# the score and level captions and values, remaining lives and captured fruit.
+# The layer is only redrawn when one of those changes, so a steady-state frame costs a single blit.
+class HUD(object):
+    def __init__(self, textgroup, lifesprites):
+        self.textgroup = textgroup
+        self.lifesprites = lifesprites
+
+        # Full-screen layer whose empty areas are a run-length encoded colorkey, which makes
+        # blitting them nearly free. This works because the game font renders without partial
+        # alpha and the sprites use a colorkey, so nothing blends against the key color.
+        # The elements are drawn onto a plain canvas first and copied into the layer.
+        # Both are created by the first compose and redrawn in place after that, so games
+        # that are never drawn (headless runs) do not hold screen-sized surfaces.
+        self.keycolor = (255, 0, 255)
+        self.canvas = None
+        self.surface = None
+
+        # State the layer was last composed from
+        self.key = None
+
+    # Recomposes the layer if the score, level, lives or captured fruit changed
+    def update(self, fruitCaptured):
+        key = (self.textgroup.get_hud_text(SCORETXT), self.textgroup.get_hud_text(LEVELTXT),
+               len(self.lifesprites.images), tuple(fruitCaptured))
+        if key != self.key:
+            self.key = key
+            self.compose(fruitCaptured)
+
+    # Redraws every HUD element. Every blit onto an RLE surface decodes and re-encodes all
+    # of it (about 0.5ms each), so the elements are drawn onto the plain canvas and the
+    # layer takes them in a single blit, encoded again on its next blit to the screen.
+    def compose(self, fruitCaptured):
+        if self.canvas is None:
+            self.canvas = pygame.Surface(SCREENSIZE).convert()
+            self.surface = pygame.Surface(SCREENSIZE).convert()
+            self.surface.set_colorkey(self.keycolor, RLEACCEL)
+
+        canvas = self.canvas
+        canvas.fill(self.keycolor)
+        self.textgroup.render_hud(canvas)
+
+        for i, image in enumerate(self.lifesprites.images):
+            x = image.get_width() * i
+            y = SCREENHEIGHT - image.get_height()
+            canvas.blit(image, (x, y))
+
+        for i, image in enumerate(fruitCaptured):
+            x = SCREENWIDTH - image.get_width() * (i + 1)
+            y = SCREENHEIGHT - image.get_height()
+            canvas.blit(image, (x, y))
+
+        self.surface.blit(canvas, (0, 0))
+
+    # Draws the layer to the screen
+    def render(self, screen):
+        screen.blit(self.surface, (0, 0))
@@ -0,0 +1,108 @@
+import time
+from collections import deque
+from pygame.locals import *
+from constants import *
+
+# Direction of each steering key (arrow keys and WASD)
+KEYDIRECTIONS = {
+    K_UP: UP, K_w: UP,
+    K_DOWN: DOWN, K_s: DOWN,
+    K_LEFT: LEFT, K_a: LEFT,
+    K_RIGHT: RIGHT, K_d: RIGHT
+}
+
+
+# Steers Pac-Man from direction key presses and releases, queued with the time they
+# happened, instead of from the keys held down when he updates. Attach it to Pac-Man as a
+# controller; the GameController feeds it keyboard events, and agents or replays can feed
+# it through press and release.
+#
+# Every press is seen, however short: the latest press is buffered until Pac-Man acts on it
+# (a turn at the next node, or a reversal straight away) or has reached the next node without
+# being able to take it (a pre-turn). Without a buffered press, the most recently pressed
+# key still held steers, as holding a key always did.
+#
+# Event times are perf_counter seconds (pygame events carry none, so keyboard events are
+# stamped as the event loop drains them). They give the latency of every press Pac-Man
+# takes: the time from the press to the update that turned him.
+class InputQueue(object):
+    def __init__(self):
+        # Presses and releases Pac-Man has not seen yet: (time, direction, pressed)
+        self.events = deque()
+
+        # Direction keys held down, most recently pressed last
+        self.held = []
+
+        # Buffered press: its direction, when it happened, and the node Pac-Man was at when
+        # he first saw it (None until then)
+        self.pending = None
+        self.pendingTime = None
+        self.pendingNode = None
+
+        # When Pac-Man last asked for a direction, and the seconds from each of the latest
+        # presses he took to the update that took it
+        self.lastUpdate = None
+        self.latencies = deque(maxlen=256)
+
+    # Queues a pygame event if it is a direction key press or release; returns whether it was
+    def handle_event(self, event):
+        if event.type == KEYDOWN or event.type == KEYUP:
+            direction = KEYDIRECTIONS.get(event.key)
+            if direction is not None:
+                self.push(direction, event.type == KEYDOWN)
+                return True
+        return False
+
+    # Queues a press or release of a direction, at time seconds (perf_counter; now by default)
+    def push(self, direction, pressed, time=None):
+        self.events.append((time if time is not None else self.now(), direction, pressed))
+
+    def press(self, direction, time=None):
+        self.push(direction, True, time)
+
+    def release(self, direction, time=None):
+        self.push(direction, False, time)
+
+    def now(self):
+        return time.perf_counter()
+
+    # Forgets the buffered press (a new level or life starts); keys still held keep steering
+    def flush(self):
+        self.drain()
+        self.pending = None
+
+    # Applies the queued events to the held keys and the buffered press
+    def drain(self):
+        while self.events:
+            when, direction, pressed = self.events.popleft()
+            if direction in self.held:
+                self.held.remove(direction)
+            if pressed:
+                self.held.append(direction)
+                self.pending = direction
+                self.pendingTime = when
+                self.pendingNode = None
+
+    # Called by Pac-Man every update: the direction he should take
+    def get_direction(self, pacman):
+        now = self.now()
+        self.drain()
+        if self.pending is not None:
+            if self.pendingNode is None:
+                self.pendingNode = pacman.node
+                if pacman.direction == self.pending:
+                    # Already heading that way, nothing to take
+                    self.pending = None
+            elif pacman.direction == self.pending:
+                # Taken in the last update
+                self.latencies.append(self.lastUpdate - self.pendingTime)
+                self.pending = None
+            elif pacman.node is not self.pendingNode or pacman.target is pacman.node:
+                # Pac-Man got to a node (or stood on one) since the press and could not take it
+                self.pending = None
+        self.lastUpdate = now
+        if self.pending is not None:
+            return self.pending
+        if self.held:
+            return self.held[-1]
+        return STOP
@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from constants import *
+from levelpack import LevelPack
+from nodes import NodeGroup
+from pellets import PelletGroup
+from sprites import MazeSprites, ChunkedBackground
+from viewport import Viewport
+
+
+# Everything start_game needs from a level's maze: the maze config, its sprites, node
+# graph, pellets and start nodes, with the backgrounds the level opens on already built.
+class Level(object):
+    def __init__(self, number, maze):
+        self.number = number
+        self.maze = maze
+
+        # Level pack the level came from (None if it was built from the text files,
+        # in which case the access rules still have to be applied)
+        self.pack = None
+
+        self.mazesprites = None
+        self.nodes = None
+        self.pellets = None
+
+        # Nodes where each entity starts (MazeBase.start_tiles keys)
+        self.startNodes = {}
+
+        # Background chunks in view at the start of a maze larger than the screen, as
+        # (palette row, chunk column, chunk row, surface); added to the chunk cache on use
+        self.chunks = []
+
+
+# Builds levels, from compiled level packs (see mazecompiler.py) when present and up to
+# date or else from the maze text files. prefetch starts building a level on a worker
+# thread, e.g. during the level-clear pause, and take hands it over once it is needed.
+# Worker results only touch the shared caches that are safe to fill from another thread;
+# background chunks are handed over and cached by take, on the main thread.
+class LevelLoader(object):
+    # Level packs mapped by any loader, keyed by file path, oldest use first; at most
+    # packCapacity are kept and the others closed (see LevelPack.close). packLock guards
+    # the cache and the building of levels from its packs, so no pack is closed mid-build.
+    packs = OrderedDict()
+    packCapacity = 8
+    packLock = threading.RLock()
+
+    def __init__(self, mazedata):
+        self.mazedata = mazedata
+
+        # Use level packs when present
+        self.usePacks = True
+
+        # One worker, and the level it is building: (level number, future)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    # Returns the compiled level pack for a maze, or None if there is no up to date one.
+    # Packs are memory mapped the first time they are needed and then kept, closing the
+    # least recently used one when there are more than packCapacity.
+    def get_level_pack(self, maze):
+        if not self.usePacks:
+            return None
+        path = maze.pack_file()
+        with self.packLock:
+            pack = self.packs.get(path)
+            if pack is None:
+                if not os.path.exists(path):
+                    return None
+                pack = LevelPack(path)
+                self.packs[path] = pack
+                if len(self.packs) > self.packCapacity:
+                    self.packs.popitem(last=False)[1].close()
+            else:
+                self.packs.move_to_end(path)
+            return pack if pack.matches(maze) else None
+
+    # Closes every mapped pack; they are mapped again when next needed
+    def close_packs(self):
+        with self.packLock:
+            while self.packs:
+                self.packs.popitem(last=False)[1].close()
+
+    # Starts building a level in the background (replacing any other level being built)
+    def prefetch(self, number):
+        if self.pending is None or self.pending[0] != number:
+            self.pending = (number, self.executor.submit(self.load, number))
+
+    # Returns a level, waiting for the worker if it is building that level and building
+    # it right away otherwise
+    def take(self, number):
+        pending, self.pending = self.pending, None
+        if pending is not None and pending[0] == number:
+            level = pending[1].result()
+        else:
+            level = self.load(number)
+        for y, col, row, chunk in level.chunks:
+            level.mazesprites.keep_chunk(y, col, row, chunk)
+        return level
+
+    # Builds a level
+    def load(self, number):
+        maze = self.mazedata.get_maze(number)
+        level = Level(number, maze)
+        with self.packLock:
+            level.pack = self.get_level_pack(maze)
+            if level.pack is not None:
+                # Everything comes ready from the pack, with all access rules applied
+                level.mazesprites = level.pack.mazesprites(maze)
+                level.nodes = level.pack.nodes()
+                level.pellets = level.pack.pellets()
+                level.startNodes = level.pack.starts(level.nodes)
+        if level.pack is None:
+            self.load_files(level)
+        self.build_backgrounds(level)
+        return level
+
+    # Builds the maze sprites, node graph and pellets of a level from its text files
+    def load_files(self, level):
+        maze = level.maze
+        mazepath = maze.maze_file()
+        level.mazesprites = MazeSprites(mazepath, maze.rotation_file())
+
+        # Load maze layout and create graph of nodes
+        level.nodes = NodeGroup(mazepath)
+
+        # Link left and right edge nodes as teleport portals
+        maze.set_portal_pairs(level.nodes)
+
+        # Create and connect nodes for the ghost house in the maze
+        maze.connect_home_nodes(level.nodes)
+
+        # Load pellets based on maze layout
+        level.pellets = PelletGroup(mazepath)
+        level.startNodes = {name: level.nodes.get_node_from_tiles(*tile) for name, tile in maze.start_tiles().items()}
+
+    # Builds the backgrounds shown first (palette rows as in GameController.set_background):
+    # the normal and flashing backgrounds, or the chunks around Pac-Man's start
+    def build_backgrounds(self, level):
+        mazesprites = level.mazesprites
+        if not mazesprites.scrolls():
+            mazesprites.get_background(level.number % 5)
+            mazesprites.get_background(5)
+            return
+
+        viewport = Viewport(*mazesprites.size())
+        viewport.follow(level.startNodes["pacman"].position)
+        for col, row in ChunkedBackground(mazesprites, level.number % 5).visible(viewport):
+            if not mazesprites.has_chunk(level.number % 5, col, row):
+                level.chunks.append((level.number % 5, col, row, mazesprites.build_chunk(level.number % 5, col, row)))
@@ -0,0 +1,90 @@
+import json
+import mmap
+import struct
+import numpy as np
+from constants import *
+from nodes import NodeGroup
+from pellets import PelletGroup
+from sprites import MazeSprites
+
+# Bumped whenever the pack contents or the rules baked into them change
+PACKVERSION = 1
+
+# File signature
+PACKMAGIC = b"PACLEVEL"
+
+# Arrays start on multiples of this many bytes
+PACKALIGN = 64
+
+
+# A compiled level (see mazecompiler.py): one file holding everything start_game builds
+# from a maze's text files and MazeBase config, ready to use without parsing anything.
+#   layout, rotations  maze layout and wall rotation grids (bytes)
+#   positions, neighbors, access, home  the node graph with portals, the ghost house and
+#       all access rules applied (NodeGroup.to_arrays)
+#   pellets  tile grid of PELLET / POWERPELLET values
+#   backgrounds  RGB pixels of the finished background for each palette row (mazes that
+#       fit on the screen only)
+#   starts  node index where each entity starts (MazeBase.start_tiles keys)
+# The file is PACKMAGIC, the length of a JSON header, the header, then the raw arrays from
+# the next multiple of PACKALIGN bytes (offsets in the header count from there). It is
+# memory mapped: the arrays are views of the mapping, so opening a pack reads nothing
+# until it is used.
+class LevelPack(object):
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(PACKMAGIC)] != PACKMAGIC:
+            raise ValueError("%s is not a level pack" % path)
+        start = len(PACKMAGIC) + 4
+        length, = struct.unpack("<I", self.map[len(PACKMAGIC):start])
+        self.header = json.loads(self.map[start:start + length].decode("utf-8"))
+
+        base = -(-(start + length) // PACKALIGN) * PACKALIGN
+        self.arrays = {}
+        for name, (dtype, shape, offset) in self.header["arrays"].items():
+            count = int(np.prod(shape))
+            self.arrays[name] = np.frombuffer(self.map, dtype=dtype, count=count, offset=base + offset).reshape(shape)
+
+    # True if the pack was compiled from the maze as it is now (same files, config and tile size)
+    def matches(self, maze):
+        try:
+            fingerprint = maze.fingerprint()
+        except OSError:
+            return False
+        return self.header["version"] == PACKVERSION and self.header["fingerprint"] == fingerprint
+
+    def grid(self, name):
+        return self.arrays[name].astype('<U1')
+
+    def mazesprites(self, maze):
+        prebuilt = self.arrays.get("backgrounds")
+        return MazeSprites(maze.maze_file(), maze.rotation_file(), self.grid("layout"), self.grid("rotations"), prebuilt)
+
+    def nodes(self):
+        nodes = NodeGroup(None)
+        nodes.load_arrays(self.arrays["positions"], self.arrays["neighbors"], self.arrays["access"], self.header["home"])
+        return nodes
+
+    def pellets(self):
+        pellets = PelletGroup(None)
+        pellets.load_grid(self.arrays["pellets"])
+        return pellets
+
+    # Start nodes by MazeBase.start_tiles key, from the nodes this pack built
+    def starts(self, nodes):
+        nodelist = list(nodes.nodesLUT.values())
+        return {name: nodelist[i] if i >= 0 else None for name, i in self.header["starts"].items()}
+
+    # Stops using the mapping. It is unmapped now, or if MazeSprites made from the pack still
+    # hold its prebuilt backgrounds (views of the mapping, read as they are needed), once the
+    # last of them is gone.
+    def close(self):
+        self.arrays = {}
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass
+            self.map = None
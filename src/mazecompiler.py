@@ -0,0 +1,89 @@
+import argparse
+import json
+import struct
+import numpy as np
+import pygame
+from constants import *
+from levelpack import PACKVERSION, PACKMAGIC, PACKALIGN
+from run import GameController
+
+
+# Compiles the mazes of the level rotation into level packs (see levelpack.py), written
+# next to each maze's text files. Each level is set up by a GameController from the text
+# files exactly as in play, and the result is stored: the node graph after the portal,
+# ghost house and access rules, the pellets, start nodes and finished backgrounds.
+# The game uses a pack from then on, until the maze's files or config change.
+class MazeCompiler(object):
+    def __init__(self, mazes=None):
+        self.game = GameController(audio=False, mazes=mazes)
+        self.game.loader.usePacks = False
+
+    # Compiles every maze in the rotation and returns the paths of the packs
+    def compile_all(self):
+        return [self.compile(level) for level in range(len(self.game.mazedata.mazedict))]
+
+    # Compiles the maze shown at a level and returns the path of its pack
+    def compile(self, level):
+        game = self.game
+        game.level = level
+        game.start_game()
+        maze = game.mazedata.obj
+        mazesprites = game.mazesprites
+
+        positions, neighbors, access, home = game.nodes.to_arrays()
+        nodelist = list(game.nodes.nodesLUT.values())
+        starts = {name: nodelist.index(node) if node is not None else -1 for name, node in game.startNodes.items()}
+        arrays = {
+            "layout": mazesprites.data.astype('S1'),
+            "rotations": mazesprites.rotdata.astype('S1'),
+            "positions": positions,
+            "neighbors": neighbors,
+            "access": access,
+            "pellets": game.pellets.grid
+        }
+
+        # Backgrounds of mazes larger than the screen are built in chunks while playing instead
+        if not mazesprites.scrolls():
+            width, height = mazesprites.size()
+            backgrounds = [pygame.image.tobytes(mazesprites.get_background(y), "RGB") for y in range(6)]
+            arrays["backgrounds"] = np.frombuffer(b"".join(backgrounds), dtype=np.uint8).reshape(6, height, width, 3)
+
+        header = {"version": PACKVERSION, "fingerprint": maze.fingerprint(), "home": home, "starts": starts}
+        path = maze.pack_file()
+        self.write(path, header, arrays)
+        return path
+
+    # Writes a pack file (format described at LevelPack). The file is replaced in one step,
+    # so a running game never maps a half-written pack.
+    def write(self, path, header, arrays):
+        table = {}
+        offset = 0
+        for name, array in arrays.items():
+            table[name] = [array.dtype.str, list(array.shape), offset]
+            offset += -(-array.nbytes // PACKALIGN) * PACKALIGN
+        text = json.dumps(dict(header, arrays=table)).encode("utf-8")
+        base = -(-(len(PACKMAGIC) + 4 + len(text)) // PACKALIGN) * PACKALIGN
+
+        temppath = path + ".tmp"
+        with open(temppath, "wb") as f:
+            f.write(PACKMAGIC + struct.pack("<I", len(text)) + text)
+            for name, array in arrays.items():
+                f.write(b"\0" * (base + table[name][2] - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temppath, path)
+
+
+# Compiles the built-in mazes (or the generated mazes in a directory):
+#   python src/mazecompiler.py [--mazes DIR]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mazes", metavar="DIR",
+                        help="compile the generated mazes in DIR (see mazegen.py) instead of the built-in ones")
+    args = parser.parse_args()
+
+    # No window or sound is needed to build the levels
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    compiler = MazeCompiler(args.mazes)
+    for path in compiler.compile_all():
+        print("%s (%d KB)" % (path, os.path.getsize(path) // 1024))
@@ -1,14 +1,52 @@
+import functools
+import numpy as np
 from constants import *
 
 # Base class defining shared maze configuration logic for all levels
 class MazeBase(object):
     def __init__(self):
+        # Directory holding the layout (<name>.txt) and rotation (<name>_rotation.txt) files
+        self.mazedir = os.path.join(base_path, "assets", "mazes")
         self.portalPairs = {}
         self.homeoffset = (0, 0)
         self.ghostNodeDeny = {
             UP:(), DOWN:(), LEFT:(), RIGHT:()
         }
 
+    # Paths of the layout and rotation files
+    def maze_file(self):
+        return os.path.join(self.mazedir, self.name + ".txt")
+
+    def rotation_file(self):
+        return os.path.join(self.mazedir, self.name + "_rotation.txt")
+
+    # Path of the compiled level pack (see mazecompiler.py)
+    def pack_file(self):
+        return os.path.join(self.mazedir, self.name + ".pack")
+
+    # What a compiled level pack for this maze depends on: the config, the tile size and the
+    # sizes and modification times of the layout and rotation files
+    def fingerprint(self):
+        config = [self.name, sorted(self.portalPairs.items()), self.homeoffset, self.homenodeconnectLeft,
+                  self.homenodeconnectRight, self.pacmanStart, self.fruitStart, sorted(self.ghostNodeDeny.items())]
+        files = []
+        for path in [self.maze_file(), self.rotation_file()]:
+            stat = os.stat(path)
+            files.append([stat.st_size, stat.st_mtime_ns])
+        return {"config": repr(config), "tilesize": [TILEWIDTH, TILEHEIGHT], "files": files}
+
+    # Tiles of the nodes where Pac-Man, the ghosts and the fruit start, and ghosts respawn
+    def start_tiles(self):
+        return {
+            "pacman": self.pacmanStart,
+            "blinky": self.add_offset(2, 0),
+            "pinky": self.add_offset(2, 3),
+            "inky": self.add_offset(0, 3),
+            "clyde": self.add_offset(4, 3),
+            "spawn": self.add_offset(2, 3),
+            "fruit": self.fruitStart
+        }
+
     # Links portal node pairs in the maze.
     # Called by the controller to activate teleportation paths.
     def set_portal_pairs(self, nodes):
@@ -49,7 +87,32 @@ class MazeData(object):
     # Loads the maze for the current level.
     # Loops through available maze layouts using modulo indexing.
     def load_maze(self, level):
-        self.obj = self.mazedict[level % len(self.mazedict)]()
+        self.obj = self.get_maze(level)
+
+    # Creates the maze object for a level without making it the current one
+    def get_maze(self, level):
+        return self.mazedict[self.index(level)]()
+
+    # Position of a level's maze in the rotation
+    def index(self, level):
+        return level % len(self.mazedict)
+
+    # Adds a maze to the end of the level rotation.
+    # factory is called with no arguments to create the maze object for a level.
+    def register(self, factory):
+        key = len(self.mazedict)
+        self.mazedict[key] = factory
+        return key
+
+    # Replaces the level rotation with the generated mazes in a directory (see mazegen.py),
+    # in file name order. Returns how many were found.
+    def load_directory(self, directory):
+        self.mazedict = {}
+        for filename in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(filename)
+            if extension == ".txt" and not name.endswith("_rotation"):
+                self.register(functools.partial(GeneratedMaze, name, directory))
+        return len(self.mazedict)
 
 
 # Maze variant 1: layout and node configuration
@@ -100,3 +163,46 @@ class Maze2(MazeBase):
             LEFT:(self.add_offset(2, 3),),
             RIGHT:(self.add_offset(2, 3),)
         }
+
+
+# Maze produced by the maze generator (mazegen.py), configured from its layout file.
+# Generated mazes put the ghost house door, the house entrance nodes, the fruit node and
+# Pac-Man's start where Maze1 has them relative to each other, so everything is found
+# from the door; portals are the rows with a node at both edges.
+class GeneratedMaze(MazeBase):
+    def __init__(self, name, mazedir):
+        super().__init__()
+        self.name = name
+        self.mazedir = mazedir
+
+        data = np.loadtxt(self.maze_file(), dtype='<U1')
+        rows, cols = data.shape
+
+        # Node symbols (as in NodeGroup)
+        nodes = np.isin(data, ['+', 'P', 'n'])
+
+        self.portalPairs = {}
+        for row in range(rows):
+            if nodes[row][0] and nodes[row][cols - 1]:
+                self.portalPairs[len(self.portalPairs)] = ((0, row), (cols - 1, row))
+
+        # Left door tile, on the top edge of the ghost house
+        doorrow, doorcol = (int(value) for value in np.argwhere(data == '=')[0])
+        self.homeoffset = (doorcol - 1.5, doorrow - 1)
+        self.homenodeconnectLeft = (doorcol - 1, doorrow - 1)
+        self.homenodeconnectRight = (doorcol + 2, doorrow - 1)
+
+        # Bottom left corner of the path around the house
+        self.fruitStart = (doorcol - 4, doorrow + 5)
+
+        # Node closest to 11 tiles below the door, right of center (Maze1: (15, 26))
+        below = np.argwhere(nodes[doorrow + 6:]) + (doorrow + 6, 0)
+        distances = ((below - (doorrow + 11, doorcol + 2)) ** 2).sum(axis=1)
+        row, col = (int(value) for value in below[distances.argmin()])
+        self.pacmanStart = (col, row)
+
+        self.ghostNodeDeny = {
+            UP: (self.homenodeconnectLeft, self.homenodeconnectRight, (doorcol - 1, row), (doorcol + 2, row)),
+            LEFT: (self.add_offset(2, 3),),
+            RIGHT: (self.add_offset(2, 3),)
+        }
@@ -0,0 +1,430 @@
+import argparse
+import heapq
+import random
+from collections import deque
+from multiprocessing import Pool
+import numpy as np
+from constants import *
+from mazedata import GeneratedMaze
+from nodes import NodeGroup
+
+# Symbols of the layout files Pac-Man and the ghosts move along (as in NodeGroup)
+NODESYMBOLS = ['+', 'P', 'n']
+PATHSYMBOLS = ['.', '-', '|', 'p']
+
+# Offsets of the four sides of a tile
+SIDES = {UP: (-1, 0), DOWN: (1, 0), LEFT: (0, -1), RIGHT: (0, 1)}
+
+
+# Picks the wall tile digit and rotation for every wall cell of a layout from the paths
+# around it, the way the hand-made mazes use the MazeSprites tiles (tile x = digit + 12,
+# rotated by 90-degree steps counterclockwise):
+#   inner walls:  3 straight, 2 outside corner, 9 inside corner
+#   outer wall:   1 straight, 0 outside corner, 6 inside corner
+#   ghost house:  5 straight, 4 outside corner
+# Outer wall cells are the ones connected to the edge of the grid; every wall cell
+# touching a path gets a tile and all others stay empty ('X').
+class WallTiler(object):
+    def __init__(self):
+        # Rotation by the side the path is on (straight pieces)
+        self.inner = {UP: 0, LEFT: 1, DOWN: 2, RIGHT: 3}
+        self.outer = {DOWN: 0, RIGHT: 1, UP: 2, LEFT: 3}
+
+        # Rotation by the two sides the paths are on (inner and house corners, outer inside corners)
+        self.corners = {frozenset((UP, LEFT)): 0, frozenset((DOWN, LEFT)): 1,
+                        frozenset((DOWN, RIGHT)): 2, frozenset((UP, RIGHT)): 3}
+
+        # Rotation by the diagonal the only nearby path is on
+        self.diagonals = {frozenset((DOWN, RIGHT)): 0, frozenset((UP, RIGHT)): 1,
+                          frozenset((UP, LEFT)): 2, frozenset((DOWN, LEFT)): 3}
+
+    # Fills in the wall cells of data (everything that is not a path, the house or a
+    # door '=') and returns the matching rotation grid. Raises ValueError for wall
+    # shapes there is no tile for (walls must be at least two tiles thick).
+    def tile(self, data, paths, house):
+        rotdata = np.full(data.shape, '.', dtype='<U1')
+        outside = self.outside(paths | house)
+        padded = np.zeros((data.shape[0] + 2, data.shape[1] + 2), dtype=bool)
+        padded[1:-1, 1:-1] = paths
+
+        for row, col in zip(*(index.tolist() for index in np.nonzero(~paths))):
+            if data[row][col] == '=':
+                continue
+            near = padded[row:row + 3, col:col + 3]
+            if not near.any():
+                data[row][col] = 'X'
+                continue
+
+            sides = [side for side, (dr, dc) in SIDES.items() if near[1 + dr][1 + dc]]
+            if house[row][col]:
+                digits, straight = '54', self.inner
+            elif outside[row][col]:
+                digits, straight = '160', self.outer
+            else:
+                digits, straight = '329', self.inner
+
+            if len(sides) == 1:
+                digit, rotation = digits[0], straight[sides[0]]
+            elif len(sides) == 2 and frozenset(sides) in self.corners:
+                digit, rotation = digits[1], self.corners[frozenset(sides)]
+            else:
+                diagonals = [frozenset((vertical, horizontal)) for vertical in (UP, DOWN) for horizontal in (LEFT, RIGHT)
+                             if near[1 + SIDES[vertical][0]][1 + SIDES[horizontal][1]]]
+                if sides or len(diagonals) != 1 or len(digits) < 3:
+                    raise ValueError("no wall tile fits at row %d, column %d" % (row, col))
+                digit, rotation = digits[2], self.diagonals[diagonals[0]]
+
+            data[row][col] = digit
+            rotdata[row][col] = str(rotation)
+        return rotdata
+
+    # Cells that are not blocked and can be reached from the edge of the grid
+    def outside(self, blocked):
+        rows, cols = blocked.shape
+        outside = np.zeros(blocked.shape, dtype=bool)
+        pending = deque()
+        for row in range(rows):
+            for col in range(cols):
+                if (row in (0, rows - 1) or col in (0, cols - 1)) and not blocked[row][col]:
+                    outside[row][col] = True
+                    pending.append((row, col))
+        while pending:
+            row, col = pending.popleft()
+            for dr, dc in SIDES.values():
+                r, c = row + dr, col + dc
+                if 0 <= r < rows and 0 <= c < cols and not blocked[r][c] and not outside[r][c]:
+                    outside[r][c] = True
+                    pending.append((r, c))
+        return outside
+
+
+# Generates random left/right symmetric mazes in the layout and rotation file formats.
+# Paths run along a lattice of rows and columns at least three tiles apart (so every wall
+# is at least two tiles thick) around a ghost house and door laid out as in Maze1, with a
+# corridor all around the edge and one or two portal rows through the sides. Starting
+# from every lattice segment, segments are removed in mirrored pairs as long as no dead
+# end appears and everything stays connected; the removed fraction is drawn from removal.
+# The same seed and size always give the same maze, so mazes can be generated in parallel.
+class MazeGenerator(object):
+    def __init__(self, cols=NCOLS, rows=NROWS, removal=(0.3, 0.45)):
+        if cols % 2 or cols < 20 or rows < 30:
+            raise ValueError("mazes need an even number of columns (at least 20) and at least 30 rows")
+        self.cols = cols
+        self.rows = rows
+        self.removal = removal
+        self.tiler = WallTiler()
+
+        # Path around the ghost house: left column, entrance column (right of it), top row
+        self.ringleft = cols // 2 - 5
+        self.entrance = cols // 2 - 2
+        self.ringtop = (rows - 8) // 2
+
+        # First and last path rows (three rows are left above for the score and two below for lives)
+        self.top = 4
+        self.bottom = rows - 4
+
+    # Name of the files generated from a seed
+    def name(self, seed):
+        return "gen%dx%d_%06d" % (self.cols, self.rows, seed)
+
+    # Writes the maze for a seed to directory and returns its name
+    def write(self, directory, seed):
+        data, rotdata = self.generate(seed)
+        name = self.name(seed)
+        for suffix, grid in [("", data), ("_rotation", rotdata)]:
+            with open(os.path.join(directory, name + suffix + ".txt"), "w") as f:
+                f.write("\n".join(" ".join(row) for row in grid.tolist()) + "\n")
+        return name
+
+    # Writes the mazes for all seeds, spread over processes (default: one per CPU)
+    def write_many(self, directory, seeds, processes=None):
+        os.makedirs(directory, exist_ok=True)
+        with Pool(processes) as pool:
+            return pool.starmap(self.write, [(directory, seed) for seed in seeds])
+
+    # Returns the layout and rotation grids for a seed
+    def generate(self, seed):
+        rng = random.Random(seed)
+        self.xs = self.lattice(rng, 1, self.ringleft) + [self.ringleft, self.entrance]
+        self.xs += [self.cols - 1 - x for x in reversed(self.xs)]
+        self.ys = (self.lattice(rng, self.top, self.ringtop) + [self.ringtop, self.ringtop + 3] +
+                   self.lattice(rng, self.ringtop + 6, self.bottom) + [self.bottom])
+        self.setup_edges()
+        self.carve(rng)
+        tunnels = sorted(rng.sample(range(1, len(self.ys) - 1), rng.choice([1, 2])))
+        return self.layout(tunnels)
+
+    # Lattice lines from start (included) to end (excluded), 3 to 5 tiles apart
+    def lattice(self, rng, start, end):
+        lines = [start]
+        while end - lines[-1] > 5:
+            gap = rng.choice([gap for gap in (3, 4, 5) if end - lines[-1] - gap not in (1, 2)])
+            lines.append(lines[-1] + gap)
+        return lines
+
+    # Lattice segments: ('h', i, j) joins points (i, j) and (i + 1, j), ('v', i, j) joins
+    # (i, j) and (i, j + 1), where i indexes self.xs and j indexes self.ys
+    def setup_edges(self):
+        nx, ny = len(self.xs), len(self.ys)
+        left = self.xs.index(self.ringleft)
+        entrance = left + 1
+        ringtop = self.ys.index(self.ringtop)
+
+        # The ghost house sits inside the ring; the ring and the edge corridor always stay
+        forbidden = {('v', entrance, ringtop), ('v', entrance, ringtop + 1),
+                     ('v', nx - 1 - entrance, ringtop), ('v', nx - 1 - entrance, ringtop + 1)}
+        forbidden |= {('h', i, ringtop + 1) for i in range(left, nx - 1 - left)}
+        self.protected = {('h', i, j) for i in range(left, nx - 1 - left) for j in (ringtop, ringtop + 2)}
+        self.protected |= {('v', i, j) for i in (left, nx - 1 - left) for j in (ringtop, ringtop + 1)}
+        self.protected |= {('h', i, j) for i in range(nx - 1) for j in (0, ny - 1)}
+        self.protected |= {('v', i, j) for i in (0, nx - 1) for j in range(ny - 1)}
+
+        self.edges = {('h', i, j) for i in range(nx - 1) for j in range(ny)}
+        self.edges |= {('v', i, j) for i in range(nx) for j in range(ny - 1)}
+        self.edges -= forbidden
+        self.degree = {(i, j): 0 for i in range(nx) for j in range(ny)}
+        for edge in self.edges:
+            for point in self.ends(edge):
+                self.degree[point] += 1
+        self.entrances = {(entrance, ringtop), (nx - 1 - entrance, ringtop)}
+
+    def ends(self, edge):
+        kind, i, j = edge
+        return ((i, j), (i + 1, j)) if kind == 'h' else ((i, j), (i, j + 1))
+
+    def mirror(self, edge):
+        kind, i, j = edge
+        last = len(self.xs) - 1
+        return (kind, last - 1 - i, j) if kind == 'h' else (kind, last - i, j)
+
+    # Segments at a lattice point
+    def point_edges(self, point):
+        i, j = point
+        edges = [('h', i - 1, j), ('h', i, j), ('v', i, j - 1), ('v', i, j)]
+        return [edge for edge in edges if edge in self.edges]
+
+    # Removes segments at random until the drawn fraction is gone or nothing more can go
+    def carve(self, rng):
+        target = int(len(self.edges) * rng.uniform(*self.removal))
+        total = len(self.edges)
+        candidates = sorted(edge for edge in self.edges if edge not in self.protected and edge <= self.mirror(edge))
+        for _ in range(3):
+            rng.shuffle(candidates)
+            for edge in candidates:
+                if total - len(self.edges) >= target:
+                    return
+                if edge in self.edges:
+                    self.remove(edge)
+
+    # Removes a segment and its mirror image, and any segment left leading into a dead end.
+    # Puts everything back (and returns False) if that leaves a dead end or cuts the paths apart.
+    def remove(self, edge):
+        removed = []
+        for candidate in {edge, self.mirror(edge)}:
+            self.take(candidate, removed)
+        for point in [point for e in removed for point in self.ends(e)]:
+            if self.degree[point] == 1:
+                for candidate in {self.point_edges(point)[0], self.mirror(self.point_edges(point)[0])}:
+                    if candidate in self.protected:
+                        self.restore(removed)
+                        return False
+                    if candidate in self.edges:
+                        self.take(candidate, removed)
+
+        points = {point for e in removed for point in self.ends(e)}
+        if any(self.degree[point] == 1 for point in points) or \
+                not all(self.reaches_edge(point) for point in points if self.degree[point]):
+            self.restore(removed)
+            return False
+        return True
+
+    def take(self, edge, removed):
+        self.edges.discard(edge)
+        removed.append(edge)
+        for point in self.ends(edge):
+            self.degree[point] -= 1
+
+    def restore(self, removed):
+        for edge in removed:
+            self.edges.add(edge)
+            for point in self.ends(edge):
+                self.degree[point] += 1
+
+    # True if the point is still connected to the corridor along the edge of the maze
+    # (searches toward the nearest side first, so this is usually quick)
+    def reaches_edge(self, start):
+        last = (len(self.xs) - 1, len(self.ys) - 1)
+        distance = lambda point: min(point[0], last[0] - point[0], point[1], last[1] - point[1])
+        pending = [(distance(start), start)]
+        seen = {start}
+        while pending:
+            steps, point = heapq.heappop(pending)
+            if steps == 0:
+                return True
+            for edge in self.point_edges(point):
+                for other in self.ends(edge):
+                    if other not in seen:
+                        seen.add(other)
+                        heapq.heappush(pending, (distance(other), other))
+        return False
+
+    # Turns the lattice into the layout and rotation grids
+    def layout(self, tunnels):
+        data = np.full((self.rows, self.cols), 'X', dtype='<U1')
+        paths = np.zeros(data.shape, dtype=bool)
+
+        # No pellets around the ghost house (as in Maze1)
+        quiet = np.zeros(data.shape, dtype=bool)
+        quiet[self.ringtop - 2:self.ringtop + 9, self.ringleft - 2:self.cols - self.ringleft + 2] = True
+
+        for edge in self.edges:
+            (i, j), (k, l) = self.ends(edge)
+            horizontal = edge[0] == 'h'
+            for row in range(self.ys[j], self.ys[l] + 1):
+                for col in range(self.xs[i], self.xs[k] + 1):
+                    paths[row][col] = True
+                    data[row][col] = ('-' if horizontal else '|') if quiet[row][col] else '.'
+
+        portals = [(self.ys[j], col) for j in tunnels for col in (0, self.cols - 1)]
+        for (i, j), degree in self.degree.items():
+            if degree == 0:
+                continue
+            edges = [edge[0] for edge in self.point_edges((i, j))]
+            exits = degree + (j in tunnels and i in (0, len(self.xs) - 1))
+            if exits > 2 or edges.count('h') == 1 or (i, j) in self.entrances:
+                data[self.ys[j]][self.xs[i]] = 'n' if quiet[self.ys[j]][self.xs[i]] else '+'
+        for row, col in portals:
+            paths[row][col] = True
+            data[row][col] = 'n'
+
+        # Power pellets near the four corners
+        for row in (self.top + 2, self.bottom - 6):
+            for col in (1, self.cols - 2):
+                data[row][col] = 'P' if data[row][col] == '+' else 'p'
+
+        # Ghost house walls with the door in the middle of the top
+        house = np.zeros(data.shape, dtype=bool)
+        house[self.ringtop + 1:self.ringtop + 6, self.ringleft + 1:self.cols - self.ringleft - 1] = True
+        data[self.ringtop + 1][self.cols // 2 - 1:self.cols // 2 + 1] = '='
+
+        rotdata = self.tiler.tile(data, paths, house)
+        return data, rotdata
+
+
+# Checks that a maze is playable: files of the same size, left/right symmetric, a ghost
+# house door and entrance nodes, portals on nodes, no dead ends, every node reachable
+# from Pac-Man's start and every pellet on a reachable path. With tiles=True (for layouts
+# the generator produced) the wall tiles must also match the paths around them.
+class MazeValidator(object):
+    def __init__(self):
+        self.tiler = WallTiler()
+
+    # Returns the problems found in a maze object (MazeBase); an empty list means it is valid
+    def check(self, maze, tiles=False):
+        problems = []
+        data = np.loadtxt(maze.maze_file(), dtype='<U1')
+        rotdata = np.loadtxt(maze.rotation_file(), dtype='<U1')
+        if data.shape != rotdata.shape:
+            return ["layout is %dx%d but rotations are %dx%d" % (data.shape + rotdata.shape)]
+        paths = np.where(np.isin(data, NODESYMBOLS + PATHSYMBOLS), data, 'X')
+        if not (paths == paths[:, ::-1]).all():
+            problems.append("paths are not symmetric")
+        if not (data == '=').any():
+            return problems + ["no ghost house door"]
+
+        if tiles:
+            problems += self.check_tiles(data, rotdata)
+        problems += self.check_graph(maze, data)
+        return problems
+
+    # Wall tiles must be what WallTiler picks for the same paths. Hand-made mazes (Maze1,
+    # Maze2) join some inner walls to the outer wall, which the generator never does, so
+    # they differ here and are not checked.
+    def check_tiles(self, data, rotdata):
+        paths = np.isin(data, NODESYMBOLS + PATHSYMBOLS)
+        doorrow, doorcol = np.argwhere(data == '=')[0]
+        house = np.zeros(data.shape, dtype=bool)
+        house[doorrow:doorrow + 5, doorcol - 3:doorcol + 5] = True
+        expected = np.where(paths | (data == '='), data, 'X')
+        try:
+            expectedrot = self.tiler.tile(expected, paths, house)
+        except ValueError as error:
+            return [str(error)]
+        wrong = np.argwhere((expected != data) | (expectedrot != rotdata))
+        return ["wrong wall tile at row %d, column %d" % (row, col) for row, col in wrong[:5]]
+
+    def check_graph(self, maze, data):
+        problems = []
+        nodes = NodeGroup(maze.maze_file())
+        for pair in maze.portalPairs.values():
+            for col, row in pair:
+                if nodes.get_node_from_tiles(col, row) is None:
+                    problems.append("no portal node at %d, %d" % (col, row))
+        maze.set_portal_pairs(nodes)
+        mazenodes = list(nodes.nodesLUT.values())
+        for key in [maze.homenodeconnectLeft, maze.homenodeconnectRight]:
+            if nodes.get_node_from_tiles(*key) is None:
+                return problems + ["no ghost house entrance node at %d, %d" % key]
+        maze.connect_home_nodes(nodes)
+        start = nodes.get_node_from_tiles(*maze.pacmanStart)
+        if start is None:
+            return problems + ["no node at Pac-Man's start"]
+
+        for node in mazenodes:
+            exits = [node.neighbors[direction] for direction in [UP, DOWN, LEFT, RIGHT]]
+            if len([other for other in exits if other is not None]) + (node.neighbors[PORTAL] is not None) < 2:
+                problems.append("dead end at %d, %d" % (node.position.x // TILEWIDTH, node.position.y // TILEHEIGHT))
+
+        reached = {start}
+        pending = [start]
+        while pending:
+            node = pending.pop()
+            for other in node.neighbors.values():
+                if other is not None and other not in reached:
+                    reached.add(other)
+                    pending.append(other)
+        if len(reached) != len(nodes.nodesLUT):
+            problems.append("%d nodes cannot be reached" % (len(nodes.nodesLUT) - len(reached)))
+
+        # Pellets lie on paths connected to Pac-Man's start
+        paths = np.isin(data, NODESYMBOLS + PATHSYMBOLS)
+        onpath = np.zeros(data.shape, dtype=bool)
+        col, row = maze.pacmanStart
+        onpath[row][col] = True
+        pending = [(row, col)]
+        while pending:
+            row, col = pending.pop()
+            for dr, dc in SIDES.values():
+                r, c = row + dr, col + dc
+                if 0 <= r < data.shape[0] and 0 <= c < data.shape[1] and paths[r][c] and not onpath[r][c]:
+                    onpath[r][c] = True
+                    pending.append((r, c))
+        stranded = np.isin(data, ['.', '+', 'p', 'P']) & ~onpath
+        if stranded.any():
+            problems.append("%d pellets cannot be reached" % stranded.sum())
+        return problems
+
+
+# Generates mazes from the command line, e.g. 1000 mazes into ./mazes using every CPU:
+#   python src/mazegen.py mazes --count 1000
+# Play them with: python src/run.py --mazes mazes
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="directory to write the layout and rotation files to")
+    parser.add_argument("--count", type=int, default=100, help="number of mazes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first maze (the others follow on)")
+    parser.add_argument("--size", default="%dx%d" % (NCOLS, NROWS), help="columns x rows, e.g. 56x72")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--check", action="store_true", help="validate every maze after writing it")
+    args = parser.parse_args()
+
+    cols, rows = (int(value) for value in args.size.lower().split("x"))
+    generator = MazeGenerator(cols, rows)
+    names = generator.write_many(args.directory, range(args.seed, args.seed + args.count), args.jobs)
+    print("wrote %d mazes to %s" % (len(names), args.directory))
+
+    if args.check:
+        validator = MazeValidator()
+        for name in names:
+            for problem in validator.check(GeneratedMaze(name, args.directory), tiles=True):
+                print("%s: %s" % (name, problem))
@@ -1,53 +1,73 @@
 from constants import *
+from scheduler import Scheduler
+
+
+# Scatter/chase timing tables per level: (mode, duration in seconds) phases that repeat
+# once the last one ends. Levels past the last entry use the highest table.
+MODETABLES = {
+    0: ((SCATTER, 7), (CHASE, 20))
+}
 
 
 # Controls the alternation between scatter and chase modes based on time intervals.
+# One MainMode is shared by all ghosts of a level; ghost controllers subscribe to it
+# and are told when the mode switches, so there is one timer per game.
+# Phase ends are registered with the given scheduler; without one MainMode keeps a
+# private scheduler that update advances.
 class MainMode(object):
-    def __init__(self):
-        # Tracks time elapsed in current mode and starts in scatter mode
-        self.timer = 0
-        self.scatter()
-
-    # Updates the internal timer and switches between scatter and chase
-    # when the current mode's duration is complete.
+    def __init__(self, level=0, timers=None):
+        # Controllers notified on every switch
+        self.listeners = []
+
+        self.ownsTimers = timers is None
+        self.timers = Scheduler() if timers is None else timers
+        self.timer = None
+        self.restart(level)
+
+    # Starts over in the first phase (scatter) of the level's timing table
+    def restart(self, level):
+        self.table = MODETABLES[max(key for key in MODETABLES if key <= level)]
+        self.phase = 0
+        self.mode, self.time = self.table[0]
+        self.timers.cancel(self.timer)
+        self.timer = self.timers.schedule(self.time, self.next_phase)
+
+    # Registers a callback taking the new mode
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    # Only needed without a shared scheduler: advances the private one.
     def update(self, dt):
-        self.timer += dt
-        if self.timer >= self.time:
-            if self.mode is SCATTER:
-                self.chase()
-            elif self.mode is CHASE:
-                self.scatter()
-
-    # Switch to scatter mode, which sends ghosts to their corners.
-    def scatter(self):
-        self.mode = SCATTER
+        if self.ownsTimers:
+            self.timers.advance(dt)
 
-        # Duration of mode (in seconds)
-        self.time = 7
-
-        # Reset timer
-        self.timer = 0
-
-    # Switch to chase mode, which makes ghosts pursue Pac-Man.
-    def chase(self):
-        self.mode = CHASE
-        self.time = 20
-        self.timer = 0
+    # Moves to the next phase when the current mode's duration is complete.
+    def next_phase(self):
+        self.phase = (self.phase + 1) % len(self.table)
+        self.mode, self.time = self.table[self.phase]
+        self.timer = self.timers.schedule(self.time, self.next_phase)
+        for listener in self.listeners:
+            listener(self.mode)
 
 
 # Manages the active mode for a specific ghost, including:
 # - Main mode switching (scatter <-> chase)
 # - Temporary override modes (freight, spawn)
 class ModeController(object):
-    def __init__(self, entity):
-        self.timer = 0
+    def __init__(self, entity, mainmode=None):
+        # Pending freight timer and the duration it was started with
+        self.timer = None
         self.time = None
 
         # Duration of frightened state
         self.freightTime = 7
 
-        # Base scatter/chase timer logic
-        self.mainmode = MainMode()
+        # Base scatter/chase timer logic, shared with the other ghosts when given.
+        # A controller that creates its own also ticks it. Freight timers use the main mode's scheduler.
+        self.ownsMainmode = mainmode is None
+        self.mainmode = MainMode() if mainmode is None else mainmode
+        self.mainmode.subscribe(self.main_mode_changed)
+        self.timers = self.mainmode.timers
 
         # Currently active mode
         self.current = self.mainmode.mode
@@ -55,43 +75,61 @@ class ModeController(object):
         # Reference to the ghost this controller manages
         self.entity = entity
 
-    # Update mode logic every frame. Handles transitions for all ghost modes.
+    # Update mode logic every frame. Timed transitions fire from the scheduler;
+    # only the position-based end of spawn mode is checked here.
     def update(self, dt):
-        self.mainmode.update(dt)
-        if self.current is FREIGHT:
-            # Stay in frightened mode until timer expires
-            self.timer += dt
-            if self.timer >= self.time:
-                self.time = None
-
-                # Restore normal speed and behavior
-                self.entity.normal_mode()
-
-                # Resume normal scatter/chase cycle
-                self.current = self.mainmode.mode
-
-        elif self.current in [SCATTER, CHASE]:
-            # Mirror the current main mode if in standard mode
-            self.current = self.mainmode.mode
+        if self.ownsMainmode:
+            self.mainmode.update(dt)
 
         if self.current is SPAWN:
             # Exit spawn mode if the ghost reaches the spawn node
             if self.entity.node == self.entity.spawnNode:
-                self.entity.normal_mode()
                 self.current = self.mainmode.mode
+                self.entity.normal_mode()
+
+    # Drops any freight or spawn override and follows the main mode again
+    def restart(self):
+        self.timers.cancel(self.timer)
+        self.timer = None
+        self.time = None
+        self.current = self.mainmode.mode
+
+    # Called by the main mode on every scatter/chase switch.
+    # Ghosts in freight or spawn mode keep their override and pick up the main mode when it ends.
+    def main_mode_changed(self, mode):
+        if self.current in [SCATTER, CHASE]:
+            self.current = mode
+
+    # Seconds spent in the current freight period
+    def freight_elapsed(self):
+        return self.time - self.timers.remaining(self.timer)
+
+    # Called by the scheduler when the freight period is over
+    def end_freight(self):
+        self.timer = None
+        self.time = None
+
+        # Resume normal scatter/chase cycle
+        self.current = self.mainmode.mode
+
+        # Restore normal speed and behavior
+        self.entity.normal_mode()
 
     # Transitions a ghost to spawn mode (used after being eaten).
     def set_spawn_mode(self):
         if self.current is FREIGHT:
+            self.timers.cancel(self.timer)
+            self.timer = None
             self.current = SPAWN
 
     # Transitions a ghost to freight mode.
     # Only works if currently in chase or scatter mode.
     def set_freight_mode(self):
         if self.current in [SCATTER, CHASE]:
-            self.timer = 0
             self.time = self.freightTime
+            self.timer = self.timers.schedule(self.time, self.end_freight)
             self.current = FREIGHT
         elif self.current is FREIGHT:
             # Restart the fright timer if already in frightened mode
-            self.timer = 0
+            self.timers.cancel(self.timer)
+            self.timer = self.timers.schedule(self.time, self.end_freight)
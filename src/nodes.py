@@ -7,10 +7,19 @@ import numpy as np
 # A Node represents a point in the maze where Pac-Man or ghosts can make decisions (turns, stops, or teleport).
 # Each node knows its neighboring nodes in the four directions and portals.
 class Node(object):
-    def __init__(self, x, y):
+    __slots__ = ("position", "neighbors", "access", "group")
+
+    # Entity names allowed every way at a new node. Access rules are tuples that are replaced
+    # rather than changed in place, so nodes with the same rules share one tuple.
+    everyone = (PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT)
+
+    def __init__(self, x, y, group=None):
         # Pixel-based position of the node
         self.position = Vector2(x, y)
 
+        # NodeGroup the node belongs to, told when its access rules change
+        self.group = group
+
         # Dictionary of connections to neighboring nodes
         self.neighbors = {
             UP: None,
@@ -22,21 +31,27 @@ class Node(object):
 
         # Controls which entities are allowed to move in each direction
         self.access = {
-            UP: [PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT],
-            DOWN: [PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT],
-            LEFT: [PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT],
-            RIGHT: [PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT]
+            UP: self.everyone,
+            DOWN: self.everyone,
+            LEFT: self.everyone,
+            RIGHT: self.everyone
         }
 
     # Prevent a specific entity from moving in a given direction at this node
     def deny_access(self, direction, entity):
         if entity.name in self.access[direction]:
-            self.access[direction].remove(entity.name)
+            self.access[direction] = tuple(name for name in self.access[direction] if name != entity.name)
+            self.access_changed()
 
     # Allow a specific entity to move in a given direction at this node
     def allow_access(self, direction, entity):
         if entity.name not in self.access[direction]:
-            self.access[direction].append(entity.name)
+            self.access[direction] += (entity.name,)
+            self.access_changed()
+
+    def access_changed(self):
+        if self.group is not None:
+            self.group.accessVersion += 1
 
     # Renders the node and its connections for debugging.
     def render(self, screen):
@@ -50,7 +65,11 @@ class Node(object):
 # NodeGroup builds and manages the full network of nodes for the maze.
 # It reads a text file layout, creates nodes at appropriate points,
 # and connects them based on horizontal and vertical paths.
+# With level=None the group starts empty, to be filled by load_arrays (level packs).
 class NodeGroup(object):
+    # Entity names in the order Node.access lists them
+    accessNames = Node.everyone
+
     def __init__(self, level):
         # Name of maze text file
         self.level = level
@@ -63,14 +82,23 @@ class NodeGroup(object):
         self.pathSymbols = ['.', '-', '|', 'p']
 
         # Load the level data and initialize the node graph
-        data = self.read_maze_file(level)
-        self.create_node_table(data)
-        self.connect_horizontally(data)
-        self.connect_vertically(data)
+        if level is not None:
+            data = self.read_maze_file(level)
+            self.create_node_table(data)
+            self.connect_horizontally(data)
+            self.connect_vertically(data)
 
         # Center of ghost house
         self.homekey = None
 
+        # Incremented whenever the access rules of any node in this group change, so paths
+        # cached for the group can be invalidated
+        self.accessVersion = 0
+
+        # Access rules of every node saved by save_access, and accessVersion when they last matched
+        self.accessTemplate = []
+        self.accessSaved = None
+
     # Reads the maze layout from a text file as a NumPy array of characters.
     def read_maze_file(self, textfile):
         return np.loadtxt(textfile, dtype='<U1')
@@ -82,7 +110,7 @@ class NodeGroup(object):
             for col in list(range(data.shape[1])):
                 if data[row][col] in self.nodeSymbols:
                     x, y = self.construct_key(col + xoffset, row + yoffset)
-                    self.nodesLUT[(x, y)] = Node(x, y)
+                    self.nodesLUT[(x, y)] = Node(x, y, self)
 
     # Converts grid coordinates to pixel coordinates.
     def construct_key(self, x, y):
@@ -207,6 +235,62 @@ class NodeGroup(object):
         for entity in entities:
             self.allow_home_access(entity)
 
+    # Remembers every node's access rules as they are now (the start of a level), for restore_access.
+    # The rules are immutable tuples, so this only keeps references to them.
+    def save_access(self):
+        self.accessTemplate = [(node, tuple(node.access.values())) for node in self.nodesLUT.values()]
+        self.accessSaved = self.accessVersion
+
+    # Puts back the access rules saved by save_access. Nothing is touched (and cached
+    # paths stay valid) if no node's rules changed since.
+    def restore_access(self):
+        if self.accessSaved == self.accessVersion:
+            return
+        changed = False
+        for node, rules in self.accessTemplate:
+            for direction, names in zip(node.access, rules):
+                if node.access[direction] is not names:
+                    node.access[direction] = names
+                    changed = True
+        if changed:
+            self.accessVersion += 1
+        self.accessSaved = self.accessVersion
+
+    # The node graph as arrays, nodes in lookup table order:
+    #   positions (N, 2) pixel positions
+    #   neighbors (N, 5) index of the UP, DOWN, LEFT, RIGHT and PORTAL neighbors, -1 for none
+    #   access    (N, 4) bitmask of the entity names allowed UP, DOWN, LEFT and RIGHT
+    # and the index of the ghost house center (-1 if there is none).
+    def to_arrays(self):
+        nodes = list(self.nodesLUT.values())
+        index = {node: i for i, node in enumerate(nodes)}
+        positions = np.array([key for key in self.nodesLUT], dtype=np.float64).reshape(-1, 2)
+        neighbors = np.array([[index.get(node.neighbors[direction], -1) for direction in [UP, DOWN, LEFT, RIGHT, PORTAL]]
+                              for node in nodes], dtype=np.int32).reshape(-1, 5)
+        access = np.array([[sum(1 << name for name in node.access[direction]) for direction in [UP, DOWN, LEFT, RIGHT]]
+                           for node in nodes], dtype=np.uint16).reshape(-1, 4)
+        home = list(self.nodesLUT).index(self.homekey) if self.homekey in self.nodesLUT else -1
+        return positions, neighbors, access, home
+
+    # Rebuilds the node graph from to_arrays output, replacing any nodes already here
+    def load_arrays(self, positions, neighbors, access, home):
+        keys = [tuple(int(value) if value.is_integer() else value for value in position)
+                for position in positions.tolist()]
+        nodes = [Node(x, y, self) for x, y in keys]
+        self.nodesLUT = dict(zip(keys, nodes))
+        directions = [UP, DOWN, LEFT, RIGHT, PORTAL]
+        rules = {}
+        for node, row, masks in zip(nodes, neighbors.tolist(), access.tolist()):
+            for direction, i in zip(directions, row):
+                if i >= 0:
+                    node.neighbors[direction] = nodes[i]
+            for direction, mask in zip(directions, masks):
+                if mask not in rules:
+                    rules[mask] = tuple(name for name in self.accessNames if mask >> name & 1)
+                node.access[direction] = rules[mask]
+        self.homekey = keys[home] if home >= 0 else None
+        self.accessVersion += 1
+
     # Draws all nodes and their connections (for debugging).
     def render(self, screen):
         for node in self.nodesLUT.values():
@@ -0,0 +1,101 @@
+import numpy as np
+from constants import *
+
+# Observation channels, one tile grid the size of the maze each
+WALLCHANNEL = 0
+PELLETCHANNEL = 1
+POWERPELLETCHANNEL = 2
+PACMANCHANNEL = 3
+BLINKYCHANNEL = 4
+PINKYCHANNEL = 5
+INKYCHANNEL = 6
+CLYDECHANNEL = 7
+FREIGHTCHANNEL = 8
+SPAWNCHANNEL = 9
+FRUITCHANNEL = 10
+NUMCHANNELS = 11
+
+# Maze file symbols that are drawn as walls (wall tile digits and the ghost house door)
+WALLSYMBOLS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '=']
+
+
+# Renders the game state directly into a multi-channel tile grid for learning agents.
+# Works purely on game objects and NumPy arrays and never touches pygame surfaces,
+# so it is cheap enough to run every tick.
+#
+# Ghost channels mark each ghost by name; ghosts in FREIGHT or SPAWN mode are
+# additionally marked in the FREIGHT and SPAWN channels.
+# The grids are as large as the maze (its wall mask), which may be larger than the screen.
+class ObservationRenderer(object):
+    # Wall masks keyed by maze file, shared by every renderer
+    walls = {}
+
+    def __init__(self, mazefile=None, dtype=np.float32):
+        self.dtype = dtype
+        self.wallmask = None
+        self.ghostchannels = {
+            BLINKY: BLINKYCHANNEL,
+            PINKY: PINKYCHANNEL,
+            INKY: INKYCHANNEL,
+            CLYDE: CLYDECHANNEL
+        }
+        if mazefile is not None:
+            self.set_maze(mazefile)
+
+    # Loads (or reuses) the static wall mask for a maze file
+    def set_maze(self, mazefile):
+        wallmask = self.walls.get(mazefile)
+        if wallmask is None:
+            data = np.loadtxt(mazefile, dtype='<U1')
+            wallmask = np.isin(data, WALLSYMBOLS)
+            self.walls[mazefile] = wallmask
+        self.wallmask = wallmask
+
+    # Allocates a buffer of the right shape for render (NUMCHANNELS x maze rows x maze columns)
+    def create_buffer(self):
+        rows, cols = self.wallmask.shape
+        return np.zeros((NUMCHANNELS, rows, cols), dtype=self.dtype)
+
+    # Converts pixel positions to (row, col) tile indices, clipped to a grid of the given shape
+    def to_tiles(self, xs, ys, shape):
+        rows, cols = shape
+        cols = np.clip(np.rint(np.asarray(xs) / TILEWIDTH).astype(np.intp), 0, cols - 1)
+        rows = np.clip(np.rint(np.asarray(ys) / TILEHEIGHT).astype(np.intp), 0, rows - 1)
+        return rows, cols
+
+    # Writes the observation for the given state into out (from create_buffer, for the same maze).
+    # A new buffer is allocated if out is None. Returns the buffer.
+    def render(self, pellets, pacman, ghosts, fruit=None, out=None):
+        if out is None:
+            out = self.create_buffer()
+        shape = self.wallmask.shape
+        if out.shape[1:] != shape or pellets.grid.shape != shape:
+            raise ValueError("observation buffer %s and pellet grid %s do not match the maze %s"
+                             % (out.shape[1:], pellets.grid.shape, shape))
+        out[...] = 0
+
+        out[WALLCHANNEL] = self.wallmask
+        out[PELLETCHANNEL] = pellets.grid == PELLET
+        out[POWERPELLETCHANNEL] = pellets.grid == POWERPELLET
+
+        row, col = self.to_tiles(pacman.position.x, pacman.position.y, shape)
+        out[PACMANCHANNEL, row, col] = 1
+
+        ghostlist = list(ghosts)
+        if ghostlist:
+            xs = [ghost.position.x for ghost in ghostlist]
+            ys = [ghost.position.y for ghost in ghostlist]
+            rows, cols = self.to_tiles(xs, ys, shape)
+            channels = np.array([self.ghostchannels.get(ghost.name, BLINKYCHANNEL) for ghost in ghostlist])
+            modes = np.array([ghost.mode.current for ghost in ghostlist])
+            out[channels, rows, cols] = 1
+            freight = modes == FREIGHT
+            out[FREIGHTCHANNEL, rows[freight], cols[freight]] = 1
+            spawn = modes == SPAWN
+            out[SPAWNCHANNEL, rows[spawn], cols[spawn]] = 1
+
+        if fruit is not None:
+            row, col = self.to_tiles(fruit.position.x, fruit.position.y, shape)
+            out[FRUITCHANNEL, row, col] = 1
+
+        return out
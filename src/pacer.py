@@ -0,0 +1,33 @@
+import time
+
+
+# Paces the main loop to a frame rate by sleeping until each frame is due (no busy-waiting).
+# Deadlines advance by a whole period from the previous one, so sleep overshoot does not
+# add up into a slower frame rate; after a stall of more than a frame the pacer starts
+# over from the current time instead of rushing frames out to catch up.
+class FramePacer(object):
+    def __init__(self, rate):
+        self.rate = rate
+        self.period = 1.0 / rate
+
+        # When the next frame is due and when the last one started (perf_counter seconds)
+        self.deadline = None
+        self.last = None
+
+    # Sleeps until the next frame is due and returns the seconds since the previous frame
+    def wait(self):
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now
+            self.last = now
+
+        self.deadline += self.period
+        if self.deadline > now:
+            time.sleep(self.deadline - now)
+            now = time.perf_counter()
+        else:
+            self.deadline = now
+
+        elapsed = now - self.last
+        self.last = now
+        return elapsed
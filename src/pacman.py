@@ -1,6 +1,5 @@
 import pygame
 from pygame.locals import *
-from vector import Vector2
 from constants import *
 from entity import Entity
 from sprites import PacmanSprites
@@ -9,19 +8,12 @@ from sprites import PacmanSprites
 # The main player class representing Pac-Man.
 # Handles movement between nodes, user input, and rendering.
 class Pacman(Entity):
+    __slots__ = ("sprites", "alive", "controller")
+
     def __init__(self, node):
         super().__init__(node)
         self.name = PACMAN
 
-        # Direction vectors mapped to constants
-        self.directions = {
-            STOP: Vector2(),
-            UP: Vector2(0, -1),
-            DOWN: Vector2(0, 1),
-            LEFT: Vector2(-1, 0),
-            RIGHT: Vector2(1, 0)
-        }
-
         # Default movement direction and speed
         self.direction = LEFT
         self.speed = 100 * TILEWIDTH / 16
@@ -46,6 +38,10 @@ class Pacman(Entity):
         # Flag indicating if Pac-Man is alive
         self.alive = True
 
+        # Optional controller (e.g. the InputQueue or the LookaheadAgent) that steers
+        # instead of the keys held down
+        self.controller = None
+
     # Resets Pac-Man to the starting state (after death or level reset).
     def reset(self):
         Entity.reset(self)
@@ -55,6 +51,13 @@ class Pacman(Entity):
         self.image = self.sprites.get_start_image()
         self.sprites.reset()
 
+    # Puts Pac-Man back as he is placed at the start of a level: on the start node rather
+    # than halfway to the node on his left, where reset leaves him after a death
+    def restart(self):
+        self.reset()
+        self.set_position()
+        self.target = self.node
+
     # Handles Pac-Man's death by stopping movement and marking him as not alive.
     def die(self):
         self.alive = False
@@ -67,11 +70,12 @@ class Pacman(Entity):
     # Called every frame to update Pac-Man's position, animation, and handle direction input.
     # Uses delta time (dt) for frame-rate-independent movement.
     def update(self, dt):
+        self.lastPosition = self.position.copy()
         self.position += self.directions[self.direction] * self.speed * dt
         self.sprites.update(dt)
 
         # Get current input direction
-        direction = self.get_valid_key()
+        direction = self.get_direction()
 
         # Check if Pac-Man has passed the target node
         if self.overshoot_target():
@@ -81,6 +85,7 @@ class Pacman(Entity):
             # If entering a portal, jump to the next node
             if self.node.neighbors[PORTAL] is not None:
                 self.node = self.node.neighbors[PORTAL]
+                self.lastPosition = None
 
             # Try new input direction
             self.target = self.get_new_target(direction)
@@ -114,8 +119,15 @@ class Pacman(Entity):
             return self.node.neighbors[direction]
         return self.node
 
-    # Returns a movement direction constant based on user key presses.
-    # Supports both arrow keys and WASD.
+    # Returns the direction chosen by the controller if one is attached, otherwise the keyboard's.
+    def get_direction(self):
+        if self.controller is not None:
+            return self.controller.get_direction(self)
+        return self.get_valid_key()
+
+    # Returns a movement direction constant based on the keys held down right now.
+    # Supports both arrow keys and WASD. Taps between two updates are missed; the game
+    # steers through an InputQueue instead.
     def get_valid_key(self):
         key_pressed = pygame.key.get_pressed()
 
@@ -159,9 +171,30 @@ class Pacman(Entity):
                 return pellet
         return None
 
-    # Check for a collision between Pac-Man and a ghost.
+    # Check for a collision between Pac-Man and a ghost anywhere along the paths both moved
+    # in their last update, not only at their end positions, so that fast ghosts, large time
+    # steps and fast-forward cannot pass through Pac-Man unnoticed.
+    # Finds the closest approach of the two, treating both movements as straight (each update
+    # moves an entity along a single edge) and simultaneous, which holds as long as both have
+    # been updated for the tick before this is called (see GameController.update_game).
     def collide_ghost(self, ghost):
-        return self.collide_check(ghost)
+        start = self.position if self.lastPosition is None else self.lastPosition
+        ghostStart = ghost.position if ghost.lastPosition is None else ghost.lastPosition
+
+        # Offset between the two at the start, and how much it changed by the end
+        offset = start - ghostStart
+        change = (self.position - start) - (ghost.position - ghostStart)
+
+        # Fraction of the movement at which they were closest
+        t = 0
+        length = change.magnitude_squared()
+        if length > 0:
+            t = -(offset.x * change.x + offset.y * change.y) / length
+            t = min(max(t, 0), 1)
+
+        d = offset + change * t
+        rSquared = (self.collideRadius + ghost.collideRadius) ** 2
+        return d.magnitude_squared() <= rSquared
 
     # Performs a circular collision check between Pac-Man and another entity (pellet or ghost).
     def collide_check(self, other):
@@ -1,9 +1,16 @@
+from scheduler import Scheduler
+
+
 class Pause(object):
-    def __init__(self, paused=False):
+    # Timed pauses are registered with the given scheduler; without one the pause
+    # keeps a private scheduler that update advances.
+    def __init__(self, paused=False, timers=None):
         # Flag to indicate if the game is currently paused
         self.paused = paused
 
-        self.timer = 0
+        self.ownsTimers = timers is None
+        self.timers = Scheduler() if timers is None else timers
+        self.timer = None
 
         # Duration for which the game should remain paused (in seconds)
         self.pauseTime = None
@@ -11,30 +18,41 @@ class Pause(object):
         # Optional function to call after the pause ends
         self.func = None
 
-    # Should be called every frame. Tracks pause duration and resumes gameplay
-    # when the timer expires. If a function was provided via set_pause, returns it when the pause ends.
+    # Only needed without a shared scheduler: advances the private one.
     def update(self, dt):
-        if self.pauseTime is not None:
-            self.timer += dt
-            if self.timer >= self.pauseTime:
-                # Time to resume the game
-                self.timer = 0
-                self.paused = False
-                self.pauseTime = None
-
-                # # Trigger follow-up function if any
-                return self.func
-        return None
+        if self.ownsTimers:
+            self.timers.advance(dt)
 
     # Initiates a pause.
     def set_pause(self, playerPaused=False, pauseTime=None, func=None):
-        self.timer = 0
-        self.func = func
-        self.pauseTime = pauseTime
+        self.set_timer(pauseTime, func)
 
         # Toggle pause state
         self.flip()
 
+    # (Re)starts the pause countdown without changing the paused state.
+    # When it expires the game resumes and func (if any) is called.
+    # A pauseTime of None cancels any running countdown.
+    def set_timer(self, pauseTime, func=None):
+        self.timers.cancel(self.timer)
+        self.timer = None
+        self.func = func
+        self.pauseTime = pauseTime
+        if pauseTime is not None:
+            self.timer = self.timers.schedule(pauseTime, self.expire)
+
+    # Time to resume the game
+    def expire(self):
+        self.timer = None
+        self.paused = False
+        self.pauseTime = None
+
+        # Trigger follow-up function if any
+        func = self.func
+        self.func = None
+        if func is not None:
+            func()
+
     # Reverses the paused state: pause if running, resume if paused.
     def flip(self):
         self.paused = not self.paused
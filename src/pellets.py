@@ -6,74 +6,87 @@ import numpy as np
 
 # Represents a single standard pellet in the maze.
 # Pac-Man collects these for points.
+# A maze holds hundreds of pellets, so only what differs between them is stored per pellet
+# (in slots); what is the same for every pellet of a kind lives on the class.
 class Pellet(object):
-    def __init__(self, row, column):
-        self.name = PELLET
+    __slots__ = ("row", "column", "position", "visible")
 
-        # Pixel position based on tile location
-        self.position = Vector2(column * TILEWIDTH, row * TILEHEIGHT)
-        self.color = WHITE
+    name = PELLET
+    color = WHITE
 
-        # Visual size and collision range
-        self.radius = int(2 * TILEWIDTH / 16)
-        self.collideRadius = int(2 * TILEWIDTH / 16)
+    # Visual size and collision range
+    radius = int(2 * TILEWIDTH / 16)
+    collideRadius = int(2 * TILEWIDTH / 16)
 
-        # Score value
-        self.points = 10
+    # Score value
+    points = 10
+
+    def __init__(self, row, column):
+        # Tile location and pixel position based on it
+        self.row = row
+        self.column = column
+        self.position = Vector2(column * TILEWIDTH, row * TILEHEIGHT)
 
         # Toggle for rendering
         self.visible = True
 
     # Draws the pellet as a small white circle on the screen.
     # Only renders if pellet is marked visible.
-    def render(self, screen):
+    def render(self, screen, viewport=None):
         if self.visible:
             adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-            p = self.position + adjust
+            position = self.position if viewport is None else viewport.to_screen(self.position)
+            p = position + adjust
             pygame.draw.circle(screen, self.color, p.as_int(), self.radius)
 
 
 # A subclass of Pellet that represents a Power Pellet.
 # These flash on/off and grant Pac-Man temporary power over ghosts.
 class PowerPellet(Pellet):
-    def __init__(self, row, column):
-        Pellet.__init__(self, row, column)
-        self.name = POWERPELLET
+    __slots__ = ()
 
-        # Larger than standard pellet
-        self.radius = int(8 * TILEWIDTH / 16)
+    name = POWERPELLET
 
-        # More points than regular pellet
-        self.points = 50
-
-        # Time between flashes in seconds
-        self.flashTime = 0.2
+    # Larger than standard pellet
+    radius = int(8 * TILEWIDTH / 16)
 
-        # Internal timer
-        self.timer = 0
+    # More points than regular pellet
+    points = 50
 
-    # Handles flashing animation by toggling visibility on a timer.
-    # Called every frame with the time delta.
-    def update(self, dt):
-        self.timer += dt
-        if self.timer >= self.flashTime:
-            self.visible = not self.visible
-            self.timer = 0
+    # Toggles visibility for the flashing animation.
+    def flash(self):
+        self.visible = not self.visible
 
 
 # Manages a collection of regular and power pellets.
 # Loads layout from a text file and handles rendering and updates.
+# With pelletfile=None the group starts empty, to be filled by load_grid (level packs).
 class PelletGroup(object):
     def __init__(self, pelletfile):
         self.pelletList = []
         self.powerpellets = []
-        self.create_pellet_list(pelletfile)
+
+        # Time between power pellet flashes in seconds
+        self.flashTime = 0.2
+
+        # Tile grid of remaining pellets (0 = empty, PELLET or POWERPELLET otherwise)
+        self.grid = None
+
+        # Remaining pellets by (row, column), for lookups around a position
+        self.tiles = {}
+
+        # Grid, pellets and tiles as loaded, which reset puts back
+        self.template = None
+        self.allPellets = []
+        self.allTiles = {}
+        if pelletfile is not None:
+            self.create_pellet_list(pelletfile)
         self.numEaten = 0
 
-    # Updates only power pellets (for flash animation).
-    def update(self, dt):
+    # Flashes the power pellets; called every flashTime seconds by the controller's scheduler.
+    def flash(self):
         for powerpellet in self.powerpellets:
-            powerpellet.update(dt)
+            powerpellet.flash()
 
     # Reads maze layout and places pellets at marked positions.
     # Symbols:
@@ -81,25 +94,75 @@ class PelletGroup(object):
     #   'P' or 'p' -> power pellet
     def create_pellet_list(self, pelletfile):
         data = self.read_pelletfile(pelletfile)
-        for row in range(data.shape[0]):
-            for col in range(data.shape[1]):
-                if data[row][col] in ['.', '+']:
-                    self.pelletList.append(Pellet(row, col))
-                elif data[row][col] in ['P', 'p']:
-                    pp = PowerPellet(row, col)
-                    self.pelletList.append(pp)
-                    self.powerpellets.append(pp)
+        grid = np.zeros(data.shape, dtype=np.uint8)
+        grid[np.isin(data, ['.', '+'])] = PELLET
+        grid[np.isin(data, ['P', 'p'])] = POWERPELLET
+        self.load_grid(grid)
+
+    # Places pellets from a tile grid of PELLET / POWERPELLET values (0 = empty),
+    # row by row. The grid is copied, so it can be a read-only view of a level pack.
+    def load_grid(self, grid):
+        self.grid = np.array(grid, dtype=np.uint8)
+        self.template = self.grid.copy()
+        for row, col in zip(*(index.tolist() for index in np.nonzero(self.grid))):
+            if self.grid[row, col] == PELLET:
+                pellet = Pellet(row, col)
+            else:
+                pellet = PowerPellet(row, col)
+                self.powerpellets.append(pellet)
+            self.pelletList.append(pellet)
+            self.tiles[(row, col)] = pellet
+        self.allPellets = list(self.pelletList)
+        self.allTiles = dict(self.tiles)
+
+    # Puts back every pellet the group was loaded with, reusing the pellet objects
+    def reset(self):
+        self.pelletList[:] = self.allPellets
+        self.tiles.clear()
+        self.tiles.update(self.allTiles)
+        np.copyto(self.grid, self.template)
+        for powerpellet in self.powerpellets:
+            powerpellet.visible = True
+        self.numEaten = 0
 
     # Loads the maze layout from a text file as a 2D NumPy array.
     def read_pelletfile(self, textfile):
         return np.loadtxt(textfile, dtype='<U1')
 
+    # Removes an eaten pellet from the list and the tile grid.
+    def remove(self, pellet):
+        self.pelletList.remove(pellet)
+        del self.tiles[(pellet.row, pellet.column)]
+        self.grid[pellet.row, pellet.column] = 0
+
+    # Pellets on the tile nearest to a position and the eight around it, in list order.
+    # Anything Pac-Man can touch is among them, however large the maze.
+    def near(self, position):
+        col = int(round(position.x / TILEWIDTH))
+        row = int(round(position.y / TILEHEIGHT))
+        pellets = []
+        for r in range(row - 1, row + 2):
+            for c in range(col - 1, col + 2):
+                pellet = self.tiles.get((r, c))
+                if pellet is not None:
+                    pellets.append(pellet)
+        return pellets
+
     # Returns True if all pellets have been eaten.
     # Used to check for level completion.
     def is_empty(self):
         return len(self.pelletList) == 0
 
     # Renders all visible pellets to the screen.
-    def render(self, screen):
-        for pellet in self.pelletList:
-            pellet.render(screen)
+    # With a viewport, only the pellets on tiles in view are looked at.
+    def render(self, screen, viewport=None):
+        if viewport is None:
+            for pellet in self.pelletList:
+                pellet.render(screen)
+            return
+
+        top, bottom, left, right = viewport.tiles()
+        top, left = max(top, 0), max(left, 0)
+        rows, cols = np.nonzero(self.grid[top:bottom, left:right])
+        for row, col in zip((rows + top).tolist(), (cols + left).tolist()):
+            self.tiles[(row, col)].render(screen, viewport)
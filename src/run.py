@@ -1,23 +1,37 @@
+import argparse
 import pygame
 from pygame.locals import *
 from constants import *
 from pacman import Pacman
-from nodes import NodeGroup
-from pellets import PelletGroup
 from ghosts import GhostGroup
 from fruit import Fruit
 from pauser import Pause
 from text import TextGroup
 from sprites import LifeSprites
-from sprites import MazeSprites
+from sprites import ChunkedBackground
+from viewport import Viewport
+from pacer import FramePacer
 from mazedata import MazeData
+from levelloader import LevelLoader
 from menu import MenuScreen, GameState, HighScoreScreen
-from sound import SoundManager
+from sound import SoundManager, NullSoundManager
+from scheduler import Scheduler
+from hud import HUD
+from autoplayer import LookaheadAgent
+from inputqueue import InputQueue
 
 
 # Main game controller class: handles setup, updates, input, collisions, and rendering
 class GameController(object):
-    def __init__(self):
+    # audio=False uses the silent NullSoundManager (headless runs, replays, CI).
+    # autoplay is a per-move search budget in milliseconds: Pac-Man is then steered by
+    # the built-in LookaheadAgent instead of the keyboard.
+    # speed is the number of simulation steps run per tick (fast-forward).
+    # stress adds that many extra ghosts to every level, for load testing.
+    # mazes is a directory of generated mazes (see mazegen.py) to play instead of the built-in ones.
+    # tickrate is the number of simulation ticks per second and fps the number of frames
+    # drawn per second (the display's refresh rate where pygame reports it, else 60).
+    def __init__(self, audio=True, autoplay=None, speed=1, stress=0, mazes=None, tickrate=30, fps=None):
         pygame.init()
 
         # Create the main display surface using screen size defined in constants.py
@@ -29,8 +43,31 @@ class GameController(object):
         self.background_norm = None
         self.background_flash = None
 
-        # Clock to manage time between frames and limit frame rate
-        self.clock = pygame.time.Clock()
+        # Camera following Pac-Man, for mazes larger than the screen (None otherwise)
+        self.viewport = None
+
+        # The game advances in fixed ticks of tickTime seconds, however often frames are
+        # drawn. Frame time adds up in the accumulator and every whole tick in it is run;
+        # the fraction left over (alpha) places the entities between their last two tick
+        # positions, so motion is smooth at any frame rate.
+        self.tickTime = 1.0 / tickrate
+        self.accumulator = 0
+        self.alpha = 1
+
+        # Longest frame counted, so a stall (e.g. the window being dragged) does not fast-forward the game
+        self.maxFrameTime = 0.25
+
+        # Sleeps until each frame is due
+        self.pacer = FramePacer(fps if fps is not None else self.display_rate())
+
+        # Simulation steps per displayed frame, multiplied by turboSpeed while TAB is held.
+        # Each step advances the same dt a normal frame would, so k steps play out exactly
+        # like k frames at normal speed; only rendering is skipped.
+        self.speed = speed
+        self.turboSpeed = 8
+
+        # Extra ghosts per level (stress mode)
+        self.stress = stress
 
         # Game state management
         self.game_state = GameState()
@@ -38,13 +75,30 @@ class GameController(object):
         self.high_score_screen = None
 
         self.mazedata = MazeData()
+        if mazes is not None:
+            self.mazedata.load_directory(mazes)
 
-        # Bonus fruit object (appears temporarily)
+        # Builds levels from compiled level packs (see mazecompiler.py) or the maze text files.
+        # With prefetchLevels the next level is built in the background while the cleared
+        # level flashes, so next_level only has to swap it in.
+        self.loader = LevelLoader(self.mazedata)
+        self.prefetchLevels = True
+
+        # Nodes where each entity starts this level (MazeBase.start_tiles keys)
+        self.startNodes = {}
+
+        # Bonus fruit object (appears temporarily), and fruit that left the maze kept for reuse
         self.fruit = None
+        self.fruitPool = []
         self.fruitCaptured = []
 
+        # Timer queues: timers advances every frame of play (pauses, texts, flashing),
+        # gametimers only while the game is not paused (ghost modes, fruit)
+        self.timers = Scheduler()
+        self.gametimers = Scheduler()
+
         # Pause manager for delays and manual pauses
-        self.pause = Pause(True)
+        self.pause = Pause(True, self.timers)
 
         # Current level and remaining lives
         self.level = 0
@@ -52,33 +106,60 @@ class GameController(object):
         self.lifesprites = LifeSprites(self.lives)
 
         self.score = 0
-        self.textgroup = TextGroup()
+        self.textgroup = TextGroup(self.timers)
+
+        # Cached layer for score, level, lives and captured fruit
+        self.hud = HUD(self.textgroup, self.lifesprites)
 
         # Maze flash (when completing a level) and the active timer
         self.flashBG = False
         self.flashTime = 0.2
-        self.flashTimer = 0
+        self.flashTimer = None
+
+        # Power pellet flashing
+        self.pelletFlashTimer = None
 
         # Flag to track if game has been initialized
         self.game_initialized = False
 
-        self.sound_manager = SoundManager(base_path)
+        self.sound_manager = self.create_sound_manager(audio)
         self.pellet_sound_toggle = 0
 
+        # Direction key presses and releases, fed from the event loop (or by a replay)
+        # and steering Pac-Man unless the autoplayer does
+        self.input = InputQueue()
+
+        # Built-in autoplayer (None for keyboard play)
+        self.autoplayer = None
+        if autoplay is not None:
+            self.autoplayer = LookaheadAgent(autoplay)
+
+    # Returns the audio backend, falling back to the silent one if no audio device is available
+    def create_sound_manager(self, audio):
+        if audio:
+            try:
+                return SoundManager(base_path)
+            except pygame.error:
+                pass
+        return NullSoundManager(base_path)
+
     # Restarts the game from level 0 with full lives after game over.
     def restart_game(self):
+        level = self.level
         self.lives = 5
         self.level = 0
         self.pause.paused = True
-        self.fruit = None
+        self.remove_fruit()
         self.fruitCaptured = []
 
         # Stop all looping sounds when restarting the game
-        self.sound_manager.stop_looping("siren")
-        self.sound_manager.stop_looping("freight")
-        self.sound_manager.stop_looping("eyes")
+        self.sound_manager.set_background(None)
 
-        self.start_game()
+        # The same maze is put back in place rather than loaded and built again
+        if self.game_initialized and self.mazedata.index(level) == self.mazedata.index(0):
+            self.reset()
+        else:
+            self.start_game()
         self.score = 0
         self.textgroup.update_score(self.score)
         self.textgroup.update_level(self.level)
@@ -90,13 +171,12 @@ class GameController(object):
         self.pause.paused = True
         self.pacman.reset()
         self.ghosts.reset()
-        self.fruit = None
+        self.remove_fruit()
+        self.input.flush()
         self.textgroup.show_text(READYTXT)
 
         # Pause when restarting
-        self.pause.timer = 0
-        self.pause.pauseTime = 3
-        self.pause.func = self.show_entities
+        self.pause.set_timer(3, self.show_entities)
 
     # Called when all pellets are eaten.
     # Advances to the next level and resets game entities.
@@ -106,86 +186,123 @@ class GameController(object):
         self.pause.paused = True
 
         # Stop all looping sounds when advancing to next level
-        self.sound_manager.stop_looping("siren")
-        self.sound_manager.stop_looping("freight")
-        self.sound_manager.stop_looping("eyes")
+        self.sound_manager.set_background(None)
 
         self.start_game()
         self.textgroup.update_level(self.level)
         self.textgroup.show_text(READYTXT)
 
         # Pause when restarting
-        self.pause.timer = 0
-        self.pause.pauseTime = 3
-        self.pause.func = self.show_entities
+        self.pause.set_timer(3, self.show_entities)
 
-    # Builds the background surface for the maze.
-    # Loads the maze layout and rotation files, constructs the tilemap.
+    # Selects the background surfaces for the maze.
+    # Backgrounds are built from the layout and rotation files on first use and cached afterwards.
+    # Mazes larger than the screen get chunked backgrounds drawn through the viewport instead.
     def set_background(self):
-        self.background_norm = pygame.surface.Surface(SCREENSIZE).convert()
-        self.background_norm.fill(BLACK)
-
-        self.background_flash = pygame.surface.Surface(SCREENSIZE).convert()
-        self.background_flash.fill(BLACK)
-
-        self.background_norm = self.mazesprites.construct_background(self.background_norm, self.level % 5)
-        self.background_flash = self.mazesprites.construct_background(self.background_flash, 5)
+        if self.mazesprites.scrolls():
+            self.viewport = Viewport(*self.mazesprites.size())
+            self.background_norm = ChunkedBackground(self.mazesprites, self.level % 5)
+            self.background_flash = ChunkedBackground(self.mazesprites, 5)
+        else:
+            self.viewport = None
+            self.background_norm = self.mazesprites.get_background(self.level % 5)
+            self.background_flash = self.mazesprites.get_background(5)
 
         self.flashBG = False
+        self.timers.cancel(self.flashTimer)
+        self.flashTimer = None
         self.background = self.background_norm
 
     # Called once at game start. Initializes maze, Pac-Man, ghosts, and pellets.
-    # Loads the maze from file, places all entities, and sets up portals and ghost house.
+    # Loads the maze from its level pack or text files, places all entities, and sets up
+    # portals and ghost house.
     def start_game(self):
-        self.mazedata.load_maze(self.level)
-        mazepath = os.path.join(base_path, "assets", "mazes", self.mazedata.obj.name + ".txt")
-        rotpath = os.path.join(base_path, "assets", "mazes", self.mazedata.obj.name + "_rotation.txt")
-        self.mazesprites = MazeSprites(mazepath, rotpath)
+        # The previous level's fruit (its node belongs to the old maze) and ghost timers
+        self.remove_fruit()
+        self.gametimers.clear()
+
+        level = self.loader.take(self.level)
+        self.mazedata.obj = level.maze
+        self.mazesprites = level.mazesprites
+        self.nodes = level.nodes
+        self.pellets = level.pellets
+        self.startNodes = level.startNodes
         self.set_background()
 
-        # Load maze layout and create graph of nodes
-        self.nodes = NodeGroup(mazepath)
-
-        # Link left and right edge nodes as teleport portals
-        self.mazedata.obj.set_portal_pairs(self.nodes)
-
-        # Create and connect nodes for the ghost house in the maze
-        self.mazedata.obj.connect_home_nodes(self.nodes)
-
         # Initialize Pac-Man at a specific start node
-        self.pacman = Pacman(self.nodes.get_node_from_tiles(*self.mazedata.obj.pacmanStart))
+        self.pacman = Pacman(self.startNodes["pacman"])
 
-        # Load pellets based on maze layout
-        self.pellets = PelletGroup(mazepath)
+        # Start flashing the power pellets
+        self.timers.cancel(self.pelletFlashTimer)
+        self.pelletFlashTimer = self.timers.schedule(self.pellets.flashTime, self.flash_pellets, repeat=True)
 
         # Initialize all four ghosts and assign starting positions
-        self.ghosts = GhostGroup(self.nodes.get_start_temp_node(), self.pacman)
-        self.ghosts.pinky.set_start_node(self.nodes.get_node_from_tiles(*self.mazedata.obj.add_offset(2, 3)))
-        self.ghosts.inky.set_start_node(self.nodes.get_node_from_tiles(*self.mazedata.obj.add_offset(0, 3)))
-        self.ghosts.clyde.set_start_node(self.nodes.get_node_from_tiles(*self.mazedata.obj.add_offset(4, 3)))
-        self.ghosts.blinky.set_start_node(self.nodes.get_node_from_tiles(*self.mazedata.obj.add_offset(2, 0)))
+        self.ghosts = GhostGroup(self.nodes.get_start_temp_node(), self.pacman, self.level, self.gametimers,
+                                 self.stress, self.mazesprites.size())
+        self.ghosts.pinky.set_start_node(self.startNodes["pinky"])
+        self.ghosts.inky.set_start_node(self.startNodes["inky"])
+        self.ghosts.clyde.set_start_node(self.startNodes["clyde"])
+        self.ghosts.blinky.set_start_node(self.startNodes["blinky"])
+
+        # Stress mode ghosts start spread over the three ghost house nodes
+        homes = [self.startNodes["inky"], self.startNodes["pinky"], self.startNodes["clyde"]]
+        for i, ghost in enumerate(self.ghosts.ghosts[4:]):
+            ghost.set_start_node(homes[i % len(homes)])
 
         # Set spawn target (ghost house center) for ghosts when eaten
-        self.ghosts.set_spawn_node(self.nodes.get_node_from_tiles(*self.mazedata.obj.add_offset(2, 3)))
+        self.ghosts.set_spawn_node(self.startNodes["spawn"])
 
-        # Restrict access to ghost house or junctions as needed
-        self.nodes.deny_home_access(self.pacman)
-        self.nodes.deny_home_access_list(self.ghosts)
-        self.ghosts.inky.startNode.deny_access(RIGHT, self.ghosts.inky)
-        self.ghosts.clyde.startNode.deny_access(LEFT, self.ghosts.clyde)
-        self.mazedata.obj.deny_ghosts_access(self.ghosts, self.nodes)
+        # Restrict access to ghost house or junctions as needed (already done in packs)
+        if level.pack is None:
+            self.nodes.deny_home_access(self.pacman)
+            self.nodes.deny_home_access_list(self.ghosts)
+            self.ghosts.inky.startNode.deny_access(RIGHT, self.ghosts.inky)
+            self.ghosts.clyde.startNode.deny_access(LEFT, self.ghosts.clyde)
+            self.mazedata.obj.deny_ghosts_access(self.ghosts, self.nodes)
 
-        # Give each ghost access to the SoundManager
+        # Switch the background loop whenever a ghost changes mode
         for ghost in self.ghosts:
-            ghost.sound_manager = self.sound_manager
+            ghost.modeListener = self.update_background_sound
+
+        if self.autoplayer is not None:
+            self.autoplayer.attach(self.nodes, self.pellets, self.ghosts)
+            self.pacman.controller = self.autoplayer
+        else:
+            self.pacman.controller = self.input
+        self.input.flush()
 
+        # Starting state of the access rules, for reset
+        self.nodes.save_access()
         self.game_initialized = True
 
+    # Puts the loaded level back in the state start_game leaves it in, for self.level, without
+    # building anything: every pellet comes back, access rules are restored and the entities
+    # are moved back to their start nodes. Meant for replaying the same maze many times
+    # (a restart after game over, or training runs); start_game must have run first.
+    def reset(self):
+        self.gametimers.clear()
+        self.pellets.reset()
+        self.nodes.restore_access()
+        self.set_background()
+
+        self.pacman.restart()
+        self.timers.cancel(self.pelletFlashTimer)
+        self.pelletFlashTimer = self.timers.schedule(self.pellets.flashTime, self.flash_pellets, repeat=True)
+        self.ghosts.restart(self.level)
+        self.remove_fruit()
+
+        if self.autoplayer is not None:
+            self.autoplayer.restart()
+        self.input.flush()
+
     # Runs once per frame. Updates game state, handles events, checks collisions,
     # and draws everything to the screen.
     def update(self):
-        # Delta time in seconds (30 FPS)
-        dt = self.clock.tick(30) / 1000.0
+        # Seconds since the last frame
+        dt = min(self.pacer.wait(), self.maxFrameTime)
+
+        # Handle user inputs or system quit events first, so the ticks run this frame see them
+        self.check_events()
 
         # Handle different game states
         if self.game_state.is_menu():
@@ -193,14 +310,31 @@ class GameController(object):
         elif self.game_state.is_high_score():
             self.update_high_score_screen(dt)
         elif self.game_state.is_playing():
-            self.update_game(dt)
-
-        # Handle user inputs or system quit events
-        self.check_events()
+            self.update_ticks(dt)
 
         # Draw updated frame to screen
         self.render()
 
+    # Refresh rate of the display, where pygame reports it (pygame-ce does), else 60
+    def display_rate(self):
+        if hasattr(pygame.display, "get_current_refresh_rate"):
+            rate = pygame.display.get_current_refresh_rate()
+            if rate > 0:
+                return rate
+        return 60
+
+    # Runs every simulation tick that became due in dt more seconds, and sets how far the
+    # frame is into the next tick. Paused entities are drawn where they are.
+    def update_ticks(self, dt):
+        self.accumulator += dt
+        while self.accumulator >= self.tickTime:
+            self.accumulator -= self.tickTime
+            self.update_playing(self.tickTime)
+            if not self.game_state.is_playing():
+                self.accumulator = 0
+                break
+        self.alpha = 1 if self.pause.paused else self.accumulator / self.tickTime
+
     def update_menu(self, dt):
         self.menu_screen.update(dt)
 
@@ -211,22 +345,45 @@ class GameController(object):
             self.high_score_screen = None
             self.menu_screen.refresh_high_score_display()
 
+    # Runs the simulation steps for one tick.
+    # While fast-forwarding, sounds are batched so each plays at most once per tick.
+    def update_playing(self, dt):
+        steps = self.speed
+        if pygame.key.get_pressed()[K_TAB]:
+            steps *= self.turboSpeed
+
+        if steps == 1:
+            self.update_game(dt)
+            return
+
+        self.sound_manager.begin_batch()
+        for _ in range(steps):
+            if not self.game_state.is_playing():
+                break
+            self.update_game(dt)
+        self.sound_manager.end_batch()
+
     # Update game logic
     def update_game(self, dt):
         if not self.game_initialized:
             return
 
-        self.textgroup.update(dt)
-
-        # Animate flashing pellets (power pellets)
-        self.pellets.update(dt)
-
         if not self.pause.paused:
+            # Fire ghost mode and fruit timers
+            self.gametimers.advance(dt)
+
             # Update entity movement and animation
             self.ghosts.update(dt)
-            if self.fruit is not None:
-                self.fruit.update(dt)
 
+        if self.pacman.alive:
+            if not self.pause.paused:
+                self.pacman.update(dt)
+        else:
+            self.pacman.update(dt)
+
+        # Events are checked once everyone has moved, so the collision checks sweep
+        # Pac-Man's and the ghosts' movements over the same tick
+        if not self.pause.paused:
             # Handle pellet consumption and score tracking
             self.check_pellet_events()
 
@@ -236,33 +393,30 @@ class GameController(object):
             # Handle fruit consumption and spawning
             self.check_fruit_events()
 
-        if self.pacman.alive:
-            if not self.pause.paused:
-                self.pacman.update(dt)
-        else:
-            self.pacman.update(dt)
+        # Fire text, flashing and pause timers
+        self.timers.advance(dt)
 
-        # Handle level flashing when all pellets are eaten
-        if self.flashBG:
-            self.flashTimer += dt
-            if self.flashTimer >= self.flashTime:
-                self.flashTimer = 0
-                if self.background == self.background_norm:
-                    self.background = self.background_flash
-                else:
-                    self.background = self.background_norm
+    # Flashes the power pellets (repeating timer)
+    def flash_pellets(self):
+        self.pellets.flash()
 
-        afterPauseMethod = self.pause.update(dt)
-        if afterPauseMethod is not None:
-            afterPauseMethod()
+    # Swaps between the normal and flash backgrounds (repeating timer while flashBG is set)
+    def flash_background(self):
+        if self.background == self.background_norm:
+            self.background = self.background_flash
+        else:
+            self.background = self.background_norm
 
     def update_score(self, points):
         self.score += points
         self.textgroup.update_score(self.score)
 
     # Checks for Pygame events such as closing the game window.
+    # Direction keys go to the input queue as they come (releases too, in every state, so
+    # the held keys stay right); the game sees them on its next tick.
     def check_events(self):
         for event in pygame.event.get():
+            self.input.handle_event(event)
             if event.type == QUIT:
                 exit()
             elif event.type == KEYDOWN:
@@ -280,9 +434,7 @@ class GameController(object):
 
                         # Set up the initial start sound and 5 second pause
                         self.sound_manager.play("start")
-                        self.pause.timer = 0
-                        self.pause.pauseTime = 4.25
-                        self.pause.func = self.show_entities
+                        self.pause.set_timer(4.25, self.show_entities)
                         self.pause.paused = True
 
                 elif self.game_state.is_playing():
@@ -305,10 +457,10 @@ class GameController(object):
                     self.game_state.set_state(GameState.MENU)
                     self.high_score_screen = None
 
-    # Detect collisions between Pac-Man and ghosts.
+    # Detect collisions between Pac-Man and ghosts (only the ghosts near him are tested).
     # If a ghost is in freight mode, send it back to the ghost house (spawn mode).
     def check_ghost_events(self):
-        for ghost in self.ghosts:
+        for ghost in self.ghosts.nearby(self.pacman):
             if self.pacman.collide_ghost(ghost):
                 if ghost.mode.current is FREIGHT:
                     self.pacman.visible = False
@@ -327,6 +479,7 @@ class GameController(object):
                         self.lifesprites.remove_image()
                         self.pacman.die()
                         self.ghosts.hide()
+                        self.update_background_sound()
                         self.sound_manager.play("death")
                         if self.lives <= 0:
                             # Game over - check for high score
@@ -334,33 +487,14 @@ class GameController(object):
                         else:
                             self.pause.set_pause(pauseTime=3, func=self.reset_level)
 
+    # Picks the background loop for the current state. Called only on events that can change it
+    # (ghost mode transitions, death, level clear, end of a pause) rather than every frame.
+    def update_background_sound(self):
         if self.pacman.alive and not self.flashBG:
-            # Only manage background sounds when not flashing (level complete)
-            # Determine what background sound to play based on ghost states
-            any_spawn = any(ghost.mode.current is SPAWN for ghost in self.ghosts)
-            any_freight = any(ghost.mode.current is FREIGHT for ghost in self.ghosts)
-
-            if any_spawn:
-                # Eyes sound takes priority when any ghost is returning home
-                self.sound_manager.stop_looping("siren")
-                self.sound_manager.stop_looping("freight")
-                self.sound_manager.play_looping("eyes")
-            elif any_freight:
-                # Freight sound when ghosts are vulnerable
-                self.sound_manager.stop_looping("siren")
-                self.sound_manager.stop_looping("eyes")
-                self.sound_manager.play_looping("freight")
-            else:
-                # Default siren sound
-                self.sound_manager.stop_looping("freight")
-                self.sound_manager.stop_looping("eyes")
-                self.sound_manager.play_looping("siren")
-
-        elif self.flashBG or not self.pacman.alive:
-            # Stop all looping sounds when level complete or pacman dies
-            self.sound_manager.stop_looping("siren")
-            self.sound_manager.stop_looping("freight")
-            self.sound_manager.stop_looping("eyes")
+            self.sound_manager.set_background(self.ghosts.background_sound())
+        else:
+            # No background loop when level complete or pacman dies
+            self.sound_manager.set_background(None)
 
     # Handle game over logic
     def end_game(self):
@@ -390,8 +524,7 @@ class GameController(object):
     def check_fruit_events(self):
         if self.pellets.numEaten == 50 or self.pellets.numEaten == 140:
             if self.fruit is None:
-                self.fruit = Fruit(self.nodes.get_node_from_tiles(9, 20))
-                print(self.fruit)
+                self.spawn_fruit()
         if self.fruit is not None:
             if self.pacman.collide_check(self.fruit):
                 self.update_score(self.fruit.points)
@@ -407,15 +540,30 @@ class GameController(object):
                 if not fruitCaptured:
                     self.fruitCaptured.append(self.fruit.image)
 
-                self.fruit = None
+                self.remove_fruit()
             elif self.fruit.destroy:
-                self.fruit = None
+                self.remove_fruit()
+
+    # Places a fruit at the fruit start node, reusing one from the pool when there is one
+    def spawn_fruit(self):
+        if self.fruitPool:
+            self.fruit = self.fruitPool.pop()
+            self.fruit.setup(self.startNodes["fruit"])
+        else:
+            self.fruit = Fruit(self.startNodes["fruit"], timers=self.gametimers)
+
+    # Takes the fruit (if any) out of the maze and returns it to the pool
+    def remove_fruit(self):
+        if self.fruit is not None:
+            self.fruit.release()
+            self.fruitPool.append(self.fruit)
+            self.fruit = None
 
     # Detects if Pac-Man has eaten a pellet.
     # Removes pellet, increments counter, triggers ghost freight mode if it's a power pellet,
     # and checks if all pellets are eaten.
     def check_pellet_events(self):
-        pellet = self.pacman.eat_pellets(self.pellets.pelletList)
+        pellet = self.pacman.eat_pellets(self.pellets.near(self.pacman.position))
         if pellet:
             self.pellets.numEaten += 1
             self.update_score(pellet.points)
@@ -432,21 +580,26 @@ class GameController(object):
             if self.pellets.numEaten == 70:
                 self.ghosts.clyde.startNode.allow_access(LEFT, self.ghosts.clyde)
 
-            self.pellets.pelletList.remove(pellet)
+            self.pellets.remove(pellet)
 
             if pellet.name == POWERPELLET:
                 self.ghosts.start_freight()
 
             if self.pellets.is_empty():
                 self.flashBG = True
+                self.flashTimer = self.timers.schedule(self.flashTime, self.flash_background, repeat=True)
+                self.update_background_sound()
                 self.hide_entities()
                 self.pause.set_pause(pauseTime=3, func=self.next_level)
+                if self.prefetchLevels:
+                    self.loader.prefetch(self.level + 1)
 
     # Makes Pac-Man and ghosts visible (after unpausing or level start).
     def show_entities(self):
         self.pacman.visible = True
         self.ghosts.show()
         self.textgroup.hide_text()
+        self.update_background_sound()
 
     # Hides all entities (used during pause or transitions).
     def hide_entities(self):
@@ -473,31 +626,47 @@ class GameController(object):
             self.screen.fill(BLACK)
             return
 
-        self.screen.blit(self.background, (0, 0))
-        self.pellets.render(self.screen)
+        if self.viewport is None:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            # Pac-Man is kept centered where he is drawn
+            self.viewport.follow(self.pacman.interpolated(self.alpha))
+            self.screen.fill(BLACK)
+            self.background.render(self.screen, self.viewport)
+        self.pellets.render(self.screen, self.viewport)
 
         if self.fruit is not None:
-            self.fruit.render(self.screen)
-
-        self.pacman.render(self.screen)
-        self.ghosts.render(self.screen)
+            self.fruit.render(self.screen, self.viewport)
 
-        self.textgroup.render(self.screen)
+        self.pacman.render(self.screen, self.viewport, self.alpha)
+        self.ghosts.render(self.screen, self.viewport, self.alpha)
 
-        for i in range(len(self.lifesprites.images)):
-            x = self.lifesprites.images[i].get_width() * i
-            y = SCREENHEIGHT - self.lifesprites.images[i].get_height()
-            self.screen.blit(self.lifesprites.images[i], (x, y))
+        self.textgroup.render(self.screen, self.viewport)
 
-        for i in range(len(self.fruitCaptured)):
-            x = SCREENWIDTH - self.fruitCaptured[i].get_width() * (i + 1)
-            y = SCREENHEIGHT - self.fruitCaptured[i].get_height()
-            self.screen.blit(self.fruitCaptured[i], (x, y))
+        # Score, level, lives and captured fruit
+        self.hud.update(self.fruitCaptured)
+        self.hud.render(self.screen)
 
 
 # Entry point for the game: creates and starts the main loop
 if __name__ == "__main__":
-    game = GameController()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--autoplay", type=float, metavar="MS",
+                        help="let the built-in autoplayer steer, searching MS milliseconds per move")
+    parser.add_argument("--speed", type=int, default=1, metavar="N",
+                        help="run N simulation steps per tick (hold TAB for 8x more)")
+    parser.add_argument("--stress", type=int, default=0, metavar="N",
+                        help="add N extra ghosts to every level (load testing)")
+    parser.add_argument("--mazes", metavar="DIR",
+                        help="play the generated mazes in DIR (see mazegen.py) instead of the built-in ones")
+    parser.add_argument("--tickrate", type=int, default=30, metavar="HZ",
+                        help="simulation ticks per second (default 30)")
+    parser.add_argument("--fps", type=int, metavar="HZ",
+                        help="frames drawn per second, e.g. 60, 120 or 144 (default: the display's refresh rate)")
+    args = parser.parse_args()
+
+    game = GameController(autoplay=args.autoplay, speed=args.speed, stress=args.stress, mazes=args.mazes,
+                          tickrate=args.tickrate, fps=args.fps)
 
     # Main loop runs until manually exited
     while True:
@@ -0,0 +1,81 @@
+import heapq
+
+
+# A single scheduled callback. Kept by the owner as a handle for cancelling it.
+class Timer(object):
+    def __init__(self, deadline, callback, args, interval):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+
+        # Seconds between firings for repeating timers (None for one-shot timers)
+        self.interval = interval
+        self.cancelled = False
+
+
+# Central timer queue that components register deadlines with instead of
+# accumulating dt themselves. Timers are kept in a heap ordered by deadline,
+# so advancing the clock only touches timers that actually fire.
+class Scheduler(object):
+    def __init__(self):
+        # Scheduler time in seconds (sum of every dt passed to advance)
+        self.now = 0
+
+        # Heap of (deadline, sequence, timer); the sequence keeps equal deadlines in order
+        self.heap = []
+        self.sequence = 0
+
+    # Calls callback(*args) once delay seconds from now.
+    # With repeat=True the timer re-arms itself every delay seconds until cancelled.
+    def schedule(self, delay, callback, *args, repeat=False):
+        timer = Timer(self.now + delay, callback, args, delay if repeat else None)
+        self.push(timer)
+        return timer
+
+    def push(self, timer):
+        self.sequence += 1
+        heapq.heappush(self.heap, (timer.deadline, self.sequence, timer))
+
+    # Stops a timer from firing. Cancelled timers are dropped when they reach the top of the heap.
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancelled = True
+
+    # Seconds until a timer fires
+    def remaining(self, timer):
+        return timer.deadline - self.now
+
+    # Removes every pending timer
+    def clear(self):
+        for _, _, timer in self.heap:
+            timer.cancelled = True
+        self.heap = []
+
+    # Moves the clock forward and fires every timer whose deadline has passed, in deadline order.
+    # Repeating timers are re-armed relative to the current time, like a timer reset to zero.
+    def advance(self, dt):
+        self.now += dt
+        heap = self.heap
+        while heap and heap[0][0] <= self.now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                timer.deadline = self.now + timer.interval
+                self.push(timer)
+            timer.callback(*timer.args)
+
+    # Returns the scheduler state (clock and pending timers) for restore
+    def snapshot(self):
+        timers = [(timer, timer.deadline) for _, _, timer in self.heap if not timer.cancelled]
+        return self.now, timers
+
+    # Restores a state returned by snapshot. Timer handles held by components stay valid.
+    def restore(self, state):
+        now, timers = state
+        self.now = now
+        self.heap = []
+        for timer, deadline in timers:
+            timer.deadline = deadline
+            timer.cancelled = False
+            self.push(timer)
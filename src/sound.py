@@ -1,28 +1,144 @@
 import pygame
 import os
+import threading
 
 
-# A class to manage all sound effects in the game
-class SoundManager:
-    def __init__(self, base_path):
+# Shared sound interface. Tracks the background loop so that switching it
+# only does work when the state actually changes; backends provide the rest.
+class BaseSoundManager:
+    def __init__(self):
+        # Current background loop ("siren", "freight", "eyes" or None)
+        self.background = None
+
+        # Requests held back while batching (None when not batching)
+        self.held = None
+
+    # Switch the background loop. Only does work when the state actually changes,
+    # so callers can report every ghost mode transition without checking first.
+    def set_background(self, name):
+        if self.held is not None:
+            self.held.append(("background", name))
+            return
+        if name == self.background:
+            return
+        if self.background is not None:
+            self.stop_looping(self.background)
+        self.background = name
+        if name is not None:
+            self.play_looping(name)
+
+    # Play a one-shot sound by its key name (e.g., "wa", "ka")
+    def play(self, name):
+        if self.held is not None:
+            self.held.append(("play", name))
+        else:
+            self.play_sound(name)
+
+    # Fast-forward support: between begin_batch and end_batch sounds are only collected.
+    # end_batch then plays each distinct one-shot sound once and switches straight to the
+    # last requested background loop.
+    def begin_batch(self):
+        self.held = []
+
+    def end_batch(self):
+        held, self.held = self.held, None
+        backgrounds = [name for action, name in held if action == "background"]
+        if backgrounds:
+            self.set_background(backgrounds[-1])
+        played = []
+        for action, name in held:
+            if action == "play" and name not in played:
+                played.append(name)
+                self.play_sound(name)
+
+    def play_sound(self, name):
+        pass
+
+    def play_looping(self, name):
+        pass
+
+    def stop_looping(self, name):
+        pass
+
+    def stop_all(self):
+        self.background = None
+
+
+# Backend that plays nothing and only records what would have been played.
+# Used for headless runs, replays and machines without an audio device.
+class NullSoundManager(BaseSoundManager):
+    def __init__(self, base_path=None):
+        super().__init__()
+
+        # Recorded (action, name) pairs, e.g. ("play", "wa") or ("loop", "siren")
+        self.events = []
+
+    def play_sound(self, name):
+        self.events.append(("play", name))
+
+    def play_looping(self, name):
+        self.events.append(("loop", name))
+
+    def stop_looping(self, name):
+        self.events.append(("stop", name))
+
+    def stop_all(self):
+        self.events.append(("stop_all", None))
+        super().stop_all()
+
+
+# A class to manage all sound effects in the game.
+# Sounds are decoded on a background thread at startup (or on first use if the
+# thread has not reached them yet), and one mixer channel is reserved for the
+# background loop so starting a loop never has to search for a free channel.
+class SoundManager(BaseSoundManager):
+    def __init__(self, base_path, preload=True):
+        super().__init__()
         pygame.mixer.init()
 
+        self.base_path = base_path
+
         # Define sounds with their filename and volume
-        self.sounds = {
-            "wa": self.load_sound(base_path, "wa.wav", 0.5),
-            "ka": self.load_sound(base_path, "ka.wav", 0.5),
-            "death": self.load_sound(base_path, "death.wav", 0.5),
-            "siren": self.load_sound(base_path, "siren.wav", 0.4),
-            "freight": self.load_sound(base_path, "freight.wav", 0.3),
-            "eyes": self.load_sound(base_path, "eyes.wav", 0.4),
-            "start": self.load_sound(base_path, "start.wav", 0.5),
-            "eat_fruit": self.load_sound(base_path, "eat_fruit.wav", 0.5),
-            "eat_ghost": self.load_sound(base_path, "eat_ghost.wav", 0.5),
-            "highscore": self.load_sound(base_path, "highscore.wav", 0.5)
+        self.files = {
+            "wa": ("wa.wav", 0.5),
+            "ka": ("ka.wav", 0.5),
+            "death": ("death.wav", 0.5),
+            "siren": ("siren.wav", 0.4),
+            "freight": ("freight.wav", 0.3),
+            "eyes": ("eyes.wav", 0.4),
+            "start": ("start.wav", 0.5),
+            "eat_fruit": ("eat_fruit.wav", 0.5),
+            "eat_ghost": ("eat_ghost.wav", 0.5),
+            "highscore": ("highscore.wav", 0.5)
         }
 
-        # Set channels for looping sound effects
-        self.looping_channels = {}
+        # Decoded sounds (name → Sound or None if the file is missing)
+        self.sounds = {}
+        self.lock = threading.Lock()
+
+        # Reserve a channel for looping sound effects
+        pygame.mixer.set_reserved(1)
+        self.loop_channel = pygame.mixer.Channel(0)
+        self.looping = None
+
+        if preload:
+            threading.Thread(target=self.load_all, daemon=True).start()
+
+    # Decode every sound (run on the preload thread)
+    def load_all(self):
+        for name in self.files:
+            self.get_sound(name)
+
+    # Return a decoded sound, decoding it now if it has not been loaded yet
+    def get_sound(self, name):
+        if name in self.sounds:
+            return self.sounds[name]
+        if name not in self.files:
+            return None
+        with self.lock:
+            if name not in self.sounds:
+                self.sounds[name] = self.load_sound(self.base_path, *self.files[name])
+        return self.sounds[name]
 
     # Load an individual sound file given its filename and set its volume
     def load_sound(self, base_path, filename, volume):
@@ -33,44 +149,35 @@ class SoundManager:
             return sound
         return None
 
-    # Play a sound by its key name (e.g., "wa", "ka")
-    def play(self, name):
-        sound = self.sounds.get(name)
+    def play_sound(self, name):
+        sound = self.get_sound(name)
         if sound:
             sound.play()
 
-    # Play a looping sound (siren and freight)
+    # Play a looping sound (siren, freight and eyes) on the reserved channel.
+    # Replaces whatever loop was playing before.
     def play_looping(self, name):
-        sound = self.sounds.get(name)
+        sound = self.get_sound(name)
         if not sound:
             return
 
         # If already playing, do nothing
-        channel = self.looping_channels.get(name)
-        if channel and channel.get_busy():
+        if self.looping == name and self.loop_channel.get_busy():
             return
 
-        # Stop all other looping sounds
-        for key in list(self.looping_channels.keys()):
-            if key != name:
-                self.stop_looping(key)
-
-        # Start this sound
-        channel = pygame.mixer.find_channel()
-        if channel:
-            channel.play(sound, loops=-1)
-            self.looping_channels[name] = channel
+        self.loop_channel.play(sound, loops=-1)
+        self.looping = name
 
     def stop_looping(self, name):
-        channel = self.looping_channels.get(name)
-        if channel:
-            channel.stop()
-            self.looping_channels[name] = None
+        if self.looping == name:
+            self.loop_channel.stop()
+            self.looping = None
 
     def stop_all(self):
-        # Stop all looping sounds
-        for name in list(self.looping_channels.keys()):
-            self.stop_looping(name)
+        # Stop the looping sound
+        if self.looping is not None:
+            self.stop_looping(self.looping)
+        super().stop_all()
 
         # Also stop any one-shot sounds
         pygame.mixer.stop()
@@ -0,0 +1,76 @@
+import math
+from constants import *
+
+
+# Tile-bucket spatial hash used as a collision broadphase.
+# Every entity sits in the bucket of the tile nearest to its position. update is called
+# after each move but only touches the buckets when the entity crosses into another tile,
+# and nearby only looks at the buckets around the area being checked.
+class SpatialHash(object):
+    def __init__(self):
+        # Entities per tile: (col, row) -> set of entities
+        self.buckets = {}
+
+        # Tile each entity is currently filed under
+        self.keys = {}
+
+        # Largest distance (pixels) any entity moved since the owner last reset it to 0;
+        # widens queries so an entity that moved quickly is still found near where its
+        # path started
+        self.reach = 0
+
+    # Tile nearest to a pixel position
+    def key(self, x, y):
+        return math.floor(x / TILEWIDTH + 0.5), math.floor(y / TILEHEIGHT + 0.5)
+
+    # Re-files an entity after it moved
+    def update(self, entity):
+        if entity.lastPosition is not None:
+            moved = abs(entity.position.x - entity.lastPosition.x) + abs(entity.position.y - entity.lastPosition.y)
+            if moved > self.reach:
+                self.reach = moved
+
+        self.file(entity, self.key(entity.position.x, entity.position.y))
+
+    # Files an entity under the given tile (when its position is kept elsewhere, e.g. GhostEngine)
+    def file(self, entity, key):
+        old = self.keys.get(entity)
+        if key == old:
+            return
+        if old is not None:
+            bucket = self.buckets[old]
+            bucket.discard(entity)
+            if not bucket:
+                del self.buckets[old]
+        self.buckets.setdefault(key, set()).add(entity)
+        self.keys[entity] = key
+
+    # Forgets every entity
+    def clear(self):
+        self.buckets.clear()
+        self.keys.clear()
+        self.reach = 0
+
+    def remove(self, entity):
+        key = self.keys.pop(entity, None)
+        if key is not None:
+            bucket = self.buckets[key]
+            bucket.discard(entity)
+            if not bucket:
+                del self.buckets[key]
+
+    # Entities that may be within margin pixels of the path the given entity moved in its
+    # last update (a superset: callers still do the exact test)
+    def nearby(self, entity, margin):
+        start = entity.position if entity.lastPosition is None else entity.lastPosition
+        margin += self.reach
+        left, top = self.key(min(start.x, entity.position.x) - margin, min(start.y, entity.position.y) - margin)
+        right, bottom = self.key(max(start.x, entity.position.x) + margin, max(start.y, entity.position.y) + margin)
+
+        found = []
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                bucket = self.buckets.get((col, row))
+                if bucket:
+                    found.extend(bucket)
+        return found
@@ -1,4 +1,7 @@
+import hashlib
+import os
 import pygame
+from collections import OrderedDict
 from constants import *
 import numpy as np
 from animation import Animator
@@ -10,29 +13,49 @@ BASETILEHEIGHT = 16
 # Constant for death animation key
 DEATH = 5
 
+# Side of a background chunk in tiles (mazes larger than the screen are drawn in chunks)
+CHUNKSIZE = 8
+
 
 # Spritesheet class handles loading and extracting individual sprite images from the full spritesheet.
+# The scaled sheet and every frame cut from it are shared by all sprite classes,
+# so the image file is decoded once and each frame is sliced only once.
 class Spritesheet(object):
+    sheet = None
+    frames = {}
+
     def __init__(self):
+        if Spritesheet.sheet is None:
+            Spritesheet.sheet = self.load_sheet()
+
+    # Loads the spritesheet image file and scales it to the current tile size.
+    def load_sheet(self):
         # Load the spritesheet image file
         spritesheet_path = os.path.join(base_path, "assets", "images", "spritesheet.png")
-        self.sheet = pygame.image.load(spritesheet_path).convert()
+        sheet = pygame.image.load(spritesheet_path).convert()
 
         # Set transparency color to top-left pixel
-        transcolor = self.sheet.get_at((0, 0))
-        self.sheet.set_colorkey(transcolor)
+        transcolor = sheet.get_at((0, 0))
+        sheet.set_colorkey(transcolor)
 
         # Scale spritesheet to match current TILEWIDTH and TILEHEIGHT settings
-        width = int(self.sheet.get_width() / BASETILEWIDTH * TILEWIDTH)
-        height = int(self.sheet.get_height() / BASETILEHEIGHT * TILEHEIGHT)
-        self.sheet = pygame.transform.scale(self.sheet, (width, height))
+        width = int(sheet.get_width() / BASETILEWIDTH * TILEWIDTH)
+        height = int(sheet.get_height() / BASETILEHEIGHT * TILEHEIGHT)
+        return pygame.transform.scale(sheet, (width, height))
 
-    # Extracts a rectangular section from the spritesheet at tile-based coordinates (x, y) and returns it as a surface.
+    # Returns the rectangular section of the spritesheet at tile-based coordinates (x, y).
+    # Frames are sliced on first request and served from the frame cache afterwards.
     def get_image(self, x, y, width, height):
-        x *= TILEWIDTH
-        y *= TILEHEIGHT
-        self.sheet.set_clip(pygame.Rect(x, y, width, height))
-        return self.sheet.subsurface(self.sheet.get_clip())
+        key = (x, y, width, height)
+        frame = self.frames.get(key)
+        if frame is None:
+            frame = self.sheet.subsurface(pygame.Rect(x * TILEWIDTH, y * TILEHEIGHT, width, height))
+            self.frames[key] = frame
+        return frame
+
+    # Pre-slices a sequence of (x, y) tile coordinates into a tuple of surfaces.
+    def get_images(self, coords):
+        return tuple(self.get_image(x, y) for x, y in coords)
 
 
 # Handles loading and assigning sprites for Pac-Man.
@@ -46,7 +69,7 @@ class PacmanSprites(Spritesheet):
         self.define_animations()
 
         # Default "mouth closed" sprite
-        self.stopimage = (8, 0)
+        self.stopimage = self.get_start_image()
 
     # Loads Pac-Man's default sprite (e.g., mouth closed at starting position).
     def get_start_image(self):
@@ -56,16 +79,17 @@ class PacmanSprites(Spritesheet):
     def get_image(self, x, y):
         return super().get_image(x, y, 2 * TILEWIDTH, 2 * TILEHEIGHT)
 
-    # Define animation sequences for Pac-Man's directional movement and death
+    # Define animation sequences for Pac-Man's directional movement and death.
+    # Frames are pre-sliced so the animators hand back ready-to-blit surfaces.
     def define_animations(self):
-        self.animations[LEFT] = Animator(((8, 0), (0, 0), (0, 2), (0, 0)))
-        self.animations[RIGHT] = Animator(((10, 0), (2, 0), (2, 2), (2, 0)))
-        self.animations[UP] = Animator(((10, 2), (6, 0), (6, 2), (6, 0)))
-        self.animations[DOWN] = Animator(((8, 2), (4, 0), (4, 2), (4, 0)))
+        self.animations[LEFT] = Animator(self.get_images(((8, 0), (0, 0), (0, 2), (0, 0))))
+        self.animations[RIGHT] = Animator(self.get_images(((10, 0), (2, 0), (2, 2), (2, 0))))
+        self.animations[UP] = Animator(self.get_images(((10, 2), (6, 0), (6, 2), (6, 0))))
+        self.animations[DOWN] = Animator(self.get_images(((8, 2), (4, 0), (4, 2), (4, 0))))
 
         self.animations[DEATH] = Animator(
-            ((0, 12), (2, 12), (4, 12), (6, 12), (8, 12), (10, 12),
-             (12, 12), (14, 12), (16, 12), (18, 12), (20, 12)),
+            self.get_images(((0, 12), (2, 12), (4, 12), (6, 12), (8, 12), (10, 12),
+                             (12, 12), (14, 12), (16, 12), (18, 12), (20, 12))),
             speed=6, loop=False
         )
 
@@ -73,12 +97,12 @@ class PacmanSprites(Spritesheet):
     def update(self, dt):
         if self.entity.alive:
             if self.entity.direction in self.animations:
-                self.entity.image = self.get_image(*self.animations[self.entity.direction].update(dt))
+                self.entity.image = self.animations[self.entity.direction].update(dt)
                 self.stopimage = self.animations[self.entity.direction].frames[0]
             elif self.entity.direction == STOP:
-                self.entity.image = self.get_image(*self.stopimage)
+                self.entity.image = self.stopimage
         else:
-            self.entity.image = self.get_image(*self.animations[DEATH].update(dt))
+            self.entity.image = self.animations[DEATH].update(dt)
 
     # Reset all animations to initial state
     def reset(self):
@@ -99,12 +123,23 @@ class GhostSprites(Spritesheet):
             CLYDE: 6
         }
         self.entity = entity
+        self.define_images()
         self.entity.image = self.get_start_image()
 
+    # Pre-slices every frame this ghost can show, indexed by direction
+    def define_images(self):
+        x = self.x[self.entity.name]
+        self.normal = {LEFT: self.get_image(x, 8), RIGHT: self.get_image(x, 10),
+                       DOWN: self.get_image(x, 6), UP: self.get_image(x, 4)}
+        self.eyes = {LEFT: self.get_image(8, 8), RIGHT: self.get_image(8, 10),
+                     DOWN: self.get_image(8, 6), UP: self.get_image(8, 4)}
+        self.freight = self.get_image(10, 4)
+        self.freightflash = self.get_image(10, 6)
+
     # Loads the initial sprite for the ghost based on its type (BLINKY, PINKY, etc.).
     # All start on row 4 of the sheet.
     def get_start_image(self):
-        return self.get_image(self.x[self.entity.name], 4)
+        return self.normal[UP]
 
     # Returns a specific ghost sprite at tile (x, y).
     def get_image(self, x, y):
@@ -112,41 +147,29 @@ class GhostSprites(Spritesheet):
 
     # Update the ghost's animation frame based on direction and mode
     def update(self, dt):
-        x = self.x[self.entity.name]
-
         if self.entity.mode.current in [SCATTER, CHASE]:
-            if self.entity.direction == LEFT:
-                self.entity.image = self.get_image(x, 8)
-            elif self.entity.direction == RIGHT:
-                self.entity.image = self.get_image(x, 10)
-            elif self.entity.direction == DOWN:
-                self.entity.image = self.get_image(x, 6)
-            elif self.entity.direction == UP:
-                self.entity.image = self.get_image(x, 4)
-
+            image = self.normal.get(self.entity.direction)
+            if image is not None:
+                self.entity.image = image
 
         elif self.entity.mode.current == FREIGHT:
             # Flashing starts when freight mode is almost over
-            if self.entity.mode.timer >= self.entity.mode.time - 2:
+            elapsed = self.entity.mode.freight_elapsed()
+            if elapsed >= self.entity.mode.time - 2:
                 # Alternate between blue and white every 0.2s
-                if int(self.entity.mode.timer * 5) % 2 == 0:
+                if int(elapsed * 5) % 2 == 0:
                     # Blue
-                    self.entity.image = self.get_image(10, 4)
+                    self.entity.image = self.freight
                 else:
                     # White
-                    self.entity.image = self.get_image(10, 6)
+                    self.entity.image = self.freightflash
             else:
-                self.entity.image = self.get_image(10, 4)
+                self.entity.image = self.freight
 
         elif self.entity.mode.current == SPAWN:
-            if self.entity.direction == LEFT:
-                self.entity.image = self.get_image(8, 8)
-            elif self.entity.direction == RIGHT:
-                self.entity.image = self.get_image(8, 10)
-            elif self.entity.direction == DOWN:
-                self.entity.image = self.get_image(8, 6)
-            elif self.entity.direction == UP:
-                self.entity.image = self.get_image(8, 4)
+            image = self.eyes.get(self.entity.direction)
+            if image is not None:
+                self.entity.image = image
 
 
 # Loads the correct fruit sprite based on current level (looped).
@@ -157,11 +180,12 @@ class FruitSprites(Spritesheet):
 
         # Sprites vary (cherry, strawberry, etc.) based on modulo of level index.
         self.fruits = {0: (16, 8), 1: (18, 8), 2: (20, 8), 3: (16, 10), 4: (18, 10), 5: (20, 10)}
+        self.images = {key: self.get_image(*coords) for key, coords in self.fruits.items()}
         self.entity.image = self.get_start_image(level % len(self.fruits))
 
     # Loads the default fruit sprite from the sheet.
     def get_start_image(self, key):
-        return self.get_image(*self.fruits[key])
+        return self.images[key]
 
     # Returns a specific fruit sprite from tile (x, y).
     def get_image(self, x, y):
@@ -172,6 +196,7 @@ class FruitSprites(Spritesheet):
 class LifeSprites(Spritesheet):
     def __init__(self, numlives):
         super().__init__()
+        self.icon = self.get_image(0, 0)
         self.reset_lives(numlives)
 
     # Removes one life icon (e.g., after player dies).
@@ -181,43 +206,198 @@ class LifeSprites(Spritesheet):
 
     # Resets the life icons to the specified number.
     def reset_lives(self, numlives):
-        self.images = [self.get_image(0, 0) for _ in range(numlives)]
+        self.images = [self.icon] * numlives
 
     # Loads a 2x2 tile sprite for Pac-Man's life icon.
     def get_image(self, x, y):
         return super().get_image(x, y, 2 * TILEWIDTH, 2 * TILEHEIGHT)
 
 
-# Builds and renders the maze tileset from level layout files
+# Builds and renders the maze tileset from level layout files.
+# Rotated wall tiles and finished backgrounds are cached across instances (backgrounds in
+# a bounded least-recently-used cache, keyed by the maze file's absolute path), so a
+# maze/palette pair is only assembled the first time it is shown.
+# Mazes larger than the screen are instead drawn in CHUNKSIZE x CHUNKSIZE tile chunks,
+# built when first needed and kept in a bounded least-recently-used cache.
 class MazeSprites(Spritesheet):
-    def __init__(self, mazefile, rotfile):
+    # Rotated tiles keyed by (x, y, rotation)
+    tiles = {}
+
+    # Finished backgrounds keyed by (maze path, palette, tile size), oldest use first;
+    # at most backgroundCapacity are kept (a level shows two, and the next one is prefetched)
+    backgrounds = OrderedDict()
+    backgroundCapacity = 16
+
+    # Background chunks keyed by (maze path, palette, tile size, chunk column, chunk row),
+    # oldest use first; at most chunkCapacity are kept
+    chunks = OrderedDict()
+    chunkCapacity = 96
+
+    # Optional directory for persisting backgrounds as image files (None disables it)
+    cachedir = None
+
+    # Level packs pass the layout and rotation grids in data and rotdata (the files are then
+    # not read) and the finished backgrounds' RGB pixels by palette row in prebuilt.
+    def __init__(self, mazefile, rotfile, data=None, rotdata=None, prebuilt=None):
         super().__init__()
-        self.data = self.read_maze_file(mazefile)
-        self.rotdata = self.read_maze_file(rotfile)
+        self.mazefile = mazefile
+        self.rotfile = rotfile
+        self.name = os.path.splitext(os.path.basename(mazefile))[0]
+        self.path = os.path.abspath(mazefile)
+        self.data = self.read_maze_file(mazefile) if data is None else data
+        self.rotdata = self.read_maze_file(rotfile) if rotdata is None else rotdata
+        self.prebuilt = prebuilt
 
     def get_image(self, x, y):
         return super().get_image(x, y, TILEWIDTH, TILEHEIGHT)
 
+    # Returns the tile at (x, y) rotated by 90-degree increments, rotating it only once
+    def get_tile(self, x, y, rotval):
+        key = (x, y, rotval)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.rotate(self.get_image(x, y), rotval)
+            self.tiles[key] = tile
+        return tile
+
     # Reads maze layout or rotation info from file
     def read_maze_file(self, mazefile):
         return np.loadtxt(mazefile, dtype='<U1')
 
-    # Assembles the background tile image from layout and rotation maps
-    def construct_background(self, background, y):
-        for row in range(self.data.shape[0]):
-            for col in range(self.data.shape[1]):
+    # Returns the background for the given palette row, building it only on a cache miss.
+    # Checks the in-memory cache first, then the prebuilt pixels and the on-disk cache (if any).
+    def get_background(self, y):
+        key = (self.path, y, TILEWIDTH)
+        background = self.backgrounds.get(key)
+        if background is not None:
+            self.backgrounds.move_to_end(key)
+            return background
+
+        if self.prebuilt is not None:
+            pixels = self.prebuilt[y]
+            background = pygame.image.frombuffer(pixels, (pixels.shape[1], pixels.shape[0]), "RGB").convert()
+        else:
+            background = self.load_background(y)
+            if background is None:
+                background = pygame.surface.Surface(SCREENSIZE).convert()
+                background.fill(BLACK)
+                background = self.construct_background(background, y)
+                self.save_background(y, background)
+        self.backgrounds[key] = background
+        if len(self.backgrounds) > self.backgroundCapacity:
+            self.backgrounds.popitem(last=False)
+        return background
+
+    # Path of the image file the background for a palette row is persisted to (named after
+    # the maze, with a digest of its path so mazes of the same name in other directories differ)
+    def background_path(self, y):
+        digest = hashlib.md5(self.path.encode()).hexdigest()[:8]
+        return os.path.join(self.cachedir, "%s_%s_%d_%d.png" % (self.name, digest, y, TILEWIDTH))
+
+    # Loads a persisted background if one exists and is newer than the maze files
+    def load_background(self, y):
+        if self.cachedir is None:
+            return None
+        path = self.background_path(y)
+        if not os.path.exists(path):
+            return None
+        mtime = os.path.getmtime(path)
+        if mtime < os.path.getmtime(self.mazefile) or mtime < os.path.getmtime(self.rotfile):
+            return None
+        try:
+            return pygame.image.load(path).convert()
+        except pygame.error:
+            return None
+
+    # Persists a background to the cache directory (if enabled)
+    def save_background(self, y, background):
+        if self.cachedir is None:
+            return
+        try:
+            os.makedirs(self.cachedir, exist_ok=True)
+            pygame.image.save(background, self.background_path(y))
+        except (pygame.error, OSError):
+            pass
+
+    # Maze size in pixels
+    def size(self):
+        return self.data.shape[1] * TILEWIDTH, self.data.shape[0] * TILEHEIGHT
+
+    # True if the maze does not fit on the screen and has to be drawn through a viewport
+    def scrolls(self):
+        return self.data.shape[0] > NROWS or self.data.shape[1] > NCOLS
+
+    # Returns the chunk at (col, row) in chunk units for the given palette row,
+    # building it on a cache miss and evicting the least recently used chunk when full
+    def get_chunk(self, y, col, row):
+        key = (self.path, y, TILEWIDTH, col, row)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        chunk = self.build_chunk(y, col, row)
+        self.keep_chunk(y, col, row, chunk)
+        return chunk
+
+    def has_chunk(self, y, col, row):
+        return (self.path, y, TILEWIDTH, col, row) in self.chunks
+
+    # Builds a chunk without caching it (safe off the main thread)
+    def build_chunk(self, y, col, row):
+        chunk = pygame.surface.Surface((CHUNKSIZE * TILEWIDTH, CHUNKSIZE * TILEHEIGHT)).convert()
+        chunk.fill(BLACK)
+        return self.construct_background(chunk, y, col * CHUNKSIZE, row * CHUNKSIZE)
+
+    # Adds a chunk to the cache as the most recently used one
+    def keep_chunk(self, y, col, row, chunk):
+        self.chunks[(self.path, y, TILEWIDTH, col, row)] = chunk
+        if len(self.chunks) > self.chunkCapacity:
+            self.chunks.popitem(last=False)
+
+    # Assembles the background tile image from layout and rotation maps.
+    # Draws the part of the maze that fits the surface, starting at tile (left, top).
+    def construct_background(self, background, y, left=0, top=0):
+        bottom = min(self.data.shape[0], top + background.get_height() // TILEHEIGHT)
+        right = min(self.data.shape[1], left + background.get_width() // TILEWIDTH)
+        for row in range(top, bottom):
+            for col in range(left, right):
                 if self.data[row][col].isdigit():
                     x = int(self.data[row][col]) + 12
-                    sprite = self.get_image(x, y)
-                    rotval = int(self.rotdata[row][col])
-                    sprite = self.rotate(sprite, rotval)
-                    background.blit(sprite, (col * TILEWIDTH, row * TILEHEIGHT))
+                    sprite = self.get_tile(x, y, int(self.rotdata[row][col]))
+                    background.blit(sprite, ((col - left) * TILEWIDTH, (row - top) * TILEHEIGHT))
                 elif self.data[row][col] == '=':
                     sprite = self.get_image(10, 8)
-                    background.blit(sprite, (col * TILEWIDTH, row * TILEHEIGHT))
+                    background.blit(sprite, ((col - left) * TILEWIDTH, (row - top) * TILEHEIGHT))
 
         return background
 
     # Rotates a tile image by 90-degree increments
     def rotate(self, sprite, value):
         return pygame.transform.rotate(sprite, value * 90)
+
+
+# Background of a maze larger than the screen, for one palette row.
+# Draws only the MazeSprites chunks that overlap the viewport.
+class ChunkedBackground(object):
+    def __init__(self, mazesprites, y):
+        self.mazesprites = mazesprites
+        self.y = y
+
+    # Chunk columns and rows overlapping the viewport, as (col, row) pairs
+    def visible(self, viewport):
+        width = CHUNKSIZE * TILEWIDTH
+        height = CHUNKSIZE * TILEHEIGHT
+        mazewidth, mazeheight = self.mazesprites.size()
+        left = viewport.x // width
+        top = viewport.y // height
+        right = min(viewport.x + viewport.width, mazewidth - 1) // width
+        bottom = min(viewport.y + viewport.height, mazeheight - 1) // height
+        return [(col, row) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+
+    def render(self, screen, viewport):
+        width = CHUNKSIZE * TILEWIDTH
+        height = CHUNKSIZE * TILEHEIGHT
+        for col, row in self.visible(viewport):
+            chunk = self.mazesprites.get_chunk(self.y, col, row)
+            screen.blit(chunk, (col * width - viewport.x, row * height - viewport.y))
@@ -0,0 +1,172 @@
+import heapq
+import math
+from constants import *
+
+
+# Classic ghost targeting: at each node pick the direction whose next tile is
+# closest (straight-line) to the goal.
+class GreedyTargeting(object):
+    def choose(self, ghost, directions):
+        distances = []
+        for direction in directions:
+            vec = ghost.node.position + ghost.directions[direction] * TILEWIDTH - ghost.goal
+            distances.append(vec.magnitude_squared())
+
+        # Choose the direction that minimizes distance to the goal
+        index = distances.index(min(distances))
+        return directions[index]
+
+
+# Shortest-path targeting: follows the true shortest route through the node graph
+# (portals included) to the node nearest the goal, found with A* (with a per-search
+# expansion budget). Path lengths are cached by (from node, target node, entity name);
+# estimates from searches cut short by the budget are not. The cache is dropped
+# whenever the access rules of any node in the group change, or when it reaches maxpaths entries.
+# A strategy can be shared by several ghosts, which then share the cache.
+class AStarTargeting(object):
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+        # Path lengths keyed by (start node, target node, entity name); None if unreachable
+        self.paths = {}
+        self.maxpaths = 200000
+
+        # Node expansions allowed per search
+        self.maxexpansions = 64
+        self.version = self.nodes.accessVersion
+
+        # Nodes with a portal, found on the first search (portals are linked when the maze is loaded)
+        self.portals = None
+
+        # Nearest node per goal tile, searched within maxradius tiles before scanning every node
+        self.nearest = {}
+        self.maxradius = 8
+
+        # Falls back to greedy targeting when the goal cannot be reached
+        self.fallback = GreedyTargeting()
+
+    # Returns the node closest to a pixel position (cached per tile).
+    # Looks in growing squares of tiles around the position first, so the cost does not
+    # depend on the maze size; only goals far from every node fall back to a full scan.
+    def nearest_node(self, position):
+        col, row = int(position.x // TILEWIDTH), int(position.y // TILEHEIGHT)
+        node = self.nearest.get((col, row))
+        if node is None:
+            for radius in range(self.maxradius + 1):
+                candidates = self.ring(col, row, radius)
+                if candidates:
+                    # A node one ring further out can still be closer, so include it
+                    candidates += self.ring(col, row, radius + 1)
+                    break
+            else:
+                candidates = list(self.nodes.nodesLUT.values())
+            node = min(candidates, key=lambda n: (n.position - position).magnitude_squared())
+            self.nearest[(col, row)] = node
+        return node
+
+    # Nodes on the square ring of tiles at the given distance from (col, row)
+    def ring(self, col, row, radius):
+        nodes = []
+        for x in range(col - radius, col + radius + 1):
+            for y in range(row - radius, row + radius + 1):
+                if max(abs(x - col), abs(y - row)) == radius:
+                    node = self.nodes.get_node_from_tiles(x, y)
+                    if node is not None:
+                        nodes.append(node)
+        return nodes
+
+    # Length of the shortest path between two nodes for an entity, or None if unreachable
+    # (an estimate if the search ran out of budget)
+    def path_length(self, start, target, name):
+        if self.version != self.nodes.accessVersion:
+            self.paths.clear()
+            self.version = self.nodes.accessVersion
+
+        key = (start, target, name)
+        if key in self.paths:
+            return self.paths[key]
+        if len(self.paths) >= self.maxpaths:
+            self.paths.clear()
+        return self.search(start, target, name)
+
+    # Lower bound on the path length from a node to the target: the straight line, or the
+    # straight lines to the nearest portal and from the portal nearest the target, as a
+    # portal jump costs nothing
+    def estimate(self, x, y, tx, ty, targetportal):
+        direct = math.hypot(tx - x, ty - y)
+        if targetportal is None:
+            return direct
+        portal = min(math.hypot(node.position.x - x, node.position.y - y) for node in self.portals)
+        return min(direct, portal + targetportal)
+
+    # A* over the node graph, with portals as zero-length edges and estimate as the heuristic.
+    # Ties prefer the deeper node, which keeps the search narrow in open grids.
+    # Every node on the found path is cached too, since the rest of a shortest path is
+    # itself a shortest path; so is an unreachable target.
+    # The search expands at most maxexpansions nodes, which bounds the cost of a decision
+    # in very large mazes; if the budget runs out, the lowest estimated total length on the
+    # frontier is returned instead (real-time A*), and not cached.
+    def search(self, start, target, name):
+        if start is target:
+            return 0
+        if self.portals is None:
+            self.portals = [node for node in self.nodes.nodesLUT.values() if node.neighbors[PORTAL] is not None]
+        tx, ty = target.position.x, target.position.y
+        targetportal = None
+        if self.portals:
+            targetportal = min(math.hypot(node.position.x - tx, node.position.y - ty) for node in self.portals)
+
+        sequence = 0
+        expansions = 0
+        frontier = [(0, 0, sequence, start)]
+        best = {start: 0}
+        previous = {start: None}
+        while frontier:
+            if expansions >= self.maxexpansions:
+                return frontier[0][0]
+            expansions += 1
+            _, negcost, _, node = heapq.heappop(frontier)
+            cost = -negcost
+            if node is target:
+                while node is not None:
+                    self.paths[(node, target, name)] = cost - best[node]
+                    node = previous[node]
+                return cost
+            if cost > best[node]:
+                continue
+            for direction in [UP, DOWN, LEFT, RIGHT, PORTAL]:
+                neighbor = node.neighbors[direction]
+                if neighbor is None:
+                    continue
+                position = neighbor.position
+                if direction == PORTAL:
+                    newcost = cost
+                elif name not in node.access[direction]:
+                    continue
+                else:
+                    newcost = cost + math.hypot(position.x - node.position.x, position.y - node.position.y)
+                if neighbor not in best or newcost < best[neighbor]:
+                    best[neighbor] = newcost
+                    previous[neighbor] = node
+                    sequence += 1
+                    estimate = newcost + self.estimate(position.x, position.y, tx, ty, targetportal)
+                    heapq.heappush(frontier, (estimate, -newcost, sequence, neighbor))
+        self.paths[(start, target, name)] = None
+        return None
+
+    def choose(self, ghost, directions):
+        target = self.nearest_node(ghost.goal)
+        lengths = []
+        for direction in directions:
+            neighbor = ghost.node.neighbors[direction]
+            length = None
+            if neighbor is not None:
+                length = self.path_length(neighbor, target, ghost.name)
+            if length is not None:
+                length += (neighbor.position - ghost.node.position).magnitude()
+            lengths.append(length)
+
+        reachable = [length for length in lengths if length is not None]
+        if not reachable:
+            return self.fallback.choose(ghost, directions)
+        return directions[lengths.index(min(reachable))]
@@ -1,11 +1,29 @@
 import pygame
 from vector import Vector2
 from constants import *
+from scheduler import Scheduler
 
 
-# Represents a single on-screen text element
+# Represents a single on-screen text element.
+# Fonts are shared by every Text and keyed by file and size, so each TTF is parsed once per size.
+# Rendered labels are shared the same way, keyed by text, color and size, so every game in a
+# process draws its menu and status texts from one set of surfaces.
 class Text(object):
+    __slots__ = ("id", "text", "color", "size", "visible", "position", "timer", "lifespan", "destroy",
+                 "font", "label")
+
+    fonts = {}
+    labels = {}
+
     def __init__(self, text, color, x, y, size, time=None, id=None, visible=True):
+        self.font = None
+        self.label = None
+        self.setup(text, color, x, y, size, time=time, id=id, visible=visible)
+
+    # (Re)initializes every field so pooled instances can be reused for new text.
+    # The label is only re-rendered if the text, color or size actually changed.
+    def setup(self, text, color, x, y, size, time=None, id=None, visible=True):
+        rerender = self.label is None or (text, color, size) != (self.text, self.color, self.size)
         self.id = id
         self.text = text
         self.color = color
@@ -14,19 +32,29 @@ class Text(object):
         self.position = Vector2(x, y)
         self.timer = 0
         self.lifespan = time
-        self.label = None
         self.destroy = False
-        self.setup_font("PressStart2P-Regular.ttf")
-        self.create_label()
+        if rerender:
+            self.setup_font("PressStart2P-Regular.ttf")
+            self.create_label()
 
-    # Loads a font file at the given path with the configured size
+    # Loads a font file at the given path with the configured size (cached per size)
     def setup_font(self, fontpath):
-        font_path = os.path.join(base_path, "assets", "fonts", fontpath)
-        self.font = pygame.font.Font(font_path, self.size)
-
-    # Renders the text string into a Pygame surface
+        key = (fontpath, self.size)
+        font = self.fonts.get(key)
+        if font is None:
+            font_path = os.path.join(base_path, "assets", "fonts", fontpath)
+            font = pygame.font.Font(font_path, self.size)
+            self.fonts[key] = font
+        self.font = font
+
+    # Renders the text string into a Pygame surface (cached per text, color and size)
     def create_label(self):
-        self.label = self.font.render(self.text, 1, self.color)
+        key = (self.text, self.color, self.size)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.font.render(self.text, 1, self.color)
+            self.labels[key] = label
+        self.label = label
 
     # Changes the displayed text and re-renders the label
     def set_text(self, newtext):
@@ -44,57 +72,126 @@ class Text(object):
                 # Mark for removal
                 self.destroy = True
 
-    # Draws the text label to the screen, if visible
-    def render(self, screen):
+    # Draws the text label to the screen, if visible.
+    # A viewport places it in the maze instead of on the screen (score popups).
+    def render(self, screen, viewport=None):
         if self.visible:
             x, y = self.position.as_tuple()
+            if viewport is not None:
+                x, y = x - viewport.x, y - viewport.y
             screen.blit(self.label, (x, y))
 
 
-# Manages all on-screen text elements as a group
+# Text for frequently changing values (score, level).
+# Instead of rendering the whole string through the font, it is composed from a
+# pre-rendered glyph atlas shared by every GlyphText of the same size and color.
+# Relies on the game font being monospaced.
+class GlyphText(Text):
+    __slots__ = ("glyphs",)
+
+    # Glyph atlases keyed by (size, color)
+    atlases = {}
+
+    # Characters pre-rendered into every atlas; anything else is added on first use
+    characters = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ!-/ "
+
+    # Returns this text's glyph atlas, building it on first use
+    def get_atlas(self):
+        key = (self.size, self.color)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = {char: self.font.render(char, 1, self.color) for char in self.characters}
+            self.atlases[key] = atlas
+        return atlas
+
+    # Builds the list of (glyph, position) pairs drawn by render
+    def create_label(self):
+        atlas = self.get_atlas()
+        x, y = self.position.as_tuple()
+        self.glyphs = []
+        for char in self.text:
+            glyph = atlas.get(char)
+            if glyph is None:
+                glyph = self.font.render(char, 1, self.color)
+                atlas[char] = glyph
+            self.glyphs.append((glyph, (x, y)))
+            x += glyph.get_width()
+        self.label = self.glyphs
+
+    # Draws the cached glyphs to the screen, if visible
+    def render(self, screen):
+        if self.visible:
+            screen.blits(self.glyphs, doreturn=False)
+
+
+# Manages all on-screen text elements as a group.
+# Text lifespans are registered with the given scheduler (or a private one that update advances).
 class TextGroup(object):
-    def __init__(self):
+    def __init__(self, timers=None):
         # Used to assign unique IDs for new text objects
         self.nextid = 10
 
+        self.ownsTimers = timers is None
+        self.timers = Scheduler() if timers is None else timers
+
+        # Expired timed texts (score popups) kept for reuse
+        self.pool = []
+
         # Dictionary of all text objects (id → Text)
         self.alltext = {}
 
+        # HUD texts (score and level captions and values), drawn through the HUD layer
+        self.hudtext = {}
+
         # Preload fixed labels (score, level, status)
         self.setup_text()
 
         # Start by showing the "READY!" message
         self.show_text(READYTXT)
 
-    # Dynamically creates a new text object with optional lifespan
+    # Dynamically creates a new text object with optional lifespan.
+    # Reuses a pooled text object when one is available.
     def add_text(self, text, color, x, y, size, time=None, id=None):
         self.nextid += 1
-        self.alltext[self.nextid] = Text(text, color, x, y, size, time=time, id=id)
+        if self.pool:
+            textobj = self.pool.pop()
+            textobj.setup(text, color, x, y, size, time=time, id=id)
+        else:
+            textobj = Text(text, color, x, y, size, time=time, id=id)
+        self.alltext[self.nextid] = textobj
+        if time is not None:
+            self.timers.schedule(time, self.expire_text, self.nextid)
         return self.nextid
 
-    # Deletes a text object by its ID
+    # Called when a timed text's lifespan is over
+    def expire_text(self, id):
+        if id in self.alltext:
+            self.alltext[id].destroy = True
+            self.remove_text(id)
+
+    # Deletes a text object by its ID; expired timed texts go back to the pool
     def remove_text(self, id):
-        self.alltext.pop(id)
+        textobj = self.alltext.pop(id)
+        if textobj.destroy:
+            self.pool.append(textobj)
 
     # Predefined static labels and positions for score, level, and messages
     def setup_text(self):
         size = TILEHEIGHT
-        self.alltext[SCORETXT] = Text("0".zfill(8), WHITE, 0, TILEHEIGHT, size)
-        self.alltext[LEVELTXT] = Text(str(1).zfill(3), WHITE, 23 * TILEWIDTH, TILEHEIGHT, size)
+        self.hudtext[SCORETXT] = GlyphText("0".zfill(8), WHITE, 0, TILEHEIGHT, size)
+        self.hudtext[LEVELTXT] = GlyphText(str(1).zfill(3), WHITE, 23 * TILEWIDTH, TILEHEIGHT, size)
         self.alltext[READYTXT] = Text("READY!", YELLOW, 11.25 * TILEWIDTH, 20 * TILEHEIGHT, size, visible=False)
         self.alltext[PAUSETXT] = Text("PAUSED!", YELLOW, 10.625 * TILEWIDTH, 20 * TILEHEIGHT, size, visible=False)
         self.alltext[GAMEOVERTXT] = Text("GAMEOVER!", YELLOW, 10 * TILEWIDTH, 20 * TILEHEIGHT, size, visible=False)
 
         # Add small top labels for clarity
-        self.add_text("SCORE", WHITE, 0, 0, size)
-        self.add_text("LEVEL", WHITE, 23 * TILEWIDTH, 0, size)
+        self.hudtext[SCORELABELTXT] = Text("SCORE", WHITE, 0, 0, size)
+        self.hudtext[LEVELLABELTXT] = Text("LEVEL", WHITE, 23 * TILEWIDTH, 0, size)
 
-    # Updates all text elements; removes expired ones
+    # Only needed without a shared scheduler: advances the private one.
     def update(self, dt):
-        for tkey in list(self.alltext.keys()):
-            self.alltext[tkey].update(dt)
-            if self.alltext[tkey].destroy:
-                self.remove_text(tkey)
+        if self.ownsTimers:
+            self.timers.advance(dt)
 
     # Shows a specific message (READY, PAUSED, GAMEOVER)
     def show_text(self, id):
@@ -117,10 +214,25 @@ class TextGroup(object):
 
     # Changes the text content of an existing label
     def update_text(self, id, value):
-        if id in self.alltext.keys():
+        if id in self.hudtext:
+            self.hudtext[id].set_text(value)
+        elif id in self.alltext:
             self.alltext[id].set_text(value)
 
-    # Renders all visible text labels to the screen
-    def render(self, screen):
-        for tkey in list(self.alltext.keys()):
-            self.alltext[tkey].render(screen)
+    # Returns the text shown in a HUD label
+    def get_hud_text(self, id):
+        return self.hudtext[id].text
+
+    # Renders all visible text labels to the screen (HUD texts excluded).
+    # Status messages stay put; with a viewport, texts added at maze positions follow the maze.
+    def render(self, screen, viewport=None):
+        for id, text in self.alltext.items():
+            if id in (READYTXT, PAUSETXT, GAMEOVERTXT):
+                text.render(screen)
+            else:
+                text.render(screen, viewport)
+
+    # Renders the HUD texts onto the HUD layer
+    def render_hud(self, surface):
+        for text in self.hudtext.values():
+            text.render(surface)
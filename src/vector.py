@@ -3,15 +3,18 @@ import math
 
 # A 2D vector class used for movement, direction, and positioning.
 # Supports basic vector operations and precision-based comparisons.
+# Slotted, since every node, pellet and entity holds at least one.
 class Vector2(object):
+    __slots__ = ("x", "y")
+
+    # Threshold for comparing floating-point equality
+    thresh = 1e-6
+
     # Initialize x and y coordinates of the vector
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
 
-        # Threshold for comparing floating-point equality
-        self.thresh = 1e-6
-
     # Add two vectors component-wise
     def __add__(self, other):
         return Vector2(self.x + other.x, self.y + other.y)
@@ -0,0 +1,41 @@
+from vector import Vector2
+from constants import *
+
+
+# Camera over a maze larger than the screen.
+# Follows an entity while staying inside the maze, converts maze pixel positions to
+# screen positions, and tells renderers what is in view so everything else can be skipped.
+class Viewport(object):
+    def __init__(self, mazewidth, mazeheight, width=SCREENWIDTH, height=SCREENHEIGHT):
+        # Maze and view size in pixels
+        self.mazewidth = mazewidth
+        self.mazeheight = mazeheight
+        self.width = width
+        self.height = height
+
+        # Maze pixel shown at the top-left corner of the screen (whole pixels, so the
+        # background chunks line up without seams)
+        self.x = 0
+        self.y = 0
+
+    # Centers the view on a maze position, clamped to the maze edges
+    def follow(self, position):
+        self.move_to(position.x - self.width // 2, position.y - self.height // 2)
+
+    def move_to(self, x, y):
+        self.x = max(0, min(int(x), self.mazewidth - self.width))
+        self.y = max(0, min(int(y), self.mazeheight - self.height))
+
+    # Screen position of a maze position
+    def to_screen(self, position):
+        return Vector2(position.x - self.x, position.y - self.y)
+
+    # True if a position is in view, or within margin pixels of it
+    def shows(self, position, margin=0):
+        return (self.x - margin <= position.x < self.x + self.width + margin and
+                self.y - margin <= position.y < self.y + self.height + margin)
+
+    # Tile rows and columns in view (at least partly): top, bottom, left, right (exclusive)
+    def tiles(self):
+        return (self.y // TILEHEIGHT, (self.y + self.height) // TILEHEIGHT + 1,
+                self.x // TILEWIDTH, (self.x + self.width) // TILEWIDTH + 1)